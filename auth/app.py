@@ -1,6 +1,4 @@
 import os
-import requests
-from threading import Thread
 
 from flask import Flask, request, jsonify
 from flask_jwt_extended import JWTManager, create_access_token
@@ -8,6 +6,8 @@ from hashlib import sha256
 from dotenv import load_dotenv
 from flask_cors import CORS
 from prometheus_flask_exporter import PrometheusMetrics
+from upstream import UpstreamClient
+from last_login import LastLoginWriter
 
 load_dotenv()
 
@@ -24,6 +24,15 @@ with open(secret_key_file, 'r') as file:
 app.config["JWT_SECRET_KEY"] = secret_key
 app.config["DB_API_URL"] = os.getenv("DB_API_URL", "http://data-layer-api:5000").rstrip("/")
 
+upstream = UpstreamClient(
+    app.config["DB_API_URL"],
+    route_timeouts={
+        "/register_user": (0.5, 1.0),
+        "/user_exists": (0.5, 0.8),
+        "/last_login/batch": (0.5, 2.0),
+    },
+)
+last_login_writer = LastLoginWriter(upstream)
 
 jwt = JWTManager(app)
 
@@ -32,16 +41,6 @@ def hash_password(password):
     return sha256(password.encode()).hexdigest()
 
 
-def update_last_login(username):
-    try:
-        requests.post(
-            f"{app.config['DB_API_URL']}/last_login",
-            json={'username': username},
-            timeout=0.2
-        )
-    except Exception:
-        pass
-
 metrics = PrometheusMetrics(app)
 
 @app.route('/register', methods=['POST'])
@@ -55,14 +54,13 @@ def register():
     password = hash_password(data['password'])
     preferred_style = data.get('preferred_style', 'Altul')
 
-    res = requests.post(
-        f"{app.config['DB_API_URL']}/register_user",
+    res = upstream.post(
+        '/register_user',
         json={
             'username': username,
             'password': password,
             'preferred_style': preferred_style
-        },
-        timeout=1.0
+        }
     )
 
     try:
@@ -83,10 +81,9 @@ def login():
     username = data['username']
     password = hash_password(data['password'])
 
-    res = requests.post(
-        f"{app.config['DB_API_URL']}/user_exists",
-        json={'username': username, 'password': password},
-        timeout=0.8
+    res = upstream.post(
+        '/user_exists',
+        json={'username': username, 'password': password}
     )
 
     if res.status_code != 200:
@@ -94,11 +91,7 @@ def login():
 
     access_token = create_access_token(identity=username, expires_delta=False)
 
-    Thread(
-        target=update_last_login,
-        args=(username,),
-        daemon=True
-    ).start()
+    last_login_writer.record(username)
 
     return jsonify({'access_token': access_token}), 200
 
@@ -0,0 +1,102 @@
+import atexit
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from prometheus_client import Counter, Gauge
+
+FLUSH_INTERVAL = float(os.getenv("LAST_LOGIN_FLUSH_INTERVAL", "1.0"))
+BATCH_SIZE = int(os.getenv("LAST_LOGIN_BATCH_SIZE", "500"))
+MAX_PENDING = int(os.getenv("LAST_LOGIN_MAX_PENDING", "10000"))
+
+QUEUE_DEPTH = Gauge("last_login_queue_depth", "Usernames waiting for a last_login flush")
+DROPPED = Counter("last_login_dropped_total", "last_login updates dropped", ["reason"])
+FLUSHED = Counter("last_login_flushed_total", "last_login updates written to the data layer")
+
+
+class LastLoginWriter:
+    """Collects last_login timestamps and writes them in batches.
+
+    Pending updates are keyed by username, so repeated logins only keep the
+    newest timestamp. One background thread per process flushes them to
+    /last_login/batch every FLUSH_INTERVAL seconds, or sooner once
+    BATCH_SIZE users are waiting. New usernames are dropped (and counted)
+    when MAX_PENDING is reached.
+    """
+
+    def __init__(self, upstream, flush_interval=FLUSH_INTERVAL, batch_size=BATCH_SIZE, max_pending=MAX_PENDING):
+        self.upstream = upstream
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self._pending = OrderedDict()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+        atexit.register(self.flush)
+
+    def _ensure_thread(self):
+        # started lazily so each forked worker gets its own flusher
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                threading.Thread(target=self._run, name="last-login-writer", daemon=True).start()
+
+    def record(self, username, when=None):
+        when = when or datetime.now(timezone.utc).isoformat()
+        self._ensure_thread()
+
+        with self._lock:
+            if username not in self._pending and len(self._pending) >= self.max_pending:
+                DROPPED.labels("queue_full").inc()
+                return
+            self._pending[username] = when
+            depth = len(self._pending)
+        QUEUE_DEPTH.set(depth)
+
+        if depth >= self.batch_size:
+            self._wake.set()
+
+    def _take_batch(self):
+        with self._lock:
+            batch = []
+            while self._pending and len(batch) < self.batch_size:
+                batch.append(self._pending.popitem(last=False))
+            QUEUE_DEPTH.set(len(self._pending))
+        return batch
+
+    def _requeue(self, batch):
+        with self._lock:
+            for username, when in batch:
+                if username in self._pending:
+                    continue  # a newer login is already waiting
+                if len(self._pending) >= self.max_pending:
+                    DROPPED.labels("queue_full").inc()
+                    continue
+                self._pending[username] = when
+            QUEUE_DEPTH.set(len(self._pending))
+
+    def flush(self):
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return
+            try:
+                res = self.upstream.post(
+                    "/last_login/batch",
+                    json={"updates": [{"username": u, "last_login": w} for u, w in batch]},
+                )
+                res.raise_for_status()
+                FLUSHED.inc(len(batch))
+            except Exception:
+                self._requeue(batch)
+                return
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
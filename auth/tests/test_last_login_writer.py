@@ -0,0 +1,100 @@
+import threading
+
+import pytest
+
+from last_login import LastLoginWriter
+
+
+class FakeResponse:
+    def __init__(self, status):
+        self.status = status
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise RuntimeError(f"HTTP {self.status}")
+
+
+class FakeUpstream:
+    """Records /last_login/batch bodies; answers with the queued statuses (200 once they run out)."""
+
+    def __init__(self, *statuses):
+        self.statuses = list(statuses)
+        self.batches = []
+        self.posted = threading.Event()
+
+    def post(self, path, json):
+        assert path == "/last_login/batch"
+        self.batches.append(json["updates"])
+        self.posted.set()
+        return FakeResponse(self.statuses.pop(0) if self.statuses else 200)
+
+
+@pytest.fixture
+def writer_for():
+    def make(upstream, **kwargs):
+        # an hour between timed flushes: only flush() and full batches write
+        return LastLoginWriter(upstream, **{"flush_interval": 3600, "batch_size": 100, "max_pending": 100, **kwargs})
+
+    return make
+
+
+def test_repeated_logins_keep_the_newest_timestamp(writer_for):
+    upstream = FakeUpstream()
+    writer = writer_for(upstream)
+    writer.record("alice", "t1")
+    writer.record("bob", "t1")
+    writer.record("alice", "t2")
+    writer.flush()
+    assert upstream.batches == [[{"username": "alice", "last_login": "t2"}, {"username": "bob", "last_login": "t1"}]]
+
+    writer.flush()
+    assert len(upstream.batches) == 1
+
+
+def test_flush_splits_into_batches(writer_for):
+    upstream = FakeUpstream()
+    writer = writer_for(upstream, batch_size=1000)
+    for n in range(5):
+        writer.record(f"user{n}", "t")
+    writer.batch_size = 2
+    writer.flush()
+    assert [len(b) for b in upstream.batches] == [2, 2, 1]
+
+
+def test_failed_batch_is_requeued(writer_for):
+    upstream = FakeUpstream(503)
+    writer = writer_for(upstream)
+    writer.record("alice", "t1")
+    writer.record("bob", "t1")
+    writer.flush()
+    writer.record("alice", "t2")
+    writer.flush()
+    assert {u["username"]: u["last_login"] for u in upstream.batches[-1]} == {"alice": "t2", "bob": "t1"}
+
+
+def test_requeue_does_not_overwrite_a_newer_login(writer_for):
+    upstream = FakeUpstream()
+    writer = writer_for(upstream)
+    writer.record("alice", "t2")
+    writer._requeue([("alice", "t1"), ("bob", "t1")])
+    writer.flush()
+    assert upstream.batches == [[{"username": "alice", "last_login": "t2"}, {"username": "bob", "last_login": "t1"}]]
+
+
+def test_new_users_are_dropped_when_the_queue_is_full(writer_for):
+    upstream = FakeUpstream()
+    writer = writer_for(upstream, max_pending=2)
+    for name in ("a", "b", "c"):
+        writer.record(name, "t1")
+    writer.record("a", "t2")  # already waiting: still updated
+    writer.flush()
+    assert upstream.batches == [[{"username": "a", "last_login": "t2"}, {"username": "b", "last_login": "t1"}]]
+
+
+def test_a_full_batch_wakes_the_flusher(writer_for):
+    upstream = FakeUpstream()
+    writer = writer_for(upstream, batch_size=3)
+    for name in ("a", "b", "c"):
+        writer.record(name)
+    assert upstream.posted.wait(5)
+    assert [u["username"] for u in upstream.batches[0]] == ["a", "b", "c"]
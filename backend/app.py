@@ -1,14 +1,17 @@
 import os
-import requests
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
 
 from flask import Flask, request, jsonify
 from flask_jwt_extended import JWTManager, jwt_required, get_jwt_identity
 from dotenv import load_dotenv
-from flask_caching import Cache
 from flask_cors import CORS
 from prometheus_client import Counter, generate_latest
 from flask import Response
 from prometheus_flask_exporter import PrometheusMetrics
+from upstream import CONNECT_TIMEOUT, UpstreamClient
+from response_cache import ResponseCache
+from batch import BATCH_MAX_REQUESTS, batch_body, batch_items, item_headers, item_method
 
 
 load_dotenv()
@@ -29,10 +32,30 @@ with open(secret_key_file, "r") as file:
 app.config["JWT_SECRET_KEY"] = secret_key
 app.config["DB_API_URL"] = os.getenv("DB_API_URL", "http://data-layer-api:5000").rstrip("/")
 
-cache = Cache(app, config={"CACHE_TYPE": "SimpleCache"})
+# a bulk import is answered once the data layer has written all of it
+INGEST_TIMEOUT = float(os.getenv("UPSTREAM_INGEST_TIMEOUT", "300"))
+upstream = UpstreamClient(
+    app.config["DB_API_URL"],
+    route_timeouts={"/reviews/bulk": (CONNECT_TIMEOUT, INGEST_TIMEOUT)},
+)
+
+app.config["ADMIN_USERS"] = set(filter(None, os.getenv("ADMIN_USERS", "admin").split(",")))
+
+response_cache = ResponseCache()
 jwt = JWTManager(app)
 
 
+def admin_required(view):
+    @wraps(view)
+    @jwt_required()
+    def wrapper(*args, **kwargs):
+        if get_jwt_identity() not in app.config["ADMIN_USERS"]:
+            return jsonify({"message": "Admin access required"}), 403
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
 @app.route("/protected", methods=["GET"])
 @jwt_required()
 def protected():
@@ -40,13 +63,65 @@ def protected():
     return jsonify({"message": f"Welcome, {current_user}"})
 
 
+# passed through as query parameters rather than folded into the JSON query
+LISTING_ARGS = ("limit", "cursor", "format")
+# bytes read from the data layer per relayed chunk
+RELAY_CHUNK = 64 * 1024
+NDJSON = "application/x-ndjson"
+
+
 def _query_from_args():
     query = {}
     for key, value in request.args.items():
+        if key in LISTING_ARGS:
+            continue
         query[key] = value
     return query
 
 
+def _listing_args():
+    return {key: request.args[key] for key in LISTING_ARGS if key in request.args}
+
+
+# client headers the data layer should see: validators, and the encodings
+# the client accepts (the body comes back to it as is)
+FORWARDED_REQUEST_HEADERS = ("If-None-Match", "Accept-Encoding")
+# upstream headers that describe the body and so travel with it
+PASSTHROUGH_HEADERS = ("Content-Type", "Content-Encoding", "Content-Length", "ETag", "Cache-Control", "Vary")
+
+
+def _forwarded_headers():
+    headers = {name: request.headers[name] for name in FORWARDED_REQUEST_HEADERS if name in request.headers}
+    # without this requests asks for gzip, which the client may not take
+    headers.setdefault("Accept-Encoding", "identity")
+    return headers
+
+
+def _passthrough(res):
+    """Response carrying the upstream status, headers and body bytes
+    unchanged; the body is never decoded or parsed.
+
+    ``res`` must come from a stream=True request. Small bodies are read in
+    one go and the connection released; larger or chunked (streamed) ones
+    are relayed RELAY_CHUNK at a time and the connection goes back to the
+    pool once the client has read everything (or gone away).
+    """
+    headers = {name: res.headers[name] for name in PASSTHROUGH_HEADERS if name in res.headers}
+    length = res.headers.get("Content-Length")
+    if length is not None and int(length) <= RELAY_CHUNK:
+        body = res.raw.read(decode_content=False)
+        res.close()
+        return Response(body, status=res.status_code, headers=headers)
+    response = Response(res.raw.stream(RELAY_CHUNK, decode_content=False), status=res.status_code, headers=headers)
+    response.call_on_close(res.close)
+    return response
+
+
+def _proxy(method, path, headers=None, **kwargs):
+    """Forward the request to the data layer and pass its answer straight back."""
+    headers = {**_forwarded_headers(), **(headers or {})}
+    return _passthrough(upstream.request(method, path, headers=headers, stream=True, **kwargs))
+
 
 
 REQUEST_COUNT = Counter(
@@ -71,34 +146,67 @@ def metrics():
 # DRINKS
 # -----------------------------
 @app.route("/drinks", methods=["GET"])
-@cache.cached(timeout=0)
+@response_cache.cached("catalog", ttl=300)
 def get_drinks():
     query = _query_from_args()
-    res = requests.get(f'{app.config["DB_API_URL"]}/drinks', json=query)
-    return res.json(), res.status_code
+    return _proxy("GET", "/drinks", json=query, params=_listing_args())
 
 
 @app.route("/drinks/categories", methods=["GET"])
+@response_cache.cached("catalog", ttl=3600)
 def get_drink_categories():
-    res = requests.get(f'{app.config["DB_API_URL"]}/drinks/categories')
-    return res.json(), res.status_code
+    return _proxy("GET", "/drinks/categories")
+
+
+@app.route("/drinks/search", methods=["GET"])
+@response_cache.cached("catalog", ttl=300)
+def search_drinks():
+    return _proxy("GET", "/drinks/search", params=request.args)
+
+
+@app.route("/drinks/faceted", methods=["GET"])
+@response_cache.cached("catalog", ttl=300)
+def get_drinks_faceted():
+    # repeated args (category=a&category=b) select several values
+    return _proxy("GET", "/drinks/faceted", params=list(request.args.items(multi=True)))
+
+
+@app.route("/drinks/<string:drink_id>/also-liked", methods=["GET"])
+@response_cache.cached("ratings", ttl=300)
+def get_also_liked(drink_id):
+    return _proxy("GET", f"/drinks/{drink_id}/also-liked", params=request.args)
 
 
 # -----------------------------
 # PRODUCERS
 # -----------------------------
 @app.route("/producers", methods=["GET"])
-@cache.cached(timeout=0)
+@response_cache.cached("catalog", ttl=300)
 def get_producers():
     query = _query_from_args()
-    res = requests.get(f'{app.config["DB_API_URL"]}/producers', json=query)
-    return res.json(), res.status_code
+    return _proxy("GET", "/producers", json=query, params=_listing_args())
+
+
+# geo queries are keyed by arbitrary coordinates, so they are not cached
+@app.route("/producers/near", methods=["GET"])
+def get_producers_near():
+    return _proxy("GET", "/producers/near", params=request.args)
+
+
+@app.route("/producers/nearest", methods=["GET"])
+def get_producers_nearest():
+    return _proxy("GET", "/producers/nearest", params=request.args)
+
+
+@app.route("/producers/within", methods=["GET"])
+def get_producers_within():
+    return _proxy("GET", "/producers/within", params=request.args)
 
 
 @app.route("/producers/<string:producer_id>", methods=["GET"])
+@response_cache.cached("catalog", ttl=300)
 def get_producer(producer_id):
-    res = requests.get(f'{app.config["DB_API_URL"]}/producers/{producer_id}')
-    return res.json(), res.status_code
+    return _proxy("GET", f"/producers/{producer_id}")
 
 
 # -----------------------------
@@ -114,22 +222,22 @@ def add_favourite():
     if not drink_id:
         return jsonify({"message": "Missing drink_id"}), 400
 
-    res = requests.post(
-        f'{app.config["DB_API_URL"]}/add_to_favorites',
+    return _proxy(
+        "POST",
+        "/add_to_favorites",
         json={"drink_id": str(drink_id), "username": current_user},
     )
-    return res.json(), res.status_code
 
 
 @app.route("/favorites", methods=["GET"])
 @jwt_required()
 def get_favorites():
     current_user = get_jwt_identity()
-    res = requests.get(
-        f'{app.config["DB_API_URL"]}/get_favorites',
+    return _proxy(
+        "GET",
+        "/get_favorites",
         json={"username": current_user},
     )
-    return res.json(), res.status_code
 
 
 @app.route("/favorites", methods=["DELETE"])
@@ -142,11 +250,11 @@ def delete_favourite():
     if not drink_id:
         return jsonify({"message": "Missing drink_id"}), 400
 
-    res = requests.delete(
-        f'{app.config["DB_API_URL"]}/remove_from_favorites',
+    return _proxy(
+        "DELETE",
+        "/remove_from_favorites",
         json={"drink_id": str(drink_id), "username": current_user},
     )
-    return res.json(), res.status_code
 
 
 # -----------------------------
@@ -156,11 +264,12 @@ def delete_favourite():
 @jwt_required()
 def get_recommendations():
     current_user = get_jwt_identity()
-    res = requests.get(
-        f'{app.config["DB_API_URL"]}/recommendations',
+    return _proxy(
+        "GET",
+        "/recommendations",
         json={"username": current_user},
+        params=request.args,
     )
-    return res.json(), res.status_code
 
 
 # -----------------------------
@@ -168,8 +277,7 @@ def get_recommendations():
 # -----------------------------
 @app.route("/reviews/drink/<string:drink_id>", methods=["GET"])
 def get_drink_reviews(drink_id):
-    res = requests.get(f'{app.config["DB_API_URL"]}/reviews/drink/{drink_id}')
-    return res.json(), res.status_code
+    return _proxy("GET", f"/reviews/drink/{drink_id}", params=_listing_args())
 
 
 @app.route("/reviews", methods=["POST"])
@@ -193,38 +301,53 @@ def add_review():
         "tastes": tastes,
     }
 
-    res = requests.post(f'{app.config["DB_API_URL"]}/reviews', json=payload)
-    return res.json(), res.status_code
+    response = _proxy("POST", "/reviews", json=payload)
+    if response.status_code == 201:
+        response_cache.invalidate("ratings")
+    return response
 
 
 @app.route("/reviews", methods=["GET"])
 @jwt_required()
 def get_reviews():
     current_user = get_jwt_identity()
-    res = requests.get(
-        f'{app.config["DB_API_URL"]}/reviews',
+    return _proxy(
+        "GET",
+        "/reviews",
         json={"username": current_user},
+        params=_listing_args(),
     )
-    return res.json(), res.status_code
 
 
 @app.route("/reviews/<string:review_id>", methods=["DELETE"])
 @jwt_required()
 def delete_review(review_id):
     current_user = get_jwt_identity()
-    res = requests.delete(
-        f'{app.config["DB_API_URL"]}/reviews/{review_id}',
+    response = _proxy(
+        "DELETE",
+        f"/reviews/{review_id}",
         json={"username": current_user},
     )
-    return res.json(), res.status_code
+    if response.status_code == 200:
+        response_cache.invalidate("ratings")
+    return response
+
+@app.route("/admin/reviews/bulk", methods=["POST"])
+@admin_required
+def ingest_reviews():
+    # NDJSON, one {"username", "drink_id", "rating", "review", "tastes"} per line;
+    # streamed to the data layer as it arrives rather than buffered here
+    response = _proxy("POST", "/reviews/bulk", data=request.stream, headers={"Content-Type": NDJSON})
+    if response.status_code == 200:
+        response_cache.invalidate("ratings")
+    return response
 
 # -----------------------------
 # PRODUCER REVIEWS
 # -----------------------------
 @app.route("/reviews/producer/<string:producer_id>", methods=["GET"])
 def get_producer_reviews(producer_id):
-    res = requests.get(f'{app.config["DB_API_URL"]}/reviews/producer/{producer_id}')
-    return res.json(), res.status_code
+    return _proxy("GET", f"/reviews/producer/{producer_id}", params=_listing_args())
 
 
 @app.route("/producer-reviews", methods=["POST"])
@@ -248,41 +371,41 @@ def add_producer_review():
         "tastes": tastes,
     }
 
-    res = requests.post(f'{app.config["DB_API_URL"]}/producer-reviews', json=payload)
-    return res.json(), res.status_code
+    return _proxy("POST", "/producer-reviews", json=payload)
 
 
 @app.route("/producer-reviews", methods=["GET"])
 @jwt_required()
 def get_my_producer_reviews():
     current_user = get_jwt_identity()
-    res = requests.get(
-        f'{app.config["DB_API_URL"]}/producer-reviews',
+    return _proxy(
+        "GET",
+        "/producer-reviews",
         json={"username": current_user},
+        params=_listing_args(),
     )
-    return res.json(), res.status_code
 
 
 @app.route("/producer-reviews/<string:review_id>", methods=["DELETE"])
 @jwt_required()
 def delete_my_producer_review(review_id):
     current_user = get_jwt_identity()
-    res = requests.delete(
-        f'{app.config["DB_API_URL"]}/producer-reviews/{review_id}',
+    return _proxy(
+        "DELETE",
+        f"/producer-reviews/{review_id}",
         json={"username": current_user},
     )
-    return res.json(), res.status_code
 
 
 @app.route("/top-rated", methods=["GET"])
+@response_cache.cached("ratings", ttl=30)
 def get_top_rated():
     # passthrough query params
     query = request.query_string.decode("utf-8")
-    url = f'{app.config["DB_API_URL"]}/top-rated'
+    path = "/top-rated"
     if query:
-        url = f"{url}?{query}"
-    res = requests.get(url)
-    return res.json(), res.status_code
+        path = f"{path}?{query}"
+    return _proxy("GET", path)
 
 
 
@@ -293,11 +416,24 @@ def get_top_rated():
 @jwt_required()
 def profile_get():
     current_user = get_jwt_identity()
-    res = requests.get(
-        f'{app.config["DB_API_URL"]}/profile',
+    return _proxy(
+        "GET",
+        "/profile",
+        json={"username": current_user},
+    )
+
+
+@app.route("/dashboard", methods=["GET"])
+@jwt_required()
+def dashboard():
+    # profile, counts, recent reviews and favorites in one data-layer call
+    current_user = get_jwt_identity()
+    return _proxy(
+        "GET",
+        "/dashboard",
         json={"username": current_user},
+        params=request.args,
     )
-    return res.json(), res.status_code
 
 
 @app.route("/profile", methods=["PUT"])
@@ -310,8 +446,64 @@ def profile_put():
         "bio": data.get("bio"),
         "preferred_style": data.get("preferred_style"),
     }
-    res = requests.put(f'{app.config["DB_API_URL"]}/profile', json=payload)
-    return res.json(), res.status_code
+    return _proxy("PUT", "/profile", json=payload)
+
+
+# -----------------------------
+# BATCH
+# -----------------------------
+batch_pool = ThreadPoolExecutor(max_workers=BATCH_MAX_REQUESTS, thread_name_prefix="batch")
+
+
+def _run_subrequest(item, authorization):
+    """Dispatch one batch item through this app's own routes (decorators,
+    cache and all) and return (status, etag, mimetype, body bytes)."""
+    body = {"json": item["body"]} if item.get("body") is not None else {}
+    with app.test_request_context(
+        item["path"], method=item_method(item), headers=item_headers(item, authorization), **body
+    ):
+        try:
+            response = app.full_dispatch_request()
+        except Exception:
+            app.logger.exception("batch item %s %s failed", item_method(item), item["path"])
+            response = app.make_response((jsonify({"message": "Internal server error"}), 500))
+        data = response.get_data()
+        response.close()
+    return response.status_code, response.headers.get("ETag"), response.mimetype, data
+
+
+@app.route("/batch", methods=["POST"])
+@jwt_required(optional=True)
+def batch():
+    """Several route calls in one round trip, e.g.
+    {"requests": [{"path": "/profile"}, {"path": "/reviews"}, {"path": "/drinks?limit=20"}]}
+
+    The batch's Authorization header is handed to every sub-request, which
+    goes through full_dispatch_request(): its own @jwt_required verifies the
+    token again (an HS256 check, no round trip) and the request counters
+    see each item. The sub-requests run concurrently, so the batch takes
+    about as long as its slowest call. Each entry of "responses" has the
+    sub-request's own status (and ETag); the batch itself answers 200.
+    """
+    items, error = batch_items(request.get_json(silent=True) or {})
+    if error:
+        return jsonify({"message": error}), 400
+
+    authorization = request.headers.get("Authorization")
+    results = batch_pool.map(lambda item: _run_subrequest(item, authorization), items)
+    return Response(batch_body(results), mimetype="application/json")
+
+
+# -----------------------------
+# CACHE
+# -----------------------------
+@app.route("/cache/invalidate", methods=["POST"])
+@admin_required
+def invalidate_cache():
+    data = request.get_json() or {}
+    namespaces = data.get("namespaces") or ["catalog", "ratings"]
+    response_cache.invalidate(*namespaces)
+    return jsonify({"message": "Cache invalidated", "namespaces": namespaces}), 200
 
 
 if __name__ == "__main__":
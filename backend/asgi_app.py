@@ -0,0 +1,628 @@
+"""Async (ASGI) variant of the gateway in app.py.
+
+Serves the same routes, but every upstream call goes through pooled
+httpx.AsyncClients, so a worker is never blocked while the data layer
+answers. Run it with:
+
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+
+(or GATEWAY_MODE=async in the container).
+"""
+import asyncio
+import itertools
+import json
+import logging
+import os
+from contextlib import asynccontextmanager
+from functools import wraps
+from urllib.parse import urlencode
+
+import httpx
+import jwt
+from dotenv import load_dotenv
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, generate_latest
+from starlette.applications import Starlette
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from batch import batch_body, batch_items, item_headers, item_method
+from response_cache import (
+    CACHE_REQUESTS,
+    BodyCapture,
+    backend_from_env,
+    cache_headers,
+    cacheable,
+    pack_entry,
+    unpack_entry,
+)
+from upstream import CONNECT_TIMEOUT, GET_RETRIES, POOL_SIZE, READ_TIMEOUT
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+secret_key_file = "/app/secret_key.txt"
+with open(secret_key_file, "r") as file:
+    secret_key = file.read().strip()
+
+DB_API_URL = os.getenv("DB_API_URL", "http://data-layer-api:5000").rstrip("/")
+ADMIN_USERS = set(filter(None, os.getenv("ADMIN_USERS", "admin").split(",")))
+# passed through as query parameters rather than folded into the JSON query
+LISTING_ARGS = ("limit", "cursor", "format")
+# same forwarding rules as the sync gateway
+FORWARDED_REQUEST_HEADERS = ("If-None-Match", "Accept-Encoding")
+PASSTHROUGH_HEADERS = ("Content-Type", "Content-Encoding", "Content-Length", "ETag", "Cache-Control", "Vary")
+RELAY_CHUNK = 64 * 1024
+NDJSON = "application/x-ndjson"
+# a bulk import is answered once the data layer has written all of it
+INGEST_TIMEOUT = float(os.getenv("UPSTREAM_INGEST_TIMEOUT", "300"))
+
+REQUEST_COUNT = Counter(
+    "http_requests_total",
+    "Total HTTP requests",
+    ["method", "endpoint"],
+)
+
+# httpcore scans every pooled connection for every queued request, which
+# gets quadratic under thousands of in-flight requests; several small pools
+# used round-robin keep that scan short
+SHARD_SIZE = int(os.getenv("UPSTREAM_SHARD_SIZE", "16"))
+
+
+def _make_client(size):
+    # connection errors are retried before anything is sent, so retrying is
+    # safe for every method
+    return httpx.AsyncClient(
+        base_url=DB_API_URL,
+        timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+        transport=httpx.AsyncHTTPTransport(
+            retries=GET_RETRIES,
+            limits=httpx.Limits(max_connections=size, max_keepalive_connections=size),
+        ),
+    )
+
+
+clients = [_make_client(SHARD_SIZE) for _ in range(max(1, -(-POOL_SIZE // SHARD_SIZE)))]
+next_client = itertools.cycle(clients).__next__
+cache_backend = backend_from_env()
+
+
+async def cache_call(method, *args):
+    """Call a cache_backend method; with Redis the (sync) client runs in the
+    threadpool so a round trip never blocks the event loop."""
+    if cache_backend.blocking:
+        return await run_in_threadpool(method, *args)
+    return method(*args)
+
+
+async def upstream(method, path, payload=None, params=None, headers=None, **kwargs):
+    """Forward a request to the data layer and pass its answer straight back:
+    status, body bytes and PASSTHROUGH_HEADERS unchanged, nothing decoded.
+    Small bodies are read in one go; larger or chunked (streamed) ones are
+    relayed as they arrive. kwargs go to build_request (content=, timeout=)."""
+    client = next_client()
+    # without this httpx asks for gzip, which the client may not take
+    headers = {"Accept-Encoding": "identity", **(headers or {})}
+    req = client.build_request(method, path, json=payload, params=params, headers=headers, **kwargs)
+    res = await client.send(req, stream=True)
+    kept = {name: res.headers[name] for name in PASSTHROUGH_HEADERS if name in res.headers}
+    length = res.headers.get("Content-Length")
+    if length is not None and int(length) <= RELAY_CHUNK:
+        body = b"".join([chunk async for chunk in res.aiter_raw()])
+        await res.aclose()
+        return Response(body, status_code=res.status_code, headers=kept)
+    return StreamingResponse(
+        res.aiter_raw(RELAY_CHUNK),
+        status_code=res.status_code,
+        headers=kept,
+        background=BackgroundTask(res.aclose),
+    )
+
+
+async def tee_body(chunks, store):
+    """Async counterpart of response_cache.tee_body()."""
+    capture = BodyCapture()
+    async for chunk in chunks:
+        capture.add(chunk)
+        yield chunk
+    body = capture.body()
+    if body is not None:
+        await store(body)
+
+
+def forwarded_headers(request):
+    """Validators (so the data layer can answer 304) and accepted encodings."""
+    return {name: request.headers[name] for name in FORWARDED_REQUEST_HEADERS if name in request.headers}
+
+
+def query_from_args(request):
+    return {k: v for k, v in request.query_params.items() if k not in LISTING_ARGS}
+
+
+def listing_args(request):
+    return {k: request.query_params[k] for k in LISTING_ARGS if k in request.query_params}
+
+
+async def json_body(request):
+    try:
+        return await request.json() or {}
+    except ValueError:
+        return {}
+
+
+def bearer_claims(request):
+    """(claims, None) for a valid Bearer token, else (None, error response)."""
+    if "batch_claims" in request.scope:  # a /batch item: batch() already checked the token
+        return request.scope["batch_claims"], None
+    header = request.headers.get("Authorization", "")
+    if not header.startswith("Bearer "):
+        return None, JSONResponse({"msg": "Missing Authorization Header"}, status_code=401)
+    try:
+        return jwt.decode(header[len("Bearer "):], secret_key, algorithms=["HS256"]), None
+    except jwt.PyJWTError as e:
+        return None, JSONResponse({"msg": str(e)}, status_code=422)
+
+
+def jwt_required(handler):
+    """Same contract as flask_jwt_extended: Bearer token, identity in "sub"."""
+
+    @wraps(handler)
+    async def wrapper(request):
+        claims, error = bearer_claims(request)
+        if error:
+            return error
+        request.state.user = claims["sub"]
+        return await handler(request)
+
+    return wrapper
+
+
+def admin_required(handler):
+    @jwt_required
+    @wraps(handler)
+    async def wrapper(request):
+        if request.state.user not in ADMIN_USERS:
+            return JSONResponse({"message": "Admin access required"}, status_code=403)
+        return await handler(request)
+
+    return wrapper
+
+
+async def invalidate(*namespaces):
+    for namespace in namespaces:
+        await cache_call(cache_backend.incr, f"gen:{namespace}")
+
+
+def cached(namespace, ttl):
+    """Async counterpart of ResponseCache.cached(); same keys and backend."""
+
+    def decorator(handler):
+        route = handler.__name__
+
+        @wraps(handler)
+        async def wrapper(request):
+            generation = await cache_call(cache_backend.counter, f"gen:{namespace}")
+            query = urlencode(sorted(request.query_params.multi_items()))
+            key = f"{namespace}:{generation}:{request.url.path}?{query}"
+
+            value = await cache_call(cache_backend.get, key)
+            if value is not None:
+                CACHE_REQUESTS.labels(route, "hit").inc()
+                etag, body = unpack_entry(value)
+                if etag and etag in {t.strip() for t in request.headers.get("If-None-Match", "").split(",")}:
+                    return Response(status_code=304, headers=cache_headers(etag))
+                return Response(body, media_type="application/json", headers=cache_headers(etag))
+
+            CACHE_REQUESTS.labels(route, "miss").inc()
+            response = await handler(request)
+            mimetype = response.headers.get("Content-Type", "").split(";")[0].strip()
+            if cacheable(response.status_code, mimetype, response.headers):
+                etag = response.headers.get("ETag", "")
+
+                async def store(body):
+                    await cache_call(cache_backend.set, key, pack_entry(etag, body), ttl)
+
+                if isinstance(response, StreamingResponse):
+                    response.body_iterator = tee_body(response.body_iterator, store)
+                else:
+                    await store(response.body.decode("utf-8"))
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+@jwt_required
+async def protected(request):
+    return JSONResponse({"message": f"Welcome, {request.state.user}"})
+
+
+async def metrics(request):
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+# -----------------------------
+# DRINKS
+# -----------------------------
+@cached("catalog", ttl=300)
+async def get_drinks(request):
+    return await upstream("GET", "/drinks", query_from_args(request), listing_args(request), forwarded_headers(request))
+
+
+@cached("catalog", ttl=3600)
+async def get_drink_categories(request):
+    return await upstream("GET", "/drinks/categories", headers=forwarded_headers(request))
+
+
+@cached("catalog", ttl=300)
+async def search_drinks(request):
+    return await upstream("GET", "/drinks/search", params=request.query_params)
+
+
+@cached("catalog", ttl=300)
+async def get_drinks_faceted(request):
+    # repeated args (category=a&category=b) select several values
+    return await upstream("GET", "/drinks/faceted", params=request.query_params.multi_items())
+
+
+@cached("ratings", ttl=300)
+async def get_also_liked(request):
+    return await upstream(
+        "GET", f"/drinks/{request.path_params['drink_id']}/also-liked", params=request.query_params
+    )
+
+
+# -----------------------------
+# PRODUCERS
+# -----------------------------
+@cached("catalog", ttl=300)
+async def get_producers(request):
+    return await upstream("GET", "/producers", query_from_args(request), listing_args(request), forwarded_headers(request))
+
+
+# geo queries are keyed by arbitrary coordinates, so they are not cached
+async def get_producers_near(request):
+    return await upstream("GET", "/producers/near", params=request.query_params)
+
+
+async def get_producers_nearest(request):
+    return await upstream("GET", "/producers/nearest", params=request.query_params)
+
+
+async def get_producers_within(request):
+    return await upstream("GET", "/producers/within", params=request.query_params)
+
+
+@cached("catalog", ttl=300)
+async def get_producer(request):
+    return await upstream("GET", f"/producers/{request.path_params['producer_id']}", headers=forwarded_headers(request))
+
+
+# -----------------------------
+# FAVORITES
+# -----------------------------
+@jwt_required
+async def add_favourite(request):
+    data = await json_body(request)
+    drink_id = data.get("drink_id")
+    if not drink_id:
+        return JSONResponse({"message": "Missing drink_id"}, status_code=400)
+
+    return await upstream(
+        "POST", "/add_to_favorites", {"drink_id": str(drink_id), "username": request.state.user}
+    )
+
+
+@jwt_required
+async def get_favorites(request):
+    return await upstream("GET", "/get_favorites", {"username": request.state.user})
+
+
+@jwt_required
+async def delete_favourite(request):
+    data = await json_body(request)
+    drink_id = data.get("drink_id")
+    if not drink_id:
+        return JSONResponse({"message": "Missing drink_id"}, status_code=400)
+
+    return await upstream(
+        "DELETE", "/remove_from_favorites", {"drink_id": str(drink_id), "username": request.state.user}
+    )
+
+
+# -----------------------------
+# RECOMMENDATIONS
+# -----------------------------
+@jwt_required
+async def get_recommendations(request):
+    return await upstream(
+        "GET", "/recommendations", {"username": request.state.user}, dict(request.query_params)
+    )
+
+
+# -----------------------------
+# REVIEWS
+# -----------------------------
+async def get_drink_reviews(request):
+    return await upstream(
+        "GET", f"/reviews/drink/{request.path_params['drink_id']}", params=listing_args(request)
+    )
+
+
+@jwt_required
+async def add_review(request):
+    data = await json_body(request)
+    drink_id = data.get("drink_id")
+    rating = data.get("rating")
+    if not drink_id or rating is None:
+        return JSONResponse({"message": "Missing required fields"}, status_code=400)
+
+    payload = {
+        "drink_id": str(drink_id),
+        "username": request.state.user,
+        "rating": rating,
+        "review": data.get("review", ""),
+        "tastes": data.get("tastes", []),
+    }
+    response = await upstream("POST", "/reviews", payload)
+    if response.status_code == 201:
+        await invalidate("ratings")
+    return response
+
+
+@admin_required
+async def ingest_reviews(request):
+    # NDJSON, streamed to the data layer as it arrives rather than buffered here
+    response = await upstream(
+        "POST",
+        "/reviews/bulk",
+        headers={"Content-Type": NDJSON},
+        content=request.stream(),
+        timeout=httpx.Timeout(INGEST_TIMEOUT, connect=CONNECT_TIMEOUT),
+    )
+    if response.status_code == 200:
+        await invalidate("ratings")
+    return response
+
+
+@jwt_required
+async def get_reviews(request):
+    return await upstream("GET", "/reviews", {"username": request.state.user}, listing_args(request))
+
+
+@jwt_required
+async def delete_review(request):
+    response = await upstream(
+        "DELETE", f"/reviews/{request.path_params['review_id']}", {"username": request.state.user}
+    )
+    if response.status_code == 200:
+        await invalidate("ratings")
+    return response
+
+
+# -----------------------------
+# PRODUCER REVIEWS
+# -----------------------------
+async def get_producer_reviews(request):
+    return await upstream(
+        "GET", f"/reviews/producer/{request.path_params['producer_id']}", params=listing_args(request)
+    )
+
+
+@jwt_required
+async def add_producer_review(request):
+    data = await json_body(request)
+    producer_id = data.get("producer_id")
+    rating = data.get("rating")
+    if not producer_id or rating is None:
+        return JSONResponse({"message": "Missing required fields"}, status_code=400)
+
+    payload = {
+        "producer_id": str(producer_id),
+        "username": request.state.user,
+        "rating": rating,
+        "review": data.get("review", ""),
+        "tastes": data.get("tastes", []),
+    }
+    return await upstream("POST", "/producer-reviews", payload)
+
+
+@jwt_required
+async def get_my_producer_reviews(request):
+    return await upstream("GET", "/producer-reviews", {"username": request.state.user}, listing_args(request))
+
+
+@jwt_required
+async def delete_my_producer_review(request):
+    return await upstream(
+        "DELETE", f"/producer-reviews/{request.path_params['review_id']}", {"username": request.state.user}
+    )
+
+
+@cached("ratings", ttl=30)
+async def get_top_rated(request):
+    return await upstream("GET", "/top-rated", params=request.query_params, headers=forwarded_headers(request))
+
+
+# -----------------------------
+# PROFILE
+# -----------------------------
+@jwt_required
+async def profile_get(request):
+    return await upstream("GET", "/profile", {"username": request.state.user})
+
+
+@jwt_required
+async def dashboard(request):
+    return await upstream("GET", "/dashboard", {"username": request.state.user}, dict(request.query_params))
+
+
+@jwt_required
+async def profile_put(request):
+    data = await json_body(request)
+    payload = {
+        "username": request.state.user,
+        "bio": data.get("bio"),
+        "preferred_style": data.get("preferred_style"),
+    }
+    return await upstream("PUT", "/profile", payload)
+
+
+# -----------------------------
+# BATCH
+# -----------------------------
+async def run_subrequest(item, authorization, claims):
+    """Send one batch item through this app (routes, decorators and cache)
+    and return (status, etag, mimetype, body bytes)."""
+    path, _, query = item["path"].partition("?")
+    body = json.dumps(item["body"]).encode() if item.get("body") is not None else b""
+    headers = [(k.lower().encode(), v.encode()) for k, v in item_headers(item, authorization).items()]
+    if body:
+        headers.append((b"content-type", b"application/json"))
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": item_method(item),
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": headers,
+        "client": None,
+        "server": None,
+    }
+    if claims is not None:
+        scope["batch_claims"] = claims
+
+    started, chunks, pending, done = {}, [], [body], asyncio.Event()
+
+    async def receive():
+        if pending:
+            return {"type": "http.request", "body": pending.pop(), "more_body": False}
+        # streamed responses listen for a disconnect; it comes once they are done
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            started.update(status=message["status"], headers=dict(message.get("headers", [])))
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                done.set()
+
+    try:
+        await app(scope, receive, send)
+    except Exception:
+        logger.exception("batch item %s %s failed", item_method(item), item["path"])
+        if not started:
+            return 500, None, "application/json", b'{"message":"Internal server error"}'
+    headers = started.get("headers", {})
+    etag = headers.get(b"etag")
+    mimetype = headers.get(b"content-type", b"").split(b";")[0].strip().decode()
+    return started.get("status", 500), etag and etag.decode(), mimetype, b"".join(chunks)
+
+
+async def batch(request):
+    """Async counterpart of app.batch(): one token check, sub-requests
+    gathered concurrently, one combined response. The verified claims ride
+    along in each item's scope, so the items' jwt_required does not decode
+    the token again."""
+    authorization, claims = request.headers.get("Authorization"), None
+    if authorization:  # optional, as for the sync gateway; checked once for all items
+        claims, error = bearer_claims(request)
+        if error:
+            return error
+
+    items, error = batch_items(await json_body(request))
+    if error:
+        return JSONResponse({"message": error}, status_code=400)
+
+    results = await asyncio.gather(*(run_subrequest(item, authorization, claims) for item in items))
+    return Response(batch_body(results), media_type="application/json")
+
+
+# -----------------------------
+# CACHE
+# -----------------------------
+@admin_required
+async def invalidate_cache(request):
+    data = await json_body(request)
+    namespaces = data.get("namespaces") or ["catalog", "ratings"]
+    await invalidate(*namespaces)
+    return JSONResponse({"message": "Cache invalidated", "namespaces": namespaces})
+
+
+routes = [
+    Route("/protected", protected, methods=["GET"]),
+    Route("/metrics", metrics, methods=["GET"]),
+    Route("/drinks", get_drinks, methods=["GET"]),
+    Route("/drinks/categories", get_drink_categories, methods=["GET"]),
+    Route("/drinks/search", search_drinks, methods=["GET"]),
+    Route("/drinks/faceted", get_drinks_faceted, methods=["GET"]),
+    Route("/drinks/{drink_id}/also-liked", get_also_liked, methods=["GET"]),
+    Route("/producers", get_producers, methods=["GET"]),
+    Route("/producers/near", get_producers_near, methods=["GET"]),
+    Route("/producers/nearest", get_producers_nearest, methods=["GET"]),
+    Route("/producers/within", get_producers_within, methods=["GET"]),
+    Route("/producers/{producer_id}", get_producer, methods=["GET"]),
+    Route("/favorites", add_favourite, methods=["POST"]),
+    Route("/favorites", get_favorites, methods=["GET"]),
+    Route("/favorites", delete_favourite, methods=["DELETE"]),
+    Route("/recommendations", get_recommendations, methods=["GET"]),
+    Route("/reviews/drink/{drink_id}", get_drink_reviews, methods=["GET"]),
+    Route("/reviews", add_review, methods=["POST"]),
+    Route("/reviews", get_reviews, methods=["GET"]),
+    Route("/reviews/{review_id}", delete_review, methods=["DELETE"]),
+    Route("/admin/reviews/bulk", ingest_reviews, methods=["POST"]),
+    Route("/reviews/producer/{producer_id}", get_producer_reviews, methods=["GET"]),
+    Route("/producer-reviews", add_producer_review, methods=["POST"]),
+    Route("/producer-reviews", get_my_producer_reviews, methods=["GET"]),
+    Route("/producer-reviews/{review_id}", delete_my_producer_review, methods=["DELETE"]),
+    Route("/top-rated", get_top_rated, methods=["GET"]),
+    Route("/profile", profile_get, methods=["GET"]),
+    Route("/profile", profile_put, methods=["PUT"]),
+    Route("/dashboard", dashboard, methods=["GET"]),
+    Route("/batch", batch, methods=["POST"]),
+    Route("/cache/invalidate", invalidate_cache, methods=["POST"]),
+]
+
+
+class RequestCounter:
+    """Plain ASGI middleware, cheaper than BaseHTTPMiddleware on every request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            REQUEST_COUNT.labels(scope["method"], scope["path"]).inc()
+        await self.app(scope, receive, send)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    for client in clients:
+        await client.aclose()
+
+
+app = Starlette(
+    routes=routes,
+    middleware=[
+        Middleware(RequestCounter),
+        Middleware(
+            CORSMiddleware,
+            allow_origins=["http://localhost:30080"],
+            allow_headers=["Content-Type", "Authorization"],
+            allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+        ),
+    ],
+    lifespan=lifespan,
+)
@@ -0,0 +1,56 @@
+import json
+import os
+
+# Shared by the sync (app.py) and async (asgi_app.py) /batch endpoints.
+
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "20"))
+BATCH_METHODS = ("GET", "POST", "PUT", "DELETE")
+# headers a sub-request may set itself; Authorization always comes from the batch
+BATCH_ITEM_HEADERS = ("If-None-Match",)
+
+
+def batch_items(data):
+    """(items, None) for a valid {"requests": [...]} body, else (None, message)."""
+    items = data.get("requests") if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return None, "requests must be a non-empty list"
+    if len(items) > BATCH_MAX_REQUESTS:
+        return None, f"At most {BATCH_MAX_REQUESTS} requests per batch"
+    for item in items:
+        if not isinstance(item, dict) or not isinstance(item.get("path"), str) or not item["path"].startswith("/"):
+            return None, "Every request needs a path starting with /"
+        if item["path"].split("?", 1)[0].rstrip("/") == "/batch":
+            return None, "Batches cannot be nested"
+        if str(item.get("method", "GET")).upper() not in BATCH_METHODS:
+            return None, f"Unsupported method {item.get('method')}"
+    return items, None
+
+
+def item_method(item):
+    return str(item.get("method", "GET")).upper()
+
+
+def item_headers(item, authorization):
+    headers = {k: v for k, v in (item.get("headers") or {}).items() if k in BATCH_ITEM_HEADERS}
+    if authorization:
+        headers["Authorization"] = authorization
+    return headers
+
+
+def batch_entry(status, etag, mimetype, data):
+    """One {"status", "etag", "body"} entry, with JSON bodies spliced in as
+    they are rather than parsed and encoded again."""
+    data = data.strip()
+    if not data:
+        raw = b"null"
+    elif mimetype == "application/json":
+        raw = data
+    else:
+        raw = json.dumps(data.decode("utf-8", "replace")).encode()
+    head = {"status": status, "etag": etag} if etag else {"status": status}
+    return json.dumps(head, separators=(",", ":"))[:-1].encode() + b',"body":' + raw + b"}"
+
+
+def batch_body(results):
+    """The combined response body for (status, etag, mimetype, body) results."""
+    return b'{"responses":[' + b",".join(batch_entry(*result) for result in results) + b"]}"
@@ -0,0 +1,256 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import Response, request
+from prometheus_client import Counter
+
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL")
+# streamed listings larger than this are relayed but not cached
+CACHE_MAX_BODY = int(os.getenv("CACHE_MAX_BODY", str(8 * 1024 * 1024)))
+
+CACHE_REQUESTS = Counter(
+    "gateway_cache_requests_total",
+    "Gateway response cache lookups",
+    ["route", "result"],
+)
+
+
+class LRUBackend:
+    """Per-process, size-bounded LRU with a TTL on every entry."""
+
+    blocking = False  # no I/O: async callers may use it inline
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def counter(self, key):
+        return self._counters.get(key, 0)
+
+    def incr(self, key):
+        with self._lock:
+            # counters live outside the LRU so they are never evicted
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+
+class FakeRedis:
+    """Just enough of the redis-py client for RedisBackend, kept in memory.
+
+    Selected with CACHE_REDIS_URL=memory:// for local runs and tests.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            expires = time.monotonic() + ex if ex else None
+            self._data[key] = (expires, value.encode() if isinstance(value, str) else value)
+
+    def incr(self, key):
+        with self._lock:
+            _, value = self._data.get(key, (None, b"0"))
+            value = int(value) + 1
+            self._data[key] = (None, str(value).encode())
+            return value
+
+
+class RedisBackend:
+    """Shared cache for all workers and replicas; Redis handles TTL and eviction."""
+
+    blocking = True  # every call is a network round trip
+
+    def __init__(self, client, prefix="gateway-cache:"):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        if value is None:
+            return None
+        return value.decode() if isinstance(value, bytes) else value
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, value, ex=ttl)
+
+    def counter(self, key):
+        return int(self.client.get(self.prefix + key) or 0)
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + key)
+
+
+def pack_entry(etag, body):
+    """Cache value holding the upstream ETag (may be empty) and the JSON body."""
+    return f"{etag}\n{body}"
+
+
+def unpack_entry(value):
+    """(etag, body); entries written before ETags were kept are bare JSON."""
+    if value[:1] in ("{", "["):
+        return "", value
+    etag, _, body = value.partition("\n")
+    return etag, body
+
+
+class BodyCapture:
+    """Copy of a streamed body kept while it is relayed, dropped once it
+    grows past CACHE_MAX_BODY so a huge listing is never held whole."""
+
+    def __init__(self, limit=CACHE_MAX_BODY):
+        self.limit = limit
+        self.size = 0
+        self.parts = []
+
+    def add(self, chunk):
+        if self.parts is None:
+            return
+        self.size += len(chunk)
+        if self.size > self.limit:
+            self.parts = None
+        else:
+            self.parts.append(chunk)
+
+    def body(self):
+        return None if self.parts is None else b"".join(self.parts).decode("utf-8")
+
+
+def tee_body(chunks, store):
+    """Relay ``chunks`` unchanged; hand the whole body to ``store`` at the end
+    if it was small enough. A client that disconnects early stores nothing."""
+    capture = BodyCapture()
+    for chunk in chunks:
+        capture.add(chunk)
+        yield chunk
+    body = capture.body()
+    if body is not None:
+        store(body)
+
+
+def cacheable(status, mimetype, headers):
+    """Only plain (not content-encoded) JSON 200s are stored; hits are served as such."""
+    return status == 200 and mimetype == "application/json" and "Content-Encoding" not in headers
+
+
+def cache_headers(etag):
+    return {"ETag": etag, "Cache-Control": "no-cache"} if etag else {}
+
+
+def backend_from_env():
+    if not CACHE_REDIS_URL:
+        return LRUBackend()
+    if CACHE_REDIS_URL == "memory://":
+        return RedisBackend(FakeRedis())
+
+    import redis  # only needed when a shared cache is configured
+
+    return RedisBackend(redis.Redis.from_url(CACHE_REDIS_URL))
+
+
+class ResponseCache:
+    """Caches successful JSON proxy responses keyed on path + normalized query.
+
+    Entries belong to a namespace ("catalog", "ratings"). invalidate() bumps
+    the namespace generation, which is part of every key, so all older
+    entries stop matching at once (and then age out through TTL / LRU).
+
+    The upstream ETag is kept with the body, so a hit whose tag the client
+    already holds (If-None-Match) is answered with an empty 304.
+
+    Views return either (data, status[, headers]) or a Response passed
+    through from upstream; a streamed one is stored as it goes by (see
+    tee_body).
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or backend_from_env()
+
+    def _generation(self, namespace):
+        return self.backend.counter(f"gen:{namespace}")
+
+    def key(self, namespace):
+        query = urlencode(sorted(request.args.items(multi=True)))
+        return f"{namespace}:{self._generation(namespace)}:{request.path}?{query}"
+
+    def invalidate(self, *namespaces):
+        for namespace in namespaces:
+            self.backend.incr(f"gen:{namespace}")
+
+    def cached(self, namespace, ttl):
+        def decorator(view):
+            route = view.__name__
+
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                key = self.key(namespace)
+                value = self.backend.get(key)
+                if value is not None:
+                    CACHE_REQUESTS.labels(route, "hit").inc()
+                    etag, body = unpack_entry(value)
+                    if etag and request.if_none_match.contains_raw(etag):
+                        return Response(status=304, headers=cache_headers(etag))
+                    return Response(body, status=200, mimetype="application/json", headers=cache_headers(etag))
+
+                CACHE_REQUESTS.labels(route, "miss").inc()
+                result = view(*args, **kwargs)
+                if isinstance(result, Response):
+                    if cacheable(result.status_code, result.mimetype, result.headers):
+                        etag = result.headers.get("ETag", "")
+
+                        def store(body):
+                            self.backend.set(key, pack_entry(etag, body), ttl)
+
+                        if result.is_streamed:
+                            result.response = tee_body(result.response, store)
+                        else:
+                            store(result.get_data(as_text=True))
+                    return result
+                data, status = result[:2]
+                if status == 200:
+                    etag = result[2].get("ETag", "") if len(result) > 2 else ""
+                    self.backend.set(key, pack_entry(etag, json.dumps(data, separators=(",", ":"), sort_keys=True)), ttl)
+                return result
+
+            return wrapper
+
+        return decorator
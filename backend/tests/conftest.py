@@ -0,0 +1,112 @@
+import gzip
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+
+import jwt
+import pytest
+from flask import Flask, Response, jsonify, request
+from prometheus_client import REGISTRY
+from werkzeug.serving import make_server
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# a listing bigger than one relay chunk, so it is streamed through
+BIG = [{"id": f"producer_{n}", "name": "x" * 100} for n in range(1000)]
+ETAG = '"catalog-v1"'
+
+
+def data_layer():
+    """Stand-in for the data layer: canned answers, and a log of what it was asked."""
+    fake = Flask("fake_data_layer")
+    fake.calls = []
+
+    @fake.before_request
+    def log():
+        fake.calls.append((request.method, request.path, request.query_string.decode(), request.get_json(silent=True)))
+
+    @fake.get("/drinks")
+    def drinks():
+        if request.headers.get("If-None-Match") == ETAG:
+            return Response(status=304, headers={"ETag": ETAG})
+        return jsonify({"items": [{"id": "drink_1"}], "next_cursor": None}), 200, {"ETag": ETAG, "Cache-Control": "no-cache"}
+
+    @fake.get("/producers")
+    def producers():
+        body = json.dumps(BIG).encode()
+        chunks = (body[i:i + 10000] for i in range(0, len(body), 10000))
+        return Response(chunks, mimetype="application/json")
+
+    @fake.get("/drinks/categories")
+    def categories():
+        body = gzip.compress(b'["Ale","Lager"]')
+        return Response(body, mimetype="application/json", headers={"Content-Encoding": "gzip"})
+
+    @fake.get("/top-rated")
+    def top_rated():
+        return jsonify({"items": [], "calls": len(fake.calls)})
+
+    @fake.post("/reviews")
+    def add_review():
+        return jsonify({"message": "Review added successfully"}), 201
+
+    @fake.get("/profile")
+    def profile():
+        return jsonify({"username": request.get_json()["username"]})
+
+    @fake.get("/broken")
+    def broken():
+        return "upstream trouble", 502
+
+    return fake
+
+
+@pytest.fixture(scope="session")
+def upstream_app():
+    fake = data_layer()
+    server = make_server("127.0.0.1", 0, fake, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["DB_API_URL"] = f"http://127.0.0.1:{server.server_port}"
+    yield fake
+    server.shutdown()
+
+
+@pytest.fixture
+def calls(upstream_app):
+    """The data layer's request log, emptied for each test."""
+    upstream_app.calls.clear()
+    return upstream_app.calls
+
+
+def _import_gateway(name, other):
+    # both gateways register http_requests_total; only one runs per process in production
+    if other in sys.modules and name not in sys.modules:
+        REGISTRY.unregister(sys.modules[other].REQUEST_COUNT)
+    return importlib.import_module(name)
+
+
+@pytest.fixture(scope="session")
+def gateway(upstream_app):
+    return _import_gateway("app", "asgi_app")
+
+
+@pytest.fixture(scope="session")
+def asgi_gateway(upstream_app):
+    return _import_gateway("asgi_app", "app")
+
+
+def token(username, secret_path="/app/secret_key.txt"):
+    """An access token as the auth service issues them (flask_jwt_extended claims)."""
+    with open(secret_path) as f:
+        secret = f.read().strip()
+    now = int(time.time())
+    claims = {"sub": username, "type": "access", "fresh": False, "jti": f"{username}-{now}", "iat": now, "nbf": now, "exp": now + 600}
+    return jwt.encode(claims, secret, algorithm="HS256")
+
+
+@pytest.fixture(scope="session")
+def auth_header():
+    return lambda username="alice": {"Authorization": f"Bearer {token(username)}"}
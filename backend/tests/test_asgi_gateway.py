@@ -0,0 +1,109 @@
+"""The Starlette gateway (asgi_app.py) against the same stand-in data layer."""
+import gzip
+import json
+import threading
+
+import pytest
+from starlette.testclient import TestClient
+
+from conftest import BIG, ETAG
+
+
+@pytest.fixture(scope="module")
+def asgi_client(asgi_gateway):
+    with TestClient(asgi_gateway.app) as client:
+        yield client
+
+
+@pytest.fixture
+def client(asgi_gateway, asgi_client):
+    asgi_client.portal.call(asgi_gateway.invalidate, "catalog", "ratings")
+    return asgi_client
+
+
+def test_listing_is_cached_with_its_etag(client, calls):
+    first = client.get("/drinks?limit=2&category=Ale")
+    assert first.status_code == 200 and first.headers["ETag"] == ETAG
+    assert calls == [("GET", "/drinks", "limit=2", {"category": "Ale"})]
+
+    again = client.get("/drinks?category=Ale&limit=2")
+    assert again.content == first.content and again.headers["ETag"] == ETAG
+    revalidated = client.get("/drinks?limit=2&category=Ale", headers={"If-None-Match": ETAG})
+    assert revalidated.status_code == 304 and not revalidated.content
+    assert len(calls) == 1
+
+
+def test_review_write_invalidates_rankings(client, calls, auth_header):
+    client.get("/top-rated?limit=5")
+    client.get("/top-rated?limit=5")
+    assert len(calls) == 1
+
+    assert client.post("/reviews", json={"drink_id": "drink_1", "rating": 5}, headers=auth_header()).status_code == 201
+    client.get("/top-rated?limit=5")
+    assert [c[1] for c in calls] == ["/top-rated", "/reviews", "/top-rated"]
+
+
+def test_streamed_body_is_relayed_unchanged_and_cached(client, calls):
+    assert json.loads(client.get("/producers").content) == BIG
+    assert json.loads(client.get("/producers").content) == BIG
+    assert len(calls) == 1
+
+
+def test_encoded_body_is_relayed_but_not_cached(client, calls):
+    for _ in range(2):
+        with client.stream("GET", "/drinks/categories", headers={"Accept-Encoding": "gzip"}) as res:
+            assert res.headers["Content-Encoding"] == "gzip"
+            # the raw bytes are still the data layer's gzip stream
+            assert gzip.decompress(b"".join(res.iter_raw())) == b'["Ale","Lager"]'
+    assert len(calls) == 2
+
+
+def test_batch_checks_the_token_once(asgi_gateway, client, calls, auth_header, monkeypatch):
+    decoded = []
+    decode = asgi_gateway.jwt.decode
+    monkeypatch.setattr(asgi_gateway.jwt, "decode", lambda *a, **k: decoded.append(1) or decode(*a, **k))
+
+    body = {"requests": [
+        {"path": "/profile"},
+        {"path": "/drinks?limit=2"},
+        {"path": "/drinks?limit=2", "headers": {"If-None-Match": ETAG}},
+        {"path": "/reviews", "method": "POST", "body": {"drink_id": "drink_1", "rating": 4}},
+    ]}
+    res = client.post("/batch", json=body, headers=auth_header("bob"))
+    assert res.status_code == 200
+    responses = res.json()["responses"]
+    assert [r["status"] for r in responses] == [200, 200, 304, 201]
+    assert responses[0]["body"] == {"username": "bob"}
+    assert decoded == [1]
+
+
+def test_batch_with_a_bad_token_is_refused(client):
+    res = client.post("/batch", json={"requests": [{"path": "/profile"}]}, headers={"Authorization": "Bearer nope"})
+    assert res.status_code == 422
+    res = client.post("/batch", json={"requests": [{"path": "/profile"}, {"path": "/drinks?limit=1"}]})
+    assert [r["status"] for r in res.json()["responses"]] == [401, 200]
+
+
+def test_upstream_304_is_passed_through(client, calls):
+    res = client.get("/drinks?limit=3", headers={"If-None-Match": ETAG})
+    assert res.status_code == 304 and res.headers["ETag"] == ETAG
+    assert len(calls) == 1
+
+
+def test_blocking_cache_backend_runs_off_the_event_loop(asgi_gateway, client, calls, monkeypatch):
+    from response_cache import FakeRedis, RedisBackend
+
+    class Recording(FakeRedis):
+        threads = set()
+
+        def get(self, key):
+            self.threads.add(threading.current_thread().name)
+            return super().get(key)
+
+    monkeypatch.setattr(asgi_gateway, "cache_backend", RedisBackend(Recording()))
+    loop_thread = client.portal.call(lambda: threading.current_thread().name)
+
+    first = client.get("/drinks?limit=4")
+    assert client.get("/drinks?limit=4").content == first.content
+    assert len(calls) == 1
+    assert Recording.threads and loop_thread not in Recording.threads
@@ -0,0 +1,93 @@
+"""The Flask gateway (app.py) against a stand-in data layer."""
+import gzip
+import json
+
+import pytest
+
+from conftest import BIG, ETAG
+
+
+@pytest.fixture
+def client(gateway):
+    gateway.response_cache.invalidate("catalog", "ratings")
+    return gateway.app.test_client()
+
+
+def test_listing_is_cached_with_its_etag(client, calls):
+    first = client.get("/drinks?limit=2&category=Ale")
+    assert first.status_code == 200 and first.headers["ETag"] == ETAG
+    assert calls == [("GET", "/drinks", "limit=2", {"category": "Ale"})]
+
+    again = client.get("/drinks?category=Ale&limit=2")  # same query, other order
+    assert again.get_data() == first.get_data() and again.headers["ETag"] == ETAG
+    revalidated = client.get("/drinks?limit=2&category=Ale", headers={"If-None-Match": ETAG})
+    assert revalidated.status_code == 304 and not revalidated.get_data()
+    assert len(calls) == 1
+
+
+def test_upstream_304_is_passed_through(client, calls):
+    res = client.get("/drinks?limit=3", headers={"If-None-Match": ETAG})
+    assert res.status_code == 304 and res.headers["ETag"] == ETAG
+    assert len(calls) == 1
+
+
+def test_review_write_invalidates_rankings(client, calls, auth_header):
+    client.get("/top-rated?limit=5")
+    client.get("/top-rated?limit=5")
+    assert len(calls) == 1
+
+    res = client.post("/reviews", json={"drink_id": "drink_1", "rating": 5}, headers=auth_header())
+    assert res.status_code == 201
+    client.get("/top-rated?limit=5")
+    assert [c[1] for c in calls] == ["/top-rated", "/reviews", "/top-rated"]
+
+
+def test_streamed_body_is_relayed_unchanged_and_cached(client, calls):
+    res = client.get("/producers")
+    assert res.status_code == 200 and res.is_streamed
+    assert json.loads(res.get_data()) == BIG
+    res.close()
+
+    cached = client.get("/producers")
+    assert json.loads(cached.get_data()) == BIG
+    assert len(calls) == 1
+
+
+def test_encoded_body_is_relayed_but_not_cached(client, calls):
+    for _ in range(2):
+        res = client.get("/drinks/categories", headers={"Accept-Encoding": "gzip"})
+        assert res.headers["Content-Encoding"] == "gzip"
+        assert json.loads(gzip.decompress(res.get_data())) == ["Ale", "Lager"]
+    assert len(calls) == 2
+
+
+def test_batch_runs_each_item_with_the_batch_token(client, calls, auth_header):
+    body = {"requests": [
+        {"path": "/profile"},
+        {"path": "/drinks?limit=2"},
+        {"path": "/drinks?limit=2", "headers": {"If-None-Match": ETAG, "Authorization": "Bearer forged"}},
+        {"path": "/reviews", "method": "POST", "body": {"drink_id": "drink_1", "rating": 4}},
+    ]}
+    res = client.post("/batch", json=body, headers=auth_header("bob"))
+    assert res.status_code == 200
+    responses = res.get_json()["responses"]
+    assert [r["status"] for r in responses] == [200, 200, 304, 201]
+    assert responses[0]["body"] == {"username": "bob"}
+    assert responses[1]["etag"] == ETAG and responses[1]["body"]["items"] == [{"id": "drink_1"}]
+
+
+def test_batch_items_without_a_token_are_refused_one_by_one(client):
+    res = client.post("/batch", json={"requests": [{"path": "/profile"}, {"path": "/drinks?limit=1"}]})
+    assert [r["status"] for r in res.get_json()["responses"]] == [401, 200]
+
+
+@pytest.mark.parametrize("body", [
+    {},
+    {"requests": []},
+    {"requests": [{"path": "no-slash"}]},
+    {"requests": [{"path": "/batch"}]},
+    {"requests": [{"path": "/drinks", "method": "PATCH"}]},
+    {"requests": [{"path": "/drinks"}] * 21},
+])
+def test_malformed_batches_are_rejected(client, body):
+    assert client.post("/batch", json=body).status_code == 400
@@ -0,0 +1,82 @@
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Identical copies live in auth/ and backend/ because each service image only
+# ships its own folder; change both together.
+
+POOL_SIZE = int(os.getenv("UPSTREAM_POOL_SIZE", "20"))
+CONNECT_TIMEOUT = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", "0.5"))
+READ_TIMEOUT = float(os.getenv("UPSTREAM_READ_TIMEOUT", "5"))
+GET_RETRIES = int(os.getenv("UPSTREAM_GET_RETRIES", "2"))
+
+
+class UpstreamClient:
+    """Keep-alive HTTP client for calls to one upstream service.
+
+    Each process gets its own requests.Session (and so its own connection
+    pool); the session is recreated after a fork so prefork servers never
+    share sockets. GETs are retried on connection errors and 502/503/504,
+    other methods are never retried.
+    """
+
+    def __init__(self, base_url, pool_size=POOL_SIZE, retries=GET_RETRIES, route_timeouts=None):
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self.retries = retries
+        self.route_timeouts = route_timeouts or {}
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _build_session(self):
+        retry = Retry(
+            total=self.retries,
+            connect=self.retries,
+            read=self.retries,
+            status=self.retries,
+            backoff_factor=0.05,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({"GET"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry, pool_block=True)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    @property
+    def session(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._session = self._build_session()
+                    self._pid = os.getpid()
+        return self._session
+
+    def timeout_for(self, path):
+        for prefix, timeout in self.route_timeouts.items():
+            if path == prefix or path.startswith(prefix + "/"):
+                return timeout
+        return (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+    def request(self, method, path, timeout=None, **kwargs):
+        if timeout is None:
+            timeout = self.timeout_for(path)
+        return self.session.request(method, f"{self.base_url}{path}", timeout=timeout, **kwargs)
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request("PUT", path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request("DELETE", path, **kwargs)
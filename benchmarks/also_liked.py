@@ -0,0 +1,76 @@
+"""Refresh time, memory and per-request latency of AlsoLikedModel.
+
+Generates synthetic reviews with Zipf-distributed drink popularity (no Mongo
+needed); only the liked ones (rating >= 4) end up in the model:
+
+    python benchmarks/also_liked.py --reviews 1000000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "database"))
+from collaborative import AlsoLikedModel  # noqa: E402
+from recommender import LIKED_RATING  # noqa: E402
+
+
+def synthetic_likes(reviews, users, drinks, seed=1):
+    rng = np.random.default_rng(seed)
+    user_ids = rng.integers(0, users, reviews)
+    drink_ids = np.minimum(rng.zipf(1.3, reviews), drinks) - 1
+    ratings = rng.integers(1, 6, reviews)
+    liked = ratings >= LIKED_RATING
+    return [(f"user_{u}", f"drink_{d}") for u, d in zip(user_ids[liked], drink_ids[liked])]
+
+
+def matrix_bytes(m):
+    return m.data.nbytes + m.indices.nbytes + m.indptr.nbytes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reviews", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--drinks", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    likes = synthetic_likes(args.reviews, args.users, args.drinks)
+    model = AlsoLikedModel()
+
+    start = time.perf_counter()
+    model.build(likes)
+    refresh = time.perf_counter() - start
+    matrices = matrix_bytes(model.by_user) + matrix_bytes(model.by_drink) + model.likes.nbytes
+    print(
+        f"{args.reviews} reviews ({len(likes)} likes, {len(model.user_index)} users, "
+        f"{len(model.drink_ids)} drinks): refresh {refresh:.2f}s, matrices {matrices / 1e6:.1f} MB "
+        f"({matrices / len(likes):.1f} B/like)"
+    )
+
+    rng = np.random.default_rng(2)
+    for label, pool in (("random drink", model.drink_ids), ("top-100 drink", model.drink_ids[:100])):
+        latencies = []
+        for _ in range(args.queries):
+            drink_id = pool[rng.integers(0, len(pool))]
+            start = time.perf_counter()
+            model.also_liked(drink_id, limit=10)
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        print(
+            f"also_liked ({label}): p50={statistics.median(latencies) * 1000:.2f}ms "
+            f"p99={latencies[int(len(latencies) * 0.99) - 1] * 1000:.2f}ms"
+        )
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        model.note_review(f"user_{rng.integers(0, args.users)}", model.drink_ids[rng.integers(0, 1000)], 5)
+    print(f"note_review: {(time.perf_counter() - start):.3f}ms avg")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Cold start and memory of N data-layer workers: JSON + heap copy vs mmap snapshot.
+
+Writes a synthetic catalog both as a JSON seed file and as a catalog
+snapshot, then starts N worker processes per mode. A "json" worker parses
+the seed file and builds its own CatalogStore tables; a "snapshot" worker
+maps the snapshot and reads every page once. While all N are alive each
+reports RSS and PSS (shared pages divided between the processes mapping
+them), after subtracting what the interpreter and imports already used:
+
+    python benchmarks/catalog_snapshot.py --drinks 100000 --workers 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "database"))
+from catalog import INDEXED, Snapshot, Table, write_snapshot  # noqa: E402
+from catalog_store import synthetic_catalog  # noqa: E402
+
+
+def memory_kb():
+    with open("/proc/self/smaps_rollup") as f:
+        fields = dict(line.split(":", 1) for line in f if ":" in line)
+    return int(fields["Rss"].split()[0]), int(fields["Pss"].split()[0])
+
+
+def worker(mode, path):
+    base = memory_kb()
+    start = time.perf_counter()
+    if mode == "json":
+        with open(path, encoding="utf-8") as f:
+            docs = json.load(f)
+        tables = {"drinks": Table(docs["drinks"], INDEXED["drinks"]), "producers": Table(docs["producers"], INDEXED["producers"])}
+        del docs
+    else:
+        snapshot = Snapshot(path)
+        tables = snapshot.tables
+        for values in snapshot.arrays.values():
+            int(values.view("u1").sum())  # fault every page in
+    cold = time.perf_counter() - start
+    print(f"ready {cold}", flush=True)
+    sys.stdin.readline()  # measure while every worker is alive
+    rss, pss = memory_kb()
+    print(f"{rss - base[0]} {pss - base[1]}", flush=True)
+    return tables
+
+
+def run(mode, path, workers):
+    procs = [
+        subprocess.Popen([sys.executable, __file__, "--worker", mode, path], stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        for _ in range(workers)
+    ]
+    cold = [float(p.stdout.readline().split()[1]) for p in procs]
+    for p in procs:
+        p.stdin.write("go\n")
+        p.stdin.flush()
+    memory = [tuple(int(x) for x in p.stdout.readline().split()) for p in procs]
+    for p in procs:
+        p.wait()
+    return cold, memory
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--drinks", type=int, default=100000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--worker", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        worker(*args.worker)
+        return
+
+    drinks, producers = synthetic_catalog(args.drinks)
+    with tempfile.TemporaryDirectory() as tmp:
+        seed, snapshot = os.path.join(tmp, "catalog.json"), os.path.join(tmp, "catalog.snap")
+        with open(seed, "w", encoding="utf-8") as f:
+            json.dump({"drinks": drinks, "producers": producers}, f)
+        start = time.perf_counter()
+        write_snapshot(snapshot, 1, {"drinks": drinks, "producers": producers})
+        print(
+            f"{args.drinks} drinks: JSON {os.path.getsize(seed) / 1e6:.0f} MB, snapshot "
+            f"{os.path.getsize(snapshot) / 1e6:.0f} MB (written in {time.perf_counter() - start:.1f}s)"
+        )
+
+        for mode, path in (("json", seed), ("snapshot", snapshot)):
+            cold, memory = run(mode, path, args.workers)
+            rss = sum(m[0] for m in memory) / len(memory) / 1024
+            pss = sum(m[1] for m in memory) / len(memory) / 1024
+            print(
+                f"{mode:8} x{args.workers}: cold start {min(cold) * 1000:.0f}-{max(cold) * 1000:.0f} ms, "
+                f"per worker RSS {rss:.0f} MB, PSS {pss:.0f} MB, total PSS {pss * args.workers:.0f} MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
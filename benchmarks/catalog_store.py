@@ -0,0 +1,146 @@
+"""Memory and read latency of the in-process CatalogStore.
+
+Generates a synthetic catalog, loads it into the store and compares its
+footprint with the same documents kept as plain dicts, then times the
+catalog reads the data layer serves from it. With --mongo the same reads
+are also timed against a scratch database through find_page(), the path
+the endpoints used before. --snapshot reads from a mapped snapshot file
+instead of the heap copy:
+
+    python benchmarks/catalog_store.py --drinks 100000
+    python benchmarks/catalog_store.py --drinks 100000 --snapshot
+    python benchmarks/catalog_store.py --drinks 100000 --mongo mongodb://localhost:27017/catalog_bench
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from pymongo import ASCENDING, MongoClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "database"))
+from catalog import CatalogStore, Snapshot, write_snapshot  # noqa: E402
+from pagination import find_page  # noqa: E402
+
+PRODUCERS = 5000
+
+
+def synthetic_catalog(n, seed=1):
+    rng = random.Random(seed)
+    drinks = [
+        {
+            "id": f"drink_{i}",
+            "name": f"Drink {i}",
+            "category": f"category {rng.randrange(12)}",
+            "style": f"style {rng.randrange(120)}",
+            "drinkType": rng.choice(("beer", "wine", "spirit")),
+            "producerId": f"producer_{rng.randrange(PRODUCERS)}",
+            "abv": round(rng.uniform(3, 40), 1),
+            "ibu": rng.randrange(5, 100),
+            "tags": [f"tag {rng.randrange(300)}"],
+            "description": f"Description of drink {i}.",
+            "lastModified": "2024-01-01T00:00:00",
+        }
+        for i in range(n)
+    ]
+    producers = [
+        {"id": f"producer_{i}", "name": f"Producer {i}", "country": f"country {i % 60}", "city": f"city {i % 900}"}
+        for i in range(PRODUCERS)
+    ]
+    return drinks, producers
+
+
+def measure(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    value = build()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return value, used
+
+
+def timed(fn, queries):
+    latencies = []
+    for i in range(queries):
+        start = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return statistics.median(latencies) * 1000, latencies[int(len(latencies) * 0.99) - 1] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--drinks", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--mongo", help="scratch database URI to compare against")
+    parser.add_argument("--snapshot", action="store_true", help="read from a mapped snapshot")
+    args = parser.parse_args()
+
+    drinks, producers = synthetic_catalog(args.drinks)
+    if args.snapshot:
+        path = os.path.join(tempfile.mkdtemp(), "catalog.snap")
+        write_snapshot(path, 1, {"drinks": drinks, "producers": producers})
+        store = CatalogStore()
+        store._use(Snapshot(path).tables, 1)
+        print(f"{args.drinks} drinks: snapshot {os.path.getsize(path) / 1e6:.0f} MB, mapped")
+    else:
+        # the store reads from a Mongo cursor, so build it from fresh copies
+        _, dicts = measure(lambda: [dict(d) for d in drinks])
+        store, stored = measure(lambda: _loaded([dict(d) for d in drinks], producers))
+        print(
+            f"{args.drinks} drinks: plain dicts {dicts / 1e6:.0f} MB, store {stored / 1e6:.0f} MB "
+            f"(incl. indexes; {stored / args.drinks:.0f} B/drink)"
+        )
+
+    rng = random.Random(2)
+    ids = [f"drink_{rng.randrange(args.drinks)}" for _ in range(args.queries)]
+    cursors = [[i] for i in sorted(ids)]
+    workloads = {
+        "/drinks?limit=20": (lambda i: store.find("drinks", {}, (20, None)),
+                             lambda c, i: find_page(c["drinks"], {}, [("id", ASCENDING)], (20, None), {"_id": 0})),
+        "/drinks?limit=20&cursor=": (lambda i: store.find("drinks", {}, (20, cursors[i])),
+                                     lambda c, i: find_page(c["drinks"], {}, [("id", ASCENDING)], (20, cursors[i]), {"_id": 0})),
+        "category, limit=20": (lambda i: store.find("drinks", {"category": f"category {i % 12}"}, (20, None)),
+                               lambda c, i: find_page(c["drinks"], {"category": f"category {i % 12}"}, [("id", ASCENDING)], (20, None), {"_id": 0})),
+        "20 favorites ($in)": (lambda i: store.drinks_by_ids(ids[i:i + 20]),
+                               lambda c, i: list(c["drinks"].find({"id": {"$in": ids[i:i + 20]}}, {"_id": 0}))),
+        "/producers/<id>": (lambda i: store.producer(f"producer_{i % PRODUCERS}"),
+                            lambda c, i: c["producers"].find_one({"id": f"producer_{i % PRODUCERS}"}, {"_id": 0})),
+        "/drinks/categories": (lambda i: store.categories(),
+                               lambda c, i: c["drinks"].distinct("category")),
+    }
+
+    db = None
+    if args.mongo:
+        db = MongoClient(args.mongo).get_default_database()
+        db["drinks"].drop()
+        db["producers"].drop()
+        for start in range(0, len(drinks), 10000):
+            db["drinks"].insert_many([dict(d) for d in drinks[start:start + 10000]])
+        db["producers"].insert_many([dict(p) for p in producers])
+        for field in ("id", "category", "producerId"):
+            db["drinks"].create_index(field)
+        db["producers"].create_index("id")
+
+    for name, (in_memory, mongo) in workloads.items():
+        p50, p99 = timed(in_memory, args.queries)
+        line = f"{name:28} store p50 {p50:7.3f} ms  p99 {p99:7.3f} ms"
+        if db is not None:
+            p50, p99 = timed(lambda i: mongo(db, i), args.queries)
+            line += f"  | mongo p50 {p50:7.3f} ms  p99 {p99:7.3f} ms"
+        print(line)
+
+
+def _loaded(drinks, producers):
+    store = CatalogStore()
+    store.load(drinks, producers, version=1)
+    return store
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Mongo commands and latency to render a profile: four calls vs /dashboard.
+
+Seeds a scratch database with users holding --reviews drink reviews (and a
+tenth as many producer reviews and favorites), then renders each user's
+profile the old way (/profile, /reviews, /producer-reviews,
+/get_favorites) and through /dashboard, calling the data layer in
+process. Every command the app sends to Mongo is counted with a pymongo
+command listener:
+
+    python benchmarks/dashboard.py --mongo mongodb://localhost:27017/dashboard_bench --reviews 5000
+
+The scratch database is dropped first; do not point this at real data.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+
+from pymongo import monitoring
+
+LEGACY = ["/profile", "/reviews", "/producer-reviews", "/get_favorites"]
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.commands = Counter()
+
+    def started(self, event):
+        self.commands[event.command_name] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def seed(dbapp, users, reviews):
+    drink_ids = list(dict.fromkeys(d["id"] for d in dbapp.drinks_collection.find({}, {"id": 1})))
+    producer_ids = list(dict.fromkeys(p["id"] for p in dbapp.producers_collection.find({}, {"id": 1})))
+    for n in range(users):
+        username = f"bench_{n}"
+        user_id = dbapp.users_collection.insert_one({"username": username, "password": "x", "bio": ""}).inserted_id
+        dbapp.reviews_collection.insert_many(
+            [
+                # the newest reviews (shown on the dashboard) are of catalog drinks
+                {"drink_id": drink_ids[i] if i < len(drink_ids) else f"bench_{i}", "rating": 4, "review": "ok",
+                 "tastes": ["malty"], "user_id": user_id, "username": username}
+                for i in reversed(range(reviews))
+            ]
+        )
+        producer_reviews = dbapp.producer_reviews_collection.insert_many(
+            [
+                {"producer_id": producer_ids[i % len(producer_ids)], "rating": 5, "review": "ok", "tastes": [],
+                 "user_id": user_id, "username": username}
+                for i in range(max(1, min(reviews // 10, len(producer_ids))))
+            ]
+        ).inserted_ids
+        favorites = [{"user_id": user_id, "drink_id": d} for d in drink_ids[: max(1, reviews // 10)]]
+        dbapp.favorites_collection.insert_many(favorites)
+        dbapp.users_collection.update_one(
+            {"_id": user_id},
+            {"$set": {"review_count": reviews, "producer_review_count": len(producer_reviews),
+                      "favorite_count": len(favorites)}},
+        )
+
+
+def render(client, counter, paths, username, rounds):
+    latencies, commands = [], Counter()
+    for _ in range(rounds):
+        before = counter.commands.copy()
+        start = time.perf_counter()
+        for path in paths:
+            res = client.get(path, json={"username": username})
+            assert res.status_code == 200, (path, res.status_code, res.get_data()[:200])
+            res.get_data()
+        latencies.append(time.perf_counter() - start)
+        commands = counter.commands - before
+    return statistics.median(latencies) * 1000, commands
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mongo", required=True, help="scratch database URI, dropped first")
+    parser.add_argument("--reviews", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=3)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    counter = CommandCounter()
+    monitoring.register(counter)  # before the app creates its client
+
+    from pymongo import MongoClient
+
+    MongoClient(args.mongo).drop_database(args.mongo.rsplit("/", 1)[-1].split("?", 1)[0])
+    os.environ["MONGODB_HOST"] = args.mongo
+    os.environ.setdefault("CATALOG_SNAPSHOT", "")
+    database = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "database")
+    sys.path.insert(0, database)
+    import app as dbapp
+
+    seed(dbapp, args.users, args.reviews)
+    client = dbapp.app.test_client()
+    client.get("/dashboard", json={"username": "bench_0"})  # warm the catalog store
+
+    for name, paths in (("4 calls", LEGACY), ("/dashboard", ["/dashboard"])):
+        results = [render(client, counter, paths, f"bench_{n}", args.rounds) for n in range(args.users)]
+        latency = statistics.median(r[0] for r in results)
+        commands = results[-1][1]
+        detail = ", ".join(f"{k} {v}" for k, v in sorted(commands.items()))
+        print(f"{name:11} {args.reviews} reviews: p50 {latency:7.2f} ms, {sum(commands.values())} commands ({detail})")
+
+
+if __name__ == "__main__":
+    main()
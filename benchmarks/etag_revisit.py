@@ -0,0 +1,79 @@
+"""Bytes on the wire and server CPU per revisit, with and without ETags.
+
+Fetches each endpoint once, then revisits it --requests times the old way
+(plain GET, full body every time) and the new way (If-None-Match with the
+ETag from the first response, 304 when nothing changed). Server CPU is
+read from /proc for the given local process ids (gateway, data layer):
+
+    python benchmarks/etag_revisit.py --base http://localhost:5000 --pid 1234 --pid 5678
+
+--data-layer sends the empty JSON body the gateway sends, for pointing
+--base straight at the data layer (what a gateway cache miss costs).
+"""
+import argparse
+import os
+import statistics
+import time
+
+import requests
+
+ENDPOINTS = ["/drinks", "/drinks?limit=20", "/drinks/categories", "/producers", "/top-rated"]
+
+
+def cpu_seconds(pids):
+    ticks = os.sysconf("SC_CLK_TCK")
+    total = 0
+    for pid in pids:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        total += int(fields[11]) + int(fields[12])  # utime + stime
+    return total / ticks
+
+
+def wire_bytes(res):
+    head = sum(len(k) + len(v) + 4 for k, v in res.headers.items()) + len("HTTP/1.1 200 OK\r\n\r\n")
+    return head + len(res.content)
+
+
+def revisit(session, url, headers, count, pids, body):
+    sizes, latencies = [], []
+    cpu = cpu_seconds(pids)
+    for _ in range(count):
+        start = time.perf_counter()
+        res = session.get(url, headers=headers, json=body)
+        latencies.append(time.perf_counter() - start)
+        sizes.append(wire_bytes(res))
+    cpu = cpu_seconds(pids) - cpu
+    return res.status_code, statistics.mean(sizes), statistics.median(latencies) * 1000, cpu / count * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base", default="http://localhost:5000")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--pid", type=int, action="append", default=[], help="server process to charge CPU to")
+    parser.add_argument("--data-layer", action="store_true")
+    args = parser.parse_args()
+    body = {} if args.data_layer else None
+
+    session = requests.Session()
+    for path in ENDPOINTS:
+        url = args.base.rstrip("/") + path
+        first = session.get(url, json=body)
+        etag = first.headers.get("ETag")
+        plain = revisit(session, url, {}, args.requests, args.pid, body)
+        line = f"{path:20} plain {plain[0]} {plain[1]:9.0f} B p50 {plain[2]:6.2f} ms"
+        if args.pid:
+            line += f" cpu {plain[3]:6.3f} ms"
+        if etag:
+            cond = revisit(session, url, {"If-None-Match": etag}, args.requests, args.pid, body)
+            line += f" | If-None-Match {cond[0]} {cond[1]:6.0f} B p50 {cond[2]:6.2f} ms"
+            if args.pid:
+                line += f" cpu {cond[3]:6.3f} ms"
+        else:
+            line += " | no ETag"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Build time, memory and query latency of the drink FacetIndex.
+
+Generates a synthetic catalog (no Mongo needed):
+
+    python benchmarks/facets.py --drinks 1000000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "database"))
+from facets import FacetIndex  # noqa: E402
+
+
+def synthetic_catalog(n, seed=1):
+    rng = np.random.default_rng(seed)
+    categories = rng.integers(0, 12, n)
+    styles = rng.integers(0, 120, n)
+    types = rng.integers(0, 3, n)
+    producers = rng.integers(0, 5000, n)
+    abv = rng.uniform(3, 40, n).round(1)
+    ibu = rng.integers(5, 100, n)
+    drinks = [
+        {
+            "id": f"drink_{i}",
+            "category": f"category {categories[i]}",
+            "style": f"style {styles[i]}",
+            "drinkType": ("beer", "wine", "spirit")[types[i]],
+            "producerId": f"producer_{producers[i]}",
+            "abv": float(abv[i]),
+            "ibu": int(ibu[i]) if i % 3 else None,
+        }
+        for i in range(n)
+    ]
+    countries = {f"producer_{i}": f"country {i % 60}" for i in range(5000)}
+    return drinks, countries
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--drinks", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+
+    drinks, countries = synthetic_catalog(args.drinks)
+    index = FacetIndex()
+    start = time.perf_counter()
+    index.build(drinks, countries)
+    build = time.perf_counter() - start
+    columns = sum(c.nbytes for c in index.codes.values()) + sum(c.nbytes for c in index.numbers.values())
+    print(f"{args.drinks} drinks: build {build:.1f}s, columns {columns / 1e6:.0f} MB")
+
+    rng = np.random.default_rng(2)
+    workloads = {
+        "no filter": lambda: ({}, {}),
+        "one category": lambda: ({"category": [f"category {rng.integers(0, 12)}"]}, {}),
+        "category + style + abv": lambda: (
+            {"category": [f"category {rng.integers(0, 12)}"], "style": [f"style {rng.integers(0, 120)}"]},
+            {"abv": (4, 6)},
+        ),
+        "4 fields, multi-select": lambda: (
+            {
+                "category": [f"category {c}" for c in rng.integers(0, 12, 3)],
+                "drinkType": ["beer", "wine"],
+                "country": [f"country {c}" for c in rng.integers(0, 60, 5)],
+            },
+            {"ibu": (20, 60)},
+        ),
+    }
+    for label, make in workloads.items():
+        latencies = []
+        for _ in range(args.queries):
+            selected, ranges = make()
+            start = time.perf_counter()
+            index.query(selected, ranges, limit=20)
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        print(
+            f"{label:<24} p50={statistics.median(latencies) * 1000:.1f}ms "
+            f"p99={latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
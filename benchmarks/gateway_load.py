@@ -0,0 +1,142 @@
+"""Load test for the sync (Flask) and async (ASGI) gateways.
+
+1. Start a stub data layer that answers every request after --delay seconds:
+
+       python benchmarks/gateway_load.py upstream --port 5051 --delay 0.05
+
+2. Start the gateway under test against it, e.g. from backend/:
+
+       DB_API_URL=http://127.0.0.1:5051 python -m flask run --port 5000
+       DB_API_URL=http://127.0.0.1:5051 uvicorn asgi_app:app --port 5001
+
+3. Drive it:
+
+       python benchmarks/gateway_load.py load --url http://127.0.0.1:5001/drinks/categories \
+           --requests 20000 --concurrency 2000
+
+Use an uncached route (e.g. /reviews/drink/<id>) to measure the proxy path
+rather than the response cache.
+"""
+import argparse
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+BODY = b'[{"id": "drink_1", "name": "Hocus Pocus"}]'
+
+
+async def serve_upstream(port, delay):
+    async def handle(reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                if length:
+                    await reader.readexactly(length)
+                await asyncio.sleep(delay)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + f"Content-Length: {len(BODY)}\r\n\r\n".encode()
+                    + BODY
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", port, backlog=4096)
+    print(f"stub data layer on :{port}, delay {delay * 1000:.0f}ms")
+    async with server:
+        await server.serve_forever()
+
+
+async def read_response(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    keep_alive = head.startswith(b"HTTP/1.1")
+    length = None
+    for line in head.split(b"\r\n"):
+        lower = line.lower()
+        if lower.startswith(b"content-length:"):
+            length = int(line.split(b":", 1)[1])
+        elif lower.startswith(b"connection:") and b"close" in lower:
+            keep_alive = False
+    if length is None:
+        await reader.read()  # body runs until the server closes the socket
+        keep_alive = False
+    elif length:
+        await reader.readexactly(length)
+    return status, keep_alive
+
+
+async def load(url, total, concurrency, token=None):
+    # raw keep-alive HTTP/1.1 so the client is not the bottleneck
+    parts = urlsplit(url)
+    target = parts.path + (f"?{parts.query}" if parts.query else "")
+    request = f"GET {target} HTTP/1.1\r\nHost: {parts.netloc}\r\n"
+    if token:
+        request += f"Authorization: Bearer {token}\r\n"
+    request = (request + "\r\n").encode()
+
+    latencies = []
+    errors = 0
+    queue = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(parts.hostname, parts.port)
+        for _ in queue:
+            start = time.perf_counter()
+            try:
+                writer.write(request)
+                status, keep_alive = await read_response(reader)
+                if status >= 500:
+                    errors += 1
+            except (asyncio.IncompleteReadError, ConnectionError):
+                errors += 1
+                keep_alive = False
+            if not keep_alive:
+                # e.g. the Flask dev server closes after every response
+                writer.close()
+                reader, writer = await asyncio.open_connection(parts.hostname, parts.port)
+            latencies.append(time.perf_counter() - start)
+        writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(
+        f"{total} requests, concurrency {concurrency}: {total / elapsed:.0f} req/s, "
+        f"p50={p50 * 1000:.1f}ms p99={p99 * 1000:.1f}ms errors={errors}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    up = sub.add_parser("upstream")
+    up.add_argument("--port", type=int, default=5051)
+    up.add_argument("--delay", type=float, default=0.05)
+
+    lo = sub.add_parser("load")
+    lo.add_argument("--url", required=True)
+    lo.add_argument("--requests", type=int, default=20000)
+    lo.add_argument("--concurrency", type=int, default=1000)
+    lo.add_argument("--token", help="JWT for authenticated routes")
+
+    args = parser.parse_args()
+    if args.command == "upstream":
+        asyncio.run(serve_upstream(args.port, args.delay))
+    else:
+        asyncio.run(load(args.url, args.requests, args.concurrency, args.token))
+
+
+if __name__ == "__main__":
+    main()
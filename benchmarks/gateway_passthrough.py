@@ -0,0 +1,110 @@
+"""Gateway CPU and memory per proxied request: parse + re-encode vs passthrough.
+
+A stub data layer (child process) answers /drinks and /top-rated with
+large JSON bodies. For each, the gateway side of one request is timed the
+old way (res.json(), then Flask encodes the objects again) and through
+_proxy() (raw bytes and headers forwarded, nothing decoded). CPU is the
+gateway process' own time; peak is the tracemalloc high-water mark of a
+single request:
+
+    python benchmarks/gateway_passthrough.py --drinks 20000 --requests 50
+
+Needs what backend/app.py needs at import (the JWT secret file).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "database"))
+from catalog_store import synthetic_catalog  # noqa: E402
+
+PATHS = ("/drinks", "/top-rated")
+
+
+def serve(port, drinks):
+    from werkzeug.serving import make_server
+    from werkzeug.wrappers import Response
+
+    docs, producers = synthetic_catalog(drinks)
+    by_id = {p["id"]: p for p in producers}
+    listing = [{**d, "producer": by_id[d["producerId"]]} for d in docs]
+    ranked = [{**d, "avgRating": 4.5, "ratingCount": 10} for d in listing]
+    bodies = {
+        "/drinks": json.dumps(listing, separators=(",", ":"), sort_keys=True).encode(),
+        "/top-rated": json.dumps(ranked, separators=(",", ":"), sort_keys=True).encode(),
+    }
+
+    def app(environ, start_response):
+        body = bodies[environ["PATH_INFO"]]
+        return Response(body, mimetype="application/json", headers={"ETag": '"bench"'})(environ, start_response)
+
+    server = make_server("127.0.0.1", port, app, threaded=True)
+    print("ready", flush=True)
+    server.serve_forever()
+
+
+def measure(request_once, count):
+    request_once()  # warm the connection pool
+    cpu, wall = time.process_time(), time.perf_counter()
+    for _ in range(count):
+        size = request_once()
+    cpu, wall = (time.process_time() - cpu) / count, (time.perf_counter() - wall) / count
+    tracemalloc.start()
+    request_once()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return size, cpu, wall, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--drinks", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--port", type=int, default=5997)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.port, args.drinks)
+        return
+
+    stub = subprocess.Popen(
+        [sys.executable, __file__, "--serve", "--port", str(args.port), "--drinks", str(args.drinks)],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        stub.stdout.readline()
+        os.environ["DB_API_URL"] = f"http://127.0.0.1:{args.port}"
+        sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+        import app as gateway
+
+        for path in PATHS:
+            def parsed():
+                res = gateway.upstream.get(path)
+                response = gateway.app.make_response((res.json(), res.status_code))
+                return sum(len(chunk) for chunk in response.iter_encoded())
+
+            def passthrough():
+                response = gateway._proxy("GET", path)
+                size = sum(len(chunk) for chunk in response.iter_encoded())
+                response.close()
+                return size
+
+            with gateway.app.test_request_context(path):
+                for name, request_once in (("parse", parsed), ("passthrough", passthrough)):
+                    size, cpu, wall, peak = measure(request_once, args.requests)
+                    print(
+                        f"{path:10} {name:11} {size / 1e6:6.1f} MB  cpu {cpu * 1000:7.2f} ms  "
+                        f"wall {wall * 1000:7.2f} ms  peak alloc {peak / 1e6:7.1f} MB"
+                    )
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
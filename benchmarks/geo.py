@@ -0,0 +1,86 @@
+"""Latency of the producer geo queries as the collection grows.
+
+Needs a real MongoDB (the geo operators are not available in mocks). Seeds
+a scratch database with random producers in steps and times the same
+queries the data layer issues at each size:
+
+    python benchmarks/geo.py --mongo mongodb://localhost:27017/geo_bench --sizes 10000,100000,1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+from pymongo import GEOSPHERE, MongoClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "database"))
+from geo import near_stage, with_location, within_box_query  # noqa: E402
+
+
+def seed(collection, start, stop, rng):
+    batch = []
+    for i in range(start, stop):
+        # clustered around a few cities, like real producers
+        lat, lng = rng.choice([(51.5, -0.1), (40.7, -74.0), (50.8, 4.4), (48.1, 11.6), (37.8, -122.4)])
+        producer = {"id": f"producer_{i}", "name": f"Producer {i}", "latitude": lat + rng.gauss(0, 2), "longitude": lng + rng.gauss(0, 2)}
+        batch.append(with_location(producer))
+        if len(batch) == 10000:
+            collection.insert_many(batch)
+            batch = []
+    if batch:
+        collection.insert_many(batch)
+
+
+def timed(fn, queries):
+    latencies = []
+    for _ in range(queries):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return statistics.median(latencies) * 1000, latencies[int(len(latencies) * 0.99) - 1] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mongo", required=True, help="URI of a scratch database; its producers collection is dropped")
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    client = MongoClient(args.mongo)
+    producers = client.get_default_database()["producers"]
+    producers.drop()
+    producers.create_index([("location", GEOSPHERE)])
+
+    rng = random.Random(1)
+    seeded = 0
+    for size in (int(s) for s in args.sizes.split(",")):
+        seed(producers, seeded, size, rng)
+        seeded = size
+
+        def point():
+            return rng.uniform(-10, 20), rng.uniform(40, 55)
+
+        def near():
+            list(producers.aggregate([near_stage(*point(), max_km=50), {"$limit": 11}, {"$project": {"_id": 0}}]))
+
+        def nearest():
+            list(producers.aggregate([near_stage(*point()), {"$limit": 10}, {"$project": {"_id": 0}}]))
+
+        def within():
+            lng, lat = point()
+            list(producers.find(within_box_query(lng, lat, lng + 1, lat + 0.5), {"_id": 0}).limit(201))
+
+        results = ", ".join(
+            f"{name} p50={p50:.1f}ms p99={p99:.1f}ms"
+            for name, fn in (("near 50km", near), ("nearest 10", nearest), ("viewport", within))
+            for p50, p99 in [timed(fn, args.queries)]
+        )
+        print(f"{size} producers: {results}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Build time, memory and per-request latency of ContentRecommender.
+
+Generates a synthetic catalog shaped like drinks.json (no Mongo needed):
+
+    python benchmarks/recommender.py --drinks 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "database"))
+from recommender import ContentRecommender  # noqa: E402
+
+CATEGORIES = [f"category {i}" for i in range(12)]
+STYLES = [f"style {i}" for i in range(120)]
+TAGS = [f"tag {i}" for i in range(300)]
+TASTES = [f"taste {i}" for i in range(40)]
+
+
+def synthetic_catalog(n, seed=1):
+    rng = random.Random(seed)
+    drinks, tastes = [], {}
+    for i in range(n):
+        drink_id = f"drink_{i}"
+        drinks.append(
+            {
+                "id": drink_id,
+                "category": rng.choice(CATEGORIES),
+                "style": rng.choice(STYLES),
+                "drinkType": rng.choice(["beer", "wine", "spirit"]),
+                "tags": rng.sample(TAGS, rng.randint(0, 4)),
+                "abv": round(rng.uniform(3, 40), 1),
+                "ibu": rng.choice([None, rng.randint(5, 100)]),
+                "srm": rng.choice([None, rng.randint(2, 40)]),
+            }
+        )
+        if rng.random() < 0.3:
+            tastes[drink_id] = Counter({t: rng.randint(1, 20) for t in rng.sample(TASTES, 3)})
+    return drinks, tastes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--drinks", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--liked", type=int, default=20)
+    args = parser.parse_args()
+
+    drinks, tastes = synthetic_catalog(args.drinks)
+    engine = ContentRecommender()
+
+    start = time.perf_counter()
+    engine.build(drinks, tastes)
+    build = time.perf_counter() - start
+    m = engine.matrix
+    print(
+        f"{args.drinks} drinks: build {build:.2f}s, matrix {m.shape} nnz={m.nnz} "
+        f"{(m.data.nbytes + m.indices.nbytes + m.indptr.nbytes) / 1e6:.1f} MB"
+    )
+
+    rng = random.Random(2)
+    latencies = []
+    for _ in range(args.queries):
+        liked = {rng.choice(engine.ids): 1.0 for _ in range(args.liked)}
+        start = time.perf_counter()
+        engine.recommend(liked, exclude=list(liked)[:5], limit=10)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    print(
+        f"recommend ({args.liked} liked): p50={statistics.median(latencies) * 1000:.2f}ms "
+        f"p99={latencies[int(len(latencies) * 0.99) - 1] * 1000:.2f}ms"
+    )
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        engine.note_review(rng.choice(engine.ids), [rng.choice(TASTES)])
+    print(f"note_review: {(time.perf_counter() - start):.3f}ms avg")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Reviews per second into Mongo: one POST /reviews each vs POST /reviews/bulk.
+
+Seeds --reviews / (number of drinks) users, then imports one review per
+(user, drink) pair as a single NDJSON body through /reviews/bulk, calling the
+data layer in process. A --single sized sample goes through POST /reviews one
+at a time for comparison. Rollups and counters are checked afterwards:
+
+    python benchmarks/review_ingest.py --mongo mongodb://localhost:27017/ingest_bench --reviews 200000
+
+The scratch database is dropped first; do not point this at real data.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mongo", required=True, help="scratch database URI, dropped first")
+    parser.add_argument("--reviews", type=int, default=200000)
+    parser.add_argument("--single", type=int, default=2000, help="reviews sent one request at a time")
+    args = parser.parse_args()
+
+    from pymongo import MongoClient
+
+    MongoClient(args.mongo).drop_database(args.mongo.rsplit("/", 1)[-1].split("?", 1)[0])
+    os.environ["MONGODB_HOST"] = args.mongo
+    os.environ.setdefault("CATALOG_SNAPSHOT", "")
+    database = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "database")
+    sys.path.insert(0, database)
+    import app as dbapp
+    from schemas import user_schema
+
+    drink_ids = list(dict.fromkeys(d["id"] for d in dbapp.drinks_collection.find({}, {"id": 1})))
+    users = -(-(args.reviews + args.single) // len(drink_ids))
+    dbapp.users_collection.insert_many(
+        [user_schema(f"ingest_{n}", "x").to_json() for n in range(users)]
+    )
+    rows = (
+        {"username": f"ingest_{n // len(drink_ids)}", "drink_id": drink_ids[n % len(drink_ids)],
+         "rating": 1 + n % 5, "review": "imported", "tastes": ["malty"]}
+        for n in range(args.reviews + args.single)
+    )
+    single = [next(rows) for _ in range(args.single)]
+    body = "\n".join(json.dumps(row) for row in rows).encode()
+    client = dbapp.app.test_client()
+    dbapp.catalog_store()  # load the catalog outside the timed runs
+
+    start = time.perf_counter()
+    for row in single:
+        assert client.post("/reviews", json=row).status_code == 201
+    seconds = time.perf_counter() - start
+    print(f"POST /reviews       {args.single:8} reviews: {args.single / seconds:9.0f} reviews/s")
+
+    start = time.perf_counter()
+    res = client.post("/reviews/bulk", data=body, content_type="application/x-ndjson")
+    seconds = time.perf_counter() - start
+    result = res.get_json()
+    assert res.status_code == 200 and not result["failed"], result
+    print(f"POST /reviews/bulk  {result['inserted']:8} reviews: {result['inserted'] / seconds:9.0f} reviews/s "
+          f"({len(body) / 1e6:.1f} MB body)")
+
+    total = args.reviews + args.single
+    stored = dbapp.reviews_collection.count_documents({})
+    rolled = sum(r["count"] for r in dbapp.drink_ratings_collection.find({}, {"count": 1}))
+    counted = sum(u.get("review_count", 0) for u in dbapp.users_collection.find({}, {"review_count": 1}))
+    print(f"stored {stored}, rollup count {rolled}, user counters {counted} (expected {total} each)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Build time, memory and query latency of the drink SearchIndex.
+
+Generates a synthetic catalog with Zipf-distributed description words (no
+Mongo needed). Latencies are measured with the query cache bypassed:
+
+    python benchmarks/search.py --drinks 1000000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "database"))
+from search import SearchIndex  # noqa: E402
+
+SYLLABLES = ["ba", "ro", "ki", "tel", "mu", "sa", "dor", "ve", "lin", "qua", "pe", "zon", "ar", "fi", "gu", "hol"]
+
+
+def vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES, rng.integers(2, 5))))
+    return sorted(words)
+
+
+def synthetic_catalog(n, seed=1):
+    rng = np.random.default_rng(seed)
+    words = vocabulary(20000, rng)
+    styles = [f"{words[i]} ale" for i in range(120)] + [f"{words[i]} lager" for i in range(120, 200)]
+    description_words = np.minimum(rng.zipf(1.2, (n, 25)), len(words)) - 1
+    name_words = rng.integers(0, len(words), (n, 2))
+    drinks = []
+    for i in range(n):
+        drinks.append(
+            {
+                "id": f"drink_{i}",
+                "name": f"{words[name_words[i, 0]]} {words[name_words[i, 1]]}",
+                "style": styles[i % len(styles)],
+                "category": f"category {i % 12}",
+                "tags": [words[i % 300]],
+                "description": " ".join(words[w] for w in description_words[i]),
+                "producerId": f"producer_{i % 5000}",
+            }
+        )
+    producers = {f"producer_{i}": f"{words[-1 - i % 5000]} brewery" for i in range(5000)}
+    return drinks, producers, words
+
+
+def percentiles(latencies):
+    latencies.sort()
+    return statistics.median(latencies) * 1000, latencies[int(len(latencies) * 0.99) - 1] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--drinks", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    drinks, producers, words = synthetic_catalog(args.drinks)
+    index = SearchIndex()
+    start = time.perf_counter()
+    index.build(drinks, producers)
+    build = time.perf_counter() - start
+    p = index.postings
+    print(
+        f"{args.drinks} drinks: build {build:.1f}s, {len(index.terms)} terms, "
+        f"postings {(p.data.nbytes + p.indices.nbytes + p.indptr.nbytes) / 1e6:.0f} MB"
+    )
+
+    rng = np.random.default_rng(2)
+    rare = [words[i] for i in rng.integers(0, len(words), args.queries)]
+    common = [words[i] for i in rng.integers(0, 20, args.queries)]
+    workloads = {
+        "rare word": rare,
+        "common word (~10% of drinks)": common,
+        "two words": [f"{a} {b}" for a, b in zip(rare, common)],
+        "autocomplete, 3 letters": [w[:3] for w in rare],
+        "autocomplete, 5 letters": [w[:5] for w in rare],
+        "style + prefix": [f"ale {w[:4]}" for w in rare],
+    }
+    for label, queries in workloads.items():
+        latencies = []
+        for q in queries:
+            index._cache.clear()
+            start = time.perf_counter()
+            index.search(q, limit=11)
+            latencies.append(time.perf_counter() - start)
+        p50, p99 = percentiles(latencies)
+        print(f"{label:<30} p50={p50:.2f}ms p99={p99:.2f}ms")
+
+    start = time.perf_counter()
+    for q in common:
+        index.search(q, limit=11)
+    print(f"{'cached repeat':<30} {(time.perf_counter() - start) / len(common) * 1000:.3f}ms avg")
+
+    start = time.perf_counter()
+    index.upsert(drinks[:1000], producers)
+    print(f"upsert: {(time.perf_counter() - start):.3f}ms per drink")
+
+
+if __name__ == "__main__":
+    main()
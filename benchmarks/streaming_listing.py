@@ -0,0 +1,156 @@
+"""Peak memory and time to first byte of a full (unpaged) /drinks listing.
+
+Maps a synthetic catalog snapshot and serves it over HTTP in a child
+process per mode: "buffered" builds the whole list and jsonify()s it (what
+the data layer did before), "streamed" and "ndjson" go through
+stream_list(). The client reads the body in chunks and throws it away; the
+server reports how far its peak RSS rose above the idle process:
+
+    python benchmarks/streaming_listing.py --drinks 1000000
+
+--base measures a running stack instead (gateway or data layer); --pid
+names server processes whose peak RSS (VmHWM) to report:
+
+    python benchmarks/streaming_listing.py --base http://localhost:5000 --pid 1234 --pid 5678
+"""
+import argparse
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "database"))
+from catalog import CatalogStore, Snapshot, write_snapshot  # noqa: E402
+from catalog_store import synthetic_catalog  # noqa: E402
+
+MODES = ("buffered", "streamed", "ndjson")
+
+
+def status_kb(pid, field):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return 0
+
+
+def reset_peak(pid):
+    try:
+        with open(f"/proc/{pid}/clear_refs", "w") as f:
+            f.write("5")  # resets VmHWM to the current RSS
+        return True
+    except OSError:
+        return False
+
+
+def fetch(url, body=None):
+    """(status, seconds to first body byte, total seconds, bytes)."""
+    start = time.perf_counter()
+    res = requests.get(url, json=body, stream=True)
+    first, size = None, 0
+    for chunk in res.iter_content(64 * 1024):
+        if first is None:
+            first = time.perf_counter() - start
+        size += len(chunk)
+    return res.status_code, first or 0.0, time.perf_counter() - start, size
+
+
+def serve(mode, path):
+    from flask import Flask, jsonify
+
+    from streaming import stream_list
+
+    store = CatalogStore()
+    snapshot = Snapshot(path)
+    for values in snapshot.arrays.values():
+        int(values.view("u1").sum())  # fault every page in before the baseline
+    store._use(snapshot.tables, snapshot.version)
+
+    def attach_producers(drinks, producers):
+        # same shape as the data layer's attach_producers()
+        missing = {d["producerId"] for d in drinks}.difference(producers)
+        producers.update(store.producers_by_ids(missing))
+        return [{**d, "producer": producers.get(d["producerId"])} for d in drinks]
+
+    app = Flask(__name__)
+
+    @app.route("/drinks")
+    def drinks():
+        if mode == "buffered":
+            return jsonify(attach_producers(list(store.scan("drinks", {})), {})), 200
+        producers = {}
+        return stream_list(store.scan("drinks", {}), lambda batch: attach_producers(batch, producers)), 200
+
+    from werkzeug.serving import make_server
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = status_kb(os.getpid(), "VmRSS")
+    reset_peak(os.getpid())
+    print(server.port, flush=True)
+    sys.stdin.readline()  # the client has read the whole listing
+    print(status_kb(os.getpid(), "VmHWM") - base, flush=True)
+
+
+def run_local(drinks):
+    docs, producers = synthetic_catalog(drinks)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "catalog.snap")
+        write_snapshot(path, 1, {"drinks": docs, "producers": producers})
+        del docs, producers
+        for mode in MODES:
+            proc = subprocess.Popen(
+                [sys.executable, __file__, "--serve", mode, path], stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+            )
+            port = int(proc.stdout.readline())
+            query = "?format=ndjson" if mode == "ndjson" else ""
+            status, first, total, size = fetch(f"http://127.0.0.1:{port}/drinks{query}")
+            proc.stdin.write("done\n")
+            proc.stdin.flush()
+            peak = int(proc.stdout.readline())
+            proc.terminate()
+            proc.wait()
+            print(
+                f"{mode:8} {status} {size / 1e6:7.1f} MB  TTFB {first * 1000:8.1f} ms  "
+                f"total {total:6.2f} s  peak RSS +{peak / 1024:.0f} MB"
+            )
+
+
+def run_remote(base, paths, pids, data_layer):
+    body = {} if data_layer else None
+    for path in paths:
+        for pid in pids:
+            reset_peak(pid)
+        before = {pid: status_kb(pid, "VmRSS") for pid in pids}
+        status, first, total, size = fetch(base.rstrip("/") + path, body)
+        line = f"{path:24} {status} {size / 1e6:7.1f} MB  TTFB {first * 1000:8.1f} ms  total {total:6.2f} s"
+        for pid in pids:
+            line += f"  pid {pid} peak RSS +{(status_kb(pid, 'VmHWM') - before[pid]) / 1024:.0f} MB"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--drinks", type=int, default=1000000)
+    parser.add_argument("--base", help="measure a running gateway / data layer instead")
+    parser.add_argument("--path", action="append", help="listing to fetch with --base (default /drinks)")
+    parser.add_argument("--pid", type=int, action="append", default=[], help="server process to report peak RSS for")
+    parser.add_argument("--data-layer", action="store_true", help="send the JSON body the data layer expects")
+    parser.add_argument("--serve", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(*args.serve)
+    elif args.base:
+        run_remote(args.base, args.path or ["/drinks", "/drinks?format=ndjson"], args.pid, args.data_layer)
+    else:
+        run_local(args.drinks)
+
+
+if __name__ == "__main__":
+    main()
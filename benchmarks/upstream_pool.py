@@ -0,0 +1,95 @@
+"""Connection count and latency of per-call requests vs the pooled UpstreamClient.
+
+Starts a local keep-alive HTTP server that counts accepted TCP connections,
+then fires the same number of GETs from a thread pool both ways.
+
+    python benchmarks/upstream_pool.py --requests 2000 --concurrency 16
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+from upstream import UpstreamClient  # noqa: E402
+
+BODY = b'{"ok": true}'
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+class CountingServer(ThreadingHTTPServer):
+    daemon_threads = True
+    connections = 0
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        super().process_request(request, client_address)
+
+
+def run(call, n, concurrency):
+    latencies = []
+    lock = threading.Lock()
+
+    def one(_):
+        start = time.perf_counter()
+        call()
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(one, range(n)))
+
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    server = CountingServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    client = UpstreamClient(base, pool_size=args.concurrency)
+    cases = [
+        ("requests.get per call", lambda: requests.get(f"{base}/drinks", timeout=5)),
+        ("UpstreamClient", lambda: client.get("/drinks")),
+    ]
+
+    for name, call in cases:
+        server.connections = 0
+        p50, p99 = run(call, args.requests, args.concurrency)
+        print(
+            f"{name:24} connections={server.connections:6d} "
+            f"p50={p50 * 1000:.2f}ms p99={p99 * 1000:.2f}ms"
+        )
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Favorite / review write throughput with many writers on the same user.
+
+--threads writers each add --writes distinct favorites (then reviews) for
+one shared user, calling the data layer in process. The read-modify-write
+favorites path the app used before ($set of the whole fav_drinks array) runs
+next to the current endpoints, so lost updates show up as a final count
+below the number of successful writes. Commands are counted with a pymongo
+command listener:
+
+    python benchmarks/write_contention.py --mongo mongodb://localhost:27017/write_bench --threads 16
+
+The scratch database is dropped first; do not point this at real data.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from pymongo import monitoring
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.commands = Counter()
+        self.lock = threading.Lock()
+
+    def started(self, event):
+        with self.lock:
+            self.commands[event.command_name] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def legacy_add_favorite(dbapp, username, drink_id):
+    """The old add_to_favorites, kept here as the baseline."""
+    user = dbapp.users_collection.find_one({"username": username})
+    if "fav_drinks" not in user:
+        dbapp.users_collection.update_one({"username": username}, {"$set": {"fav_drinks": []}})
+        user = dbapp.users_collection.find_one({"username": username})
+    if drink_id in user["fav_drinks"]:
+        return False
+    user["fav_drinks"].append(drink_id)
+    dbapp.users_collection.update_one({"username": username}, {"$set": {"fav_drinks": user["fav_drinks"]}})
+    return True
+
+
+def contend(threads, write_one, jobs):
+    """Run jobs[i] through write_one on thread i; (successful writes, seconds)."""
+    ok = Counter()
+    start = threading.Barrier(threads + 1)
+
+    def worker(n):
+        start.wait()
+        ok[n] = sum(1 for job in jobs[n] if write_one(job))
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for w in workers:
+        w.start()
+    start.wait()
+    began = time.perf_counter()
+    for w in workers:
+        w.join()
+    return sum(ok.values()), time.perf_counter() - began
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mongo", required=True, help="scratch database URI, dropped first")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--writes", type=int, default=8, help="per thread (the seed catalog has 150 drinks)")
+    args = parser.parse_args()
+
+    counter = CommandCounter()
+    monitoring.register(counter)  # before the app creates its client
+
+    from pymongo import MongoClient
+
+    MongoClient(args.mongo).drop_database(args.mongo.rsplit("/", 1)[-1].split("?", 1)[0])
+    os.environ["MONGODB_HOST"] = args.mongo
+    os.environ.setdefault("CATALOG_SNAPSHOT", "")
+    database = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "database")
+    sys.path.insert(0, database)
+    import app as dbapp
+
+    drink_ids = list(dict.fromkeys(d["id"] for d in dbapp.drinks_collection.find({}, {"id": 1})))
+    needed = args.threads * args.writes
+    if len(drink_ids) < needed:
+        raise SystemExit(f"only {len(drink_ids)} drinks, lower --threads or --writes")
+    jobs = [drink_ids[n * args.writes:(n + 1) * args.writes] for n in range(args.threads)]
+    client = dbapp.app.test_client  # a fresh client per request, they are not shared across threads
+    for name in ("legacy", "favorites", "reviews"):
+        client().post("/register_user", json={"username": f"w_{name}", "password": "x"})
+    dbapp.catalog_store()  # load the catalog outside the timed runs
+
+    def favorite(name):
+        return lambda drink_id: client().post(
+            "/add_to_favorites", json={"username": name, "drink_id": drink_id}
+        ).status_code == 200
+
+    def review(drink_id):
+        return client().post(
+            "/reviews", json={"username": "w_reviews", "drink_id": drink_id, "rating": 4, "tastes": ["malty"]}
+        ).status_code == 201
+
+    def stored(name):
+        user = dbapp.users_collection.find_one({"username": f"w_{name}"})
+        if name == "legacy":
+            return len(user.get("fav_drinks", []))
+        if name == "favorites":
+            return dbapp.favorites_collection.count_documents({"user_id": user["_id"]})
+        return dbapp.reviews_collection.count_documents({"user_id": user["_id"]})
+
+    def counted(name):
+        user = dbapp.users_collection.find_one({"username": f"w_{name}"})
+        return user.get({"favorites": "favorite_count", "reviews": "review_count"}.get(name), "-")
+
+    runs = (
+        ("legacy", lambda drink_id: legacy_add_favorite(dbapp, "w_legacy", drink_id)),
+        ("favorites", favorite("w_favorites")),
+        ("reviews", review),
+    )
+    for name, write_one in runs:
+        before = counter.commands.copy()
+        ok, seconds = contend(args.threads, write_one, jobs)
+        commands = counter.commands - before
+        detail = ", ".join(f"{k} {v}" for k, v in sorted(commands.items()))
+        print(
+            f"{name:9} {args.threads} writers: {ok / seconds:8.0f} writes/s, "
+            f"{sum(commands.values()) / max(ok, 1):.1f} commands/write ({detail}); "
+            f"{ok} ok, {stored(name)} stored, counter {counted(name)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
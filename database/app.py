@@ -1,12 +1,40 @@
 import os
 import json
+import tempfile
+import click
 
 from flask import Flask, request, jsonify
 from dotenv import load_dotenv
 from pymongo import MongoClient
 from bson.objectid import ObjectId
 from schemas import user_schema, review_schema
-from pymongo import ASCENDING, DESCENDING
+from migrations import backfill_review_usernames, propagate_username, backfill_producer_locations, move_user_arrays, dedupe_unique_keys
+from counters import FAVORITES_COLLECTION, MOVING_FAVORITES, USER_COUNTERS, bump_counter, bump_counters, counter_step, rebuild_user_counters
+from indexes import (
+    INDEX_MANIFEST_VERSION, WRITE_GUARDS, UniqueGuard, applied_manifest_version, ensure_indexes, index_fields,
+    report_indexes, explain_queries,
+)
+from ratings import ROLLUP_COLLECTION, apply_rating, apply_ratings, rebuild_ratings, sync_drink_ratings, latest_rating_update
+from pagination import InvalidPage, MAX_LIMIT, page_request, with_cursor, split_page, find_page, encode_cursor
+from recommender import ContentRecommender, LIKED_RATING
+from collaborative import AlsoLikedModel
+from search import SearchIndex
+from facets import FACET_FIELDS, RANGE_EDGES, FacetIndex
+from conditional import Polled, conditional
+from catalog import CatalogStore, bump_catalog_version, catalog_stamp, write_snapshot
+from streaming import BATCH, batches, stream_list
+from geo import (
+    LOCATION_FIELD,
+    InvalidGeoQuery,
+    with_location,
+    point_from_args,
+    radius_from_args,
+    box_from_args,
+    near_stage,
+    within_box_query,
+)
+from pymongo import ASCENDING, DESCENDING, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 
 load_dotenv()
 
@@ -22,6 +50,208 @@ drinks_collection = db["drinks"]
 producers_collection = db["producers"]
 reviews_collection = db["reviews"]
 producer_reviews_collection = db["producer_reviews"]
+favorites_collection = db[FAVORITES_COLLECTION]
+drink_ratings_collection = db[ROLLUP_COLLECTION]
+
+recommender = ContentRecommender()
+also_liked_model = AlsoLikedModel()
+# weight of the "also liked" signal next to content similarity in /recommendations
+COLLABORATIVE_WEIGHT = 1.0
+search_index = SearchIndex()
+facet_index = FacetIndex()
+# workers map one shared snapshot file; set CATALOG_SNAPSHOT= (empty) to keep a copy per process
+catalog_snapshot = os.getenv("CATALOG_SNAPSHOT", os.path.join(tempfile.gettempdir(), f"catalog-{db_name}.snap"))
+catalog = CatalogStore(snapshot_path=catalog_snapshot or None)
+
+
+# writes whose duplicate check is a unique index are refused while it is missing
+unique_guard = UniqueGuard(db)
+
+
+def unguarded(collection_name):
+    """Response for a write refused by unique_guard."""
+    index_name = WRITE_GUARDS[collection_name]
+    return jsonify(
+        {"message": f"Writes to {collection_name} are disabled until its {index_name} index exists (run dedupe-unique-keys)"}
+    ), 503
+
+
+def catalog_store():
+    """The in-process catalog, re-polling the catalog version when due."""
+    catalog.ensure_fresh(db)
+    return catalog
+
+
+# ETag validators: the catalog version, plus the newest rollup change for rankings
+ratings_updated = Polled(lambda: latest_rating_update(db))
+
+
+def catalog_validator():
+    return catalog_store().version
+
+
+def ratings_validator():
+    return catalog_store().version, ratings_updated.get()
+
+
+def find_user(username, *fields):
+    """The user's _id and username plus the named fields. Always projected, so
+    documents not yet rewritten by move-user-arrays never ship their id arrays."""
+    return users_collection.find_one({"username": username}, {"_id": 1, "username": 1, **dict.fromkeys(fields, 1)})
+
+
+def counted_user(username, field, sign=1, *fields):
+    """Find the user and move one of their counters in the same command.
+
+    Returns the document as it was before (_id, username, the counter and the
+    named fields). Callers write next and undo the count with bump_counter()
+    when that write does not happen (duplicate, nothing to delete).
+    """
+    return users_collection.find_one_and_update(
+        {"username": username},
+        [counter_step(field, sign)],
+        projection={"_id": 1, "username": 1, field: 1, **dict.fromkeys(fields, 1)},
+    )
+
+
+def favorite_ids(user):
+    """Drink ids the user marked as favorite, oldest first. `user` needs
+    fav_drinks projected, for users the migration has not reached yet."""
+    legacy = [str(x) for x in user.get("fav_drinks") or []]
+    stored = favorites_collection.find({"user_id": user["_id"]}, {"_id": 0, "drink_id": 1}).sort("_id", ASCENDING)
+    return list(dict.fromkeys(legacy + [f["drink_id"] for f in stored]))
+
+
+def attach_producers(drinks, producers=None):
+    """Attach the producer document to every drink, from the catalog store.
+
+    ``producers`` (id -> document) is reused and filled in across calls, so a
+    listing attached batch by batch looks each producer up only once.
+    """
+    drinks = list(drinks)
+    producers = {} if producers is None else producers
+    producer_ids = {str(d["producerId"]) for d in drinks if d.get("producerId") is not None}
+    missing = producer_ids.difference(producers)
+    if missing:
+        found = catalog_store().producers_by_ids(missing)
+        producers.update({producer_id: found.get(producer_id) for producer_id in missing})
+
+    return [
+        {
+            **drink,
+            "producer": producers.get(str(drink["producerId"]))
+            if drink.get("producerId") is not None
+            else None,
+        }
+        for drink in drinks
+    ]
+
+
+def review_listing_projection(username):
+    """$project fields shared by the per-user review listings (ids as strings)."""
+    return {
+        "_id": {"$toString": "$_id"},
+        "user_id": {"$toString": "$user_id"},
+        "user": {"$literal": username},
+        "rating": {"$ifNull": ["$rating", None]},
+        "review": {"$ifNull": ["$review", None]},
+        "tastes": {"$ifNull": ["$tastes", []]},
+    }
+
+
+def review_item(r, subject_field):
+    """A review document as the per-drink / per-producer listings return it."""
+    return {
+        "_id": str(r["_id"]),
+        "user_id": str(r["user_id"]),
+        "user": r.get("username"),
+        subject_field: r.get(subject_field),
+        "rating": r.get("rating"),
+        "review": r.get("review"),
+        "tastes": r.get("tastes", []),
+    }
+
+
+def paged(items, next_cursor, paging):
+    """Legacy callers get the bare list; paged callers get items + next_cursor."""
+    if paging is None:
+        return jsonify(items)
+    return jsonify({"items": items, "next_cursor": next_cursor})
+
+
+def ranking_window(paging, default_limit=10):
+    """(offset, limit) into an in-memory ranking. Legacy callers use
+    page/per_page (``default_limit`` per page); paged callers get a cursor
+    holding the position."""
+    if paging is None:
+        page = int(request.args.get("page", 1))
+        limit = int(request.args.get("per_page", default_limit))
+        return (page - 1) * limit, limit
+
+    limit, values = paging
+    offset = values[0] if values else 0
+    if not isinstance(offset, int) or offset < 0:
+        raise InvalidPage("Invalid cursor")
+    return offset, limit
+
+
+def drinks_in_order(ids, scores=None, score_field=None):
+    """The drink documents for ``ids``, in that order, with producers attached."""
+    drinks = {d["id"]: d for d in catalog_store().drinks_by_ids(ids)}
+    if score_field:
+        for drink_id, score in zip(ids, scores):
+            if drink_id in drinks:
+                drinks[drink_id][score_field] = round(score, 4)
+    return attach_producers(drinks[drink_id] for drink_id in ids if drink_id in drinks)
+
+
+def ranked_drinks(ranked, offset, limit, paging, score_field=None):
+    """Response for a ranking fetched with limit + 1 rows."""
+    next_cursor = encode_cursor([offset + limit]) if len(ranked) > limit else None
+    ranked = ranked[:limit]
+    ids = [drink_id for drink_id, _ in ranked]
+    out = drinks_in_order(ids, [score for _, score in ranked], score_field)
+    return paged(out, next_cursor, paging), 200
+
+
+def attach_producer_drinks(producers):
+    """Attach each producer's drinks (from the catalog store) and their rating
+    rollups (one $in query), plus a producer-level rating over all of its drinks."""
+    producers = list(producers)
+    fields = ("id", "name", "style", "abv", "producerId")
+    drinks = [
+        {f: d[f] for f in fields if f in d}
+        for d in catalog_store().drinks_by_producer([p["id"] for p in producers])
+    ]
+    ratings = {r["_id"]: r for r in drink_ratings_collection.find({"_id": {"$in": [d["id"] for d in drinks]}})}
+
+    by_producer = {}
+    for d in drinks:
+        r = ratings.get(d["id"], {})
+        d["rating"] = {"avg": r.get("avg"), "count": r.get("count", 0)}
+        by_producer.setdefault(d.pop("producerId"), []).append((d, r.get("sum", 0)))
+
+    for p in producers:
+        own = by_producer.get(p["id"], [])
+        count = sum(d["rating"]["count"] for d, _ in own)
+        p["drinks"] = [d for d, _ in own]
+        p["rating"] = {"avg": sum(total for _, total in own) / count if count else None, "count": count}
+    return producers
+
+
+def wants_drinks():
+    return request.args.get("with_drinks", "").lower() in ("1", "true")
+
+
+@app.errorhandler(InvalidPage)
+def invalid_page(e):
+    return jsonify({"message": str(e)}), 400
+
+
+@app.errorhandler(InvalidGeoQuery)
+def invalid_geo_query(e):
+    return jsonify({"message": str(e)}), 400
+
 
 # -----------------------------
 # PRODUCER REVIEWS
@@ -30,27 +260,20 @@ producer_reviews_collection = db["producer_reviews"]
 def get_producer_reviews(producer_id):
     producer_id = str(producer_id)
 
-    if not producers_collection.find_one({"id": producer_id}):
+    if not catalog_store().producer(producer_id):
         return jsonify({"message": "Producer not found"}), 404
 
-    reviews = producer_reviews_collection.find({"producer_id": producer_id})
-
-    out = []
-    for r in reviews:
-        u = users_collection.find_one({"_id": r["user_id"]}, {"_id": 0})
-        out.append(
-            {
-                "_id": str(r["_id"]),
-                "user_id": str(r["user_id"]),
-                "user": u["username"] if u else None,
-                "producer_id": r.get("producer_id"),
-                "rating": r.get("rating"),
-                "review": r.get("review"),
-                "tastes": r.get("tastes", []),
-            }
-        )
+    paging = page_request(request.args)
+    if paging is None:
+        reviews = producer_reviews_collection.find({"producer_id": producer_id}).batch_size(BATCH)
+        return stream_list(review_item(r, "producer_id") for r in reviews), 200
+
+    reviews, next_cursor = find_page(
+        producer_reviews_collection, {"producer_id": producer_id}, [("_id", ASCENDING)], paging
+    )
+    out = [review_item(r, "producer_id") for r in reviews]
 
-    return jsonify(out), 200
+    return paged(out, next_cursor, paging), 200
 
 
 @app.route("/producer-reviews", methods=["POST"])
@@ -63,16 +286,14 @@ def add_producer_review():
     review = data.get("review")
     tastes = data.get("tastes", [])
 
-    user = users_collection.find_one({"username": username})
-    if not user:
-        return jsonify({"message": "User not found"}), 404
-
-    if not producers_collection.find_one({"id": producer_id}):
+    if not catalog_store().producers_by_ids([producer_id]):
         return jsonify({"message": "Producer not found"}), 404
+    if not unique_guard.ready("producer_reviews"):
+        return unguarded("producer_reviews")
 
-    existing = producer_reviews_collection.find_one({"user_id": user["_id"], "producer_id": producer_id})
-    if existing:
-        return jsonify({"message": "You have already reviewed this producer"}), 400
+    user = counted_user(username, "producer_review_count")
+    if not user:
+        return jsonify({"message": "User not found"}), 404
 
     doc = {
         "producer_id": producer_id,
@@ -80,10 +301,15 @@ def add_producer_review():
         "review": review,
         "tastes": tastes,
         "user_id": user["_id"],
+        "username": user["username"],
     }
 
-    review_id = producer_reviews_collection.insert_one(doc).inserted_id
-    users_collection.update_one({"username": username}, {"$push": {"producer_reviews": review_id}})
+    try:
+        # user_producer_unique rejects a second review of the same producer
+        producer_reviews_collection.insert_one(doc)
+    except DuplicateKeyError:
+        bump_counter(db, user["_id"], "producer_review_count", sign=-1)
+        return jsonify({"message": "You have already reviewed this producer"}), 400
 
     return jsonify({"message": "Producer review added successfully"}), 201
 
@@ -93,30 +319,37 @@ def get_my_producer_reviews():
     data = request.json or {}
     username = data.get("username")
 
-    user = users_collection.find_one({"username": username})
+    user = find_user(username)
     if not user:
         return jsonify({"message": "User not found"}), 404
 
-    ids = user.get("producer_reviews", [])
-    reviews = producer_reviews_collection.find({"_id": {"$in": ids}})
-
-    out = []
-    for r in reviews:
-        producer = producers_collection.find_one({"id": r.get("producer_id")}, {"_id": 0})
-        out.append(
-            {
-                "_id": str(r["_id"]),
-                "user_id": str(r["user_id"]),
-                "user": username,
-                "rating": r.get("rating"),
-                "review": r.get("review"),
-                "tastes": r.get("tastes", []),
-                "producer": producer,
-                "producer_id": r.get("producer_id"),
+    pipeline = [
+        {"$match": {"user_id": user["_id"]}},
+        {"$sort": {"_id": ASCENDING}},
+
+        # join producers
+        {
+            "$lookup": {
+                "from": "producers",
+                "localField": "producer_id",
+                "foreignField": "id",
+                "as": "producer",
             }
-        )
+        },
+        {"$set": {"producer": {"$arrayElemAt": ["$producer", 0]}}},
+        {"$project": {"producer._id": 0}},
 
-    return jsonify(out), 200
+        # project the same shape as a single review document
+        {
+            "$project": {
+                **review_listing_projection(username),
+                "producer": {"$ifNull": ["$producer", None]},
+                "producer_id": {"$ifNull": ["$producer_id", None]},
+            }
+        },
+    ]
+
+    return stream_list(producer_reviews_collection.aggregate(pipeline, batchSize=BATCH)), 200
 
 
 @app.route("/producer-reviews/<string:review_id>", methods=["DELETE"])
@@ -124,40 +357,59 @@ def delete_producer_review(review_id):
     data = request.json or {}
     username = data.get("username")
 
-    user = users_collection.find_one({"username": username})
+    if not ObjectId.is_valid(review_id):
+        return jsonify({"message": "Review not found"}), 404
+    user = find_user(username)
     if not user:
         return jsonify({"message": "User not found"}), 404
 
-    review = producer_reviews_collection.find_one({"_id": ObjectId(review_id)})
+    review = producer_reviews_collection.find_one_and_delete({"_id": ObjectId(review_id), "user_id": user["_id"]})
     if not review:
-        return jsonify({"message": "Review not found"}), 404
+        return not_deleted(producer_reviews_collection, review_id)
+    bump_counter(db, user["_id"], "producer_review_count", sign=-1)
+
+    return jsonify({"message": "Review deleted successfully"}), 200
+
 
-    if review["user_id"] != user["_id"]:
+def not_deleted(collection, review_id):
+    """Why a delete matched nothing: the review is missing or someone else's."""
+    if collection.find_one({"_id": ObjectId(review_id)}, {"_id": 1}):
         return jsonify({"message": "You are not authorized to delete this review"}), 403
+    return jsonify({"message": "Review not found"}), 404
 
-    producer_reviews_collection.delete_one({"_id": ObjectId(review_id)})
-    users_collection.update_one({"username": username}, {"$pull": {"producer_reviews": ObjectId(review_id)}})
 
-    return jsonify({"message": "Review deleted successfully"}), 200
+# drinks.json / producers.json ship next to this module (/app in the image)
+SEED_DIR = os.path.dirname(os.path.abspath(__file__))
 
 
 def add_drinks():
-    with open("/app/drinks.json", "r", encoding="utf-8") as drinks_file:
+    with open(os.path.join(SEED_DIR, "drinks.json"), "r", encoding="utf-8") as drinks_file:
         drinks = json.load(drinks_file)
         drinks_collection.insert_many(drinks)
+    bump_catalog_version(db)
+
+    if recommender.ids and not recommender.upsert_drinks(drinks):
+        recommender.built_at = 0.0
+    if search_index.built_at:
+        producer_ids = list({d.get("producerId") for d in drinks})
+        producers = producers_collection.find({"id": {"$in": producer_ids}}, {"_id": 0, "id": 1, "name": 1})
+        search_index.upsert(drinks, {p["id"]: p.get("name") for p in producers})
+    if facet_index.built_at:
+        producer_ids = list({d.get("producerId") for d in drinks})
+        producers = producers_collection.find({"id": {"$in": producer_ids}}, {"_id": 0, "id": 1, "country": 1})
+        facet_index.upsert(drinks, {p["id"]: p.get("country") for p in producers})
 
 
 def add_producers():
-    with open("/app/producers.json", "r", encoding="utf-8") as producers_file:
+    with open(os.path.join(SEED_DIR, "producers.json"), "r", encoding="utf-8") as producers_file:
         producers = json.load(producers_file)
-        producers_collection.insert_many(producers)
+        producers_collection.insert_many([with_location(p) for p in producers])
+    bump_catalog_version(db)
 
 
 def initialize_db():
-    if not users_collection.find_one({"username": "admin"}):
-        users_collection.insert_one(
-            {"username": "admin", "password": "admin", "fav_drinks": [], "reviews": []}
-        )
+    if not find_user("admin"):
+        users_collection.insert_one(user_schema("admin", "admin").to_json())
 
     if not drinks_collection.find_one():
         add_drinks()
@@ -165,6 +417,21 @@ def initialize_db():
     if not producers_collection.find_one():
         add_producers()
 
+    # reviews written before the author's username was stored on them
+    if any(c.find_one({"username": {"$exists": False}}, {"_id": 1}) for c in (reviews_collection, producer_reviews_collection)):
+        backfill_review_usernames(db, log=lambda _: None)
+
+    # producers seeded before locations were stored
+    if producers_collection.find_one({LOCATION_FIELD: {"$exists": False}, "latitude": {"$type": "number"}}):
+        backfill_producer_locations(db, log=lambda _: None)
+        bump_catalog_version(db)
+
+    ensure_indexes(db)
+    unique_guard.refresh()
+
+    if not drink_ratings_collection.find_one() and reviews_collection.find_one():
+        rebuild_ratings(db)
+
 
 initialize_db()
 
@@ -176,7 +443,7 @@ def register_user():
     password = data.get("password")
     preferred_style = data.get("preferred_style")
 
-    if users_collection.find_one({"username": username}):
+    if find_user(username):
         return jsonify({"message": "Username already exists"}), 400
 
     users_collection.insert_one(
@@ -197,7 +464,7 @@ def user_exists():
     username = data.get("username")
     password = data.get("password")
 
-    user = users_collection.find_one({"username": username})
+    user = find_user(username, "password")
     if not user or password != user.get("password"):
         return jsonify({"message": "Invalid username or password"}), 401
 
@@ -206,33 +473,35 @@ def user_exists():
 
 
 @app.route("/top-rated", methods=["GET"])
+@conditional(ratings_validator)
 def top_rated():
     page = int(request.args.get("page", 1))
     per_page = int(request.args.get("per_page", 10))
     min_reviews = int(request.args.get("min_reviews", 1))
     sort = request.args.get("sort", "avg")  # "avg" | "count"
     skip = (page - 1) * per_page
+    paging = page_request(request.args, default_limit=per_page)
 
-    # sort key
+    # sort key (both orders are backed by a drink_ratings index)
     if sort == "count":
-        sort_stage = {"$sort": {"review_count": -1, "avg_rating": -1}}
+        sort_keys = [("count", -1), ("avg", -1), ("_id", -1)]
+    else:
+        sort_keys = [("avg", -1), ("count", -1), ("_id", -1)]
+
+    match = {"count": {"$gte": min_reviews}}
+    if paging is None:
+        window = [{"$skip": skip}, {"$limit": per_page}]
     else:
-        sort_stage = {"$sort": {"avg_rating": -1, "review_count": -1}}
+        # keyset: continue after the last row of the previous page
+        match = with_cursor(match, sort_keys, paging[1])
+        window = [{"$limit": paging[0] + 1}]
 
     pipeline = [
-        # group reviews by drink_id
-        {
-            "$group": {
-                "_id": "$drink_id",
-                "avg_rating": {"$avg": "$rating"},
-                "review_count": {"$sum": 1},
-            }
-        },
-        # keep only drinks with enough reviews
-        {"$match": {"review_count": {"$gte": min_reviews}}},
-        sort_stage,
-        {"$skip": skip},
-        {"$limit": per_page},
+        # read the maintained rollups, keep only drinks with enough reviews
+        {"$match": match},
+        {"$sort": dict(sort_keys)},
+        *window,
+        {"$project": {"avg_rating": "$avg", "review_count": "$count"}},
 
         # join drinks
         {
@@ -285,14 +554,21 @@ def top_rated():
     ]
 
     try:
-        data = list(reviews_collection.aggregate(pipeline))
+        data = list(drink_ratings_collection.aggregate(pipeline))
+
+        next_cursor = None
+        if paging is not None:
+            sort_fields = {"avg": "avg_rating", "count": "review_count", "_id": "drink_id"}
+            data, next_cursor = split_page(
+                data, paging[0], lambda r: [r.get(sort_fields[f]) for f, _ in sort_keys]
+            )
 
         # round avg_rating safely
         for r in data:
             if isinstance(r.get("avg_rating"), (int, float)):
                 r["avg_rating"] = round(float(r["avg_rating"]), 2)
 
-        return jsonify(data), 200
+        return paged(data, next_cursor, paging), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -304,55 +580,190 @@ def top_rated():
 # -----------------------------
 # DRINKS
 # -----------------------------
+# catalog listings page on id, with _id breaking ties between rows sharing an id
+CATALOG_SORT = [("id", ASCENDING), ("_id", ASCENDING)]
+
+
 @app.route("/drinks", methods=["GET"])
+@conditional(catalog_validator)
 def get_drinks():
     data = request.json or {}
     query = data.get("query", {})
 
+    paging = page_request(request.args)
+
     try:
-        drinks = drinks_collection.find(query, {"_id": 0})
-        drinks_with_producer = []
-        for drink in drinks:
-            producer_id = drink.get("producerId")
-            producer = None
-            if producer_id is not None:
-                producer = producers_collection.find_one({"id": str(producer_id)}, {"_id": 0})
-            drinks_with_producer.append({**drink, "producer": producer})
+        if paging is None:  # the whole catalog: streamed, never held in memory
+            drinks = catalog_store().scan("drinks", query)
+            if drinks is None:  # operator queries go to Mongo
+                drinks = drinks_collection.find(query, {"_id": 0}).batch_size(BATCH)
+            producers = {}
+            return stream_list(drinks, lambda batch: attach_producers(batch, producers)), 200
+
+        found = catalog_store().find("drinks", query, paging)
+        if found is None:
+            found = find_page(drinks_collection, query, CATALOG_SORT, paging, {"_id": 0})
+        drinks, next_cursor = found
+        drinks_with_producer = attach_producers(drinks)
+    except InvalidPage:  # a 400 from the errorhandler, not a server error
+        raise
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-    return jsonify(drinks_with_producer), 200
+    return paged(drinks_with_producer, next_cursor, paging), 200
 
 
 @app.route("/drinks/categories", methods=["GET"])
+@conditional(catalog_validator)
 def get_drink_categories():
     try:
-        categories = drinks_collection.distinct("category")
+        categories = catalog_store().categories()
     except Exception as e:
         return jsonify({"Error getting categories": str(e)}), 500
 
     return jsonify(categories), 200
 
 
+@app.route("/drinks/search", methods=["GET"])
+def search_drinks():
+    q = request.args.get("q", "")
+    if not q.strip():
+        return jsonify({"message": "Missing q"}), 400
+
+    paging = page_request(request.args, default_limit=10)
+    offset, limit = ranking_window(paging)
+    prefix = request.args.get("prefix", "true").lower() != "false"
+
+    search_index.ensure_fresh(db, catalog_store().stamp)
+    ranked = search_index.search(q, offset=offset, limit=limit + 1, prefix=prefix)
+    return ranked_drinks(ranked, offset, limit, paging, score_field="score")
+
+
+@app.route("/drinks/faceted", methods=["GET"])
+def get_drinks_faceted():
+    """Filtered page plus per-facet value counts, e.g.
+    ?category=Irish Ale&category=British Ale&abv_min=4&abv_max=6&limit=20"""
+    selected = {f: request.args.getlist(f) for f in FACET_FIELDS if request.args.getlist(f)}
+    ranges = {}
+    try:
+        for field in RANGE_EDGES:
+            low, high = request.args.get(f"{field}_min"), request.args.get(f"{field}_max")
+            if low is not None or high is not None:
+                ranges[field] = (None if low is None else float(low), None if high is None else float(high))
+    except ValueError:
+        return jsonify({"message": "Range bounds must be numbers"}), 400
+
+    offset, limit = ranking_window(page_request(request.args, default_limit=20), default_limit=20)
+
+    facet_index.ensure_fresh(db, catalog_store().stamp)
+    ids, total, facets = facet_index.query(selected, ranges, offset=offset, limit=limit)
+    next_cursor = encode_cursor([offset + limit]) if offset + limit < total else None
+
+    return jsonify(
+        {"items": drinks_in_order(ids), "total": total, "facets": facets, "next_cursor": next_cursor}
+    ), 200
+
+
+@app.route("/drinks/<string:drink_id>/also-liked", methods=["GET"])
+def get_also_liked(drink_id):
+    if not catalog_store().drinks_by_ids([drink_id]):
+        return jsonify({"message": "Drink not found"}), 404
+
+    paging = page_request(request.args, default_limit=10)
+    offset, limit = ranking_window(paging)
+
+    also_liked_model.ensure_fresh(db)
+    ranked = also_liked_model.also_liked(drink_id, offset=offset, limit=limit + 1)
+    return ranked_drinks(ranked, offset, limit, paging, score_field="similarity")
+
+
 # -----------------------------
 # PRODUCERS
 # -----------------------------
 @app.route("/producers", methods=["GET"])
+@conditional(catalog_validator)
 def get_producers():
     data = request.json or {}
     query = data.get("query", {})
 
+    paging = page_request(request.args)
+
     try:
-        producers = producers_collection.find(query, {"_id": 0})
+        if paging is None:
+            producers = catalog_store().scan("producers", query)
+            if producers is None:
+                producers = producers_collection.find(query, {"_id": 0}).batch_size(BATCH)
+            return stream_list(producers), 200
+
+        found = catalog_store().find("producers", query, paging)
+        if found is None:
+            found = find_page(producers_collection, query, CATALOG_SORT, paging, {"_id": 0})
+        producers, next_cursor = found
+    except InvalidPage:  # a 400 from the errorhandler, not a server error
+        raise
     except Exception as e:
         return jsonify({"Error getting producers": str(e)}), 500
 
-    return jsonify(list(producers)), 200
+    return paged(producers, next_cursor, paging), 200
+
+
+def nearby_producers(lng, lat, max_km, offset, limit):
+    """Producers by distance from (lng, lat), nearest first, with distance_km."""
+    pipeline = [near_stage(lng, lat, max_km), {"$skip": offset}, {"$limit": limit}, {"$project": {"_id": 0}}]
+    producers = list(producers_collection.aggregate(pipeline))
+    return attach_producer_drinks(producers) if wants_drinks() else producers
+
+
+@app.route("/producers/near", methods=["GET"])
+def get_producers_near():
+    """?lat=&lng=&radius_km= ; paged like the other ranked endpoints."""
+    lng, lat = point_from_args(request.args)
+    radius_km = radius_from_args(request.args)
+    paging = page_request(request.args, default_limit=10)
+    offset, limit = ranking_window(paging)
+
+    producers = nearby_producers(lng, lat, radius_km, offset, limit + 1)
+    next_cursor = encode_cursor([offset + limit]) if len(producers) > limit else None
+    return paged(producers[:limit], next_cursor, paging), 200
+
+
+@app.route("/producers/nearest", methods=["GET"])
+def get_producers_nearest():
+    """?lat=&lng=&k= : the k nearest producers, any distance."""
+    lng, lat = point_from_args(request.args)
+    try:
+        k = max(1, min(int(request.args.get("k", 10)), MAX_LIMIT))
+    except ValueError:
+        return jsonify({"message": "Invalid k"}), 400
+
+    return jsonify(nearby_producers(lng, lat, None, 0, k)), 200
+
+
+@app.route("/producers/within", methods=["GET"])
+def get_producers_within():
+    """?min_lng=&min_lat=&max_lng=&max_lat=&limit= : producers inside a map viewport.
+
+    Unsorted so the index can stop after ``limit`` matches; "truncated" tells
+    the client to zoom in (or cluster) rather than page through the box.
+    """
+    query = within_box_query(*box_from_args(request.args))
+    try:
+        limit = max(1, min(int(request.args.get("limit", MAX_LIMIT)), MAX_LIMIT))
+    except ValueError:
+        return jsonify({"message": "Invalid limit"}), 400
+
+    producers = list(producers_collection.find(query, {"_id": 0}).limit(limit + 1))
+    truncated = len(producers) > limit
+    producers = producers[:limit]
+    if wants_drinks():
+        producers = attach_producer_drinks(producers)
+    return jsonify({"items": producers, "truncated": truncated}), 200
 
 
 @app.route("/producers/<string:producer_id>", methods=["GET"])
+@conditional(catalog_validator)
 def get_producer(producer_id):
-    producer = producers_collection.find_one({"id": str(producer_id)}, {"_id": 0})
+    producer = catalog_store().producer(str(producer_id))
     if not producer:
         return jsonify({"message": "Producer not found"}), 404
     return jsonify(producer), 200
@@ -365,27 +776,28 @@ def get_producer(producer_id):
 def add_to_favorites():
     data = request.json or {}
     username = data.get("username")
-    drink_id = data.get("drink_id")
+    drink_id = str(data.get("drink_id"))
 
-    if not drinks_collection.find_one({"id": str(drink_id)}):
+    if not catalog_store().drinks_by_ids([drink_id]):
         return jsonify({"message": "Drink not found"}), 404
+    if not unique_guard.ready(FAVORITES_COLLECTION):
+        return unguarded(FAVORITES_COLLECTION)
 
-    user = users_collection.find_one({"username": username})
+    user = counted_user(username, "favorite_count", 1, "fav_drinks")
     if not user:
         return jsonify({"message": "User not found"}), 404
 
-    if "fav_drinks" not in user:
-        users_collection.update_one({"username": username}, {"$set": {"fav_drinks": []}})
-        user = users_collection.find_one({"username": username})
-
-    if str(drink_id) in user["fav_drinks"]:
+    # user_drink_unique turns a concurrent second add into a DuplicateKeyError
+    added = drink_id not in [str(x) for x in user.get("fav_drinks") or []]
+    if added:
+        try:
+            favorites_collection.insert_one({"user_id": user["_id"], "drink_id": drink_id})
+        except DuplicateKeyError:
+            added = False
+    if not added:
+        bump_counter(db, user["_id"], "favorite_count", sign=-1)
         return jsonify({"message": "Drink already in favorites"}), 400
 
-    user["fav_drinks"].append(str(drink_id))
-    users_collection.update_one(
-        {"username": username}, {"$set": {"fav_drinks": user["fav_drinks"]}}
-    )
-
     return jsonify({"message": "Drink added to favorites"}), 200
 
 
@@ -394,24 +806,13 @@ def get_favorites():
     data = request.json or {}
     username = data.get("username")
 
-    user = users_collection.find_one({"username": username})
+    user = find_user(username, "fav_drinks")
     if not user:
         return jsonify({"message": "User not found"}), 404
 
-    fav_drinks = [str(x) for x in user.get("fav_drinks", [])]
-    fav = drinks_collection.find({"id": {"$in": fav_drinks}}, {"_id": 0})
+    fav = catalog_store().drinks_by_ids(favorite_ids(user))
 
-    fav = [
-        {
-            **drink,
-            "producer": producers_collection.find_one({"id": str(drink.get("producerId"))}, {"_id": 0})
-            if drink.get("producerId") is not None
-            else None,
-        }
-        for drink in fav
-    ]
-
-    return jsonify(list(fav)), 200
+    return jsonify(attach_producers(fav)), 200
 
 
 @app.route("/remove_from_favorites", methods=["DELETE"])
@@ -420,17 +821,22 @@ def remove_from_favorites():
     username = data.get("username")
     drink_id = str(data.get("drink_id"))
 
-    user = users_collection.find_one({"username": username})
+    user = counted_user(username, "favorite_count", -1, "fav_drinks", MOVING_FAVORITES)
     if not user:
         return jsonify({"message": "User not found"}), 404
 
-    fav_drinks = user.get("fav_drinks", [])
-    if drink_id not in fav_drinks:
+    removed = favorites_collection.delete_one({"user_id": user["_id"], "drink_id": drink_id}).deleted_count
+    if not removed:
+        bump_counter(db, user["_id"], "favorite_count")
+    # users the migration has not reached yet (or is moving) may still hold it in an array
+    legacy = (user.get("fav_drinks") or []) + (user.get(MOVING_FAVORITES) or [])
+    if drink_id in [str(x) for x in legacy]:
+        removed += users_collection.update_one(
+            {"_id": user["_id"]}, {"$pull": {"fav_drinks": drink_id, MOVING_FAVORITES: drink_id}}
+        ).modified_count
+    if not removed:
         return jsonify({"message": "Drink not in favourites"}), 400
 
-    fav_drinks.remove(drink_id)
-    users_collection.update_one({"username": username}, {"$set": {"fav_drinks": fav_drinks}})
-
     return jsonify({"message": "Drink removed from favourites"}), 200
 
 
@@ -442,35 +848,32 @@ def get_recommendations():
     data = request.json or {}
     username = data.get("username")
 
-    user = users_collection.find_one({"username": username})
+    user = find_user(username, "fav_drinks")
     if not user:
         return jsonify({"message": "User not found"}), 404
 
-    fav_drinks_ids = [str(x) for x in user.get("fav_drinks", [])]
-    fav_drinks = drinks_collection.find({"id": {"$in": fav_drinks_ids}}, {"_id": 0})
-    fav_categories = [d.get("category") for d in fav_drinks if d.get("category")]
-
-    page = int(request.args.get("page", 1))
-    per_page = int(request.args.get("per_page", 10))
-    skip = (page - 1) * per_page
-
-    recommendations = (
-        drinks_collection.find({"category": {"$in": fav_categories}}, {"_id": 0})
-        .skip(skip)
-        .limit(per_page)
+    # favorites count fully, well-rated reviews by how far above average they are
+    liked = dict.fromkeys(favorite_ids(user), 1.0)
+    reviewed = []
+    for r in reviews_collection.find({"user_id": user["_id"]}, {"_id": 0, "drink_id": 1, "rating": 1}):
+        reviewed.append(r["drink_id"])
+        rating = r.get("rating")
+        if isinstance(rating, (int, float)) and rating >= LIKED_RATING:
+            liked[r["drink_id"]] = max(liked.get(r["drink_id"], 0), (rating - 3) / 2)
+
+    paging = page_request(request.args, default_limit=10)
+    offset, limit = ranking_window(paging)
+
+    recommender.ensure_fresh(db)
+    also_liked_model.ensure_fresh(db)
+    ranked = recommender.recommend(
+        liked,
+        exclude=reviewed,
+        offset=offset,
+        limit=limit + 1,
+        boost={d: COLLABORATIVE_WEIGHT * s for d, s in also_liked_model.scores(liked).items()},
     )
-
-    recommendations = [
-        {
-            **drink,
-            "producer": producers_collection.find_one({"id": str(drink.get("producerId"))}, {"_id": 0})
-            if drink.get("producerId") is not None
-            else None,
-        }
-        for drink in recommendations
-    ]
-
-    return jsonify(list(recommendations)), 200
+    return ranked_drinks(ranked, offset, limit, paging)
 
 
 # -----------------------------
@@ -480,27 +883,20 @@ def get_recommendations():
 def get_drink_reviews(drink_id):
     drink_id = str(drink_id)
 
-    if not drinks_collection.find_one({"id": drink_id}):
+    if not catalog_store().drinks_by_ids([drink_id]):
         return jsonify({"message": "Drink not found"}), 404
 
-    reviews = reviews_collection.find({"drink_id": drink_id})
-
-    out = []
-    for r in reviews:
-        username = users_collection.find_one({"_id": r["user_id"]}, {"_id": 0})
-        out.append(
-            {
-                "_id": str(r["_id"]),
-                "user_id": str(r["user_id"]),
-                "user": username["username"] if username else None,
-                "drink_id": r.get("drink_id"),
-                "rating": r.get("rating"),
-                "review": r.get("review"),
-                "tastes": r.get("tastes", []),
-            }
-        )
+    paging = page_request(request.args)
+    if paging is None:
+        reviews = reviews_collection.find({"drink_id": drink_id}).batch_size(BATCH)
+        return stream_list(review_item(r, "drink_id") for r in reviews), 200
+
+    reviews, next_cursor = find_page(
+        reviews_collection, {"drink_id": drink_id}, [("_id", ASCENDING)], paging
+    )
+    out = [review_item(r, "drink_id") for r in reviews]
 
-    return jsonify(out), 200
+    return paged(out, next_cursor, paging), 200
 
 
 @app.route("/reviews", methods=["POST"])
@@ -513,23 +909,27 @@ def add_review():
     review = data.get("review")
     tastes = data.get("tastes", [])
 
-    user = users_collection.find_one({"username": username})
-    if not user:
-        return jsonify({"message": "User not found"}), 404
-
-    if not drinks_collection.find_one({"id": drink_id}):
+    if not catalog_store().drinks_by_ids([drink_id]):
         return jsonify({"message": "Drink not found"}), 404
+    if not unique_guard.ready("reviews"):
+        return unguarded("reviews")
 
-    # prevent duplicate review for same drink
-    existing = reviews_collection.find_one({"user_id": user["_id"], "drink_id": drink_id})
-    if existing:
-        return jsonify({"message": "You have already reviewed this drink"}), 400
+    user = counted_user(username, "review_count")
+    if not user:
+        return jsonify({"message": "User not found"}), 404
 
     # IMPORTANT: review_schema must store drink_id (not beer_id)
-    review_doc = review_schema(drink_id, rating, review, tastes, user["_id"]).to_json()
-    review_id = reviews_collection.insert_one(review_doc).inserted_id
-
-    users_collection.update_one({"username": username}, {"$push": {"reviews": review_id}})
+    review_doc = review_schema(drink_id, rating, review, tastes, user["_id"], user["username"]).to_json()
+    try:
+        # user_drink_unique prevents a duplicate review for the same drink
+        reviews_collection.insert_one(review_doc)
+    except DuplicateKeyError:
+        bump_counter(db, user["_id"], "review_count", sign=-1)
+        return jsonify({"message": "You have already reviewed this drink"}), 400
+    apply_rating(db, drink_id, rating)
+    ratings_updated.invalidate()
+    recommender.note_review(drink_id, tastes)
+    also_liked_model.note_review(user["_id"], drink_id, rating)
 
     return jsonify({"message": "Review added successfully"}), 201
 
@@ -539,33 +939,48 @@ def get_reviews():
     data = request.json or {}
     username = data.get("username")
 
-    user = users_collection.find_one({"username": username})
+    user = find_user(username)
     if not user:
         return jsonify({"message": "User not found"}), 404
 
-    reviews = reviews_collection.find({"_id": {"$in": user.get("reviews", [])}})
-
-    out = []
-    for r in reviews:
-        drink = drinks_collection.find_one({"id": r.get("drink_id")}, {"_id": 0})
-        producer = None
-        if drink and drink.get("producerId") is not None:
-            producer = producers_collection.find_one({"id": str(drink["producerId"])}, {"_id": 0})
-
-        out.append(
-            {
-                "_id": str(r["_id"]),
-                "user_id": str(r["user_id"]),
-                "user": username,
-                "rating": r.get("rating"),
-                "review": r.get("review"),
-                "tastes": r.get("tastes", []),
-                "drink": drink,
-                "producer": producer,
+    pipeline = [
+        {"$match": {"user_id": user["_id"]}},
+        {"$sort": {"_id": ASCENDING}},
+
+        # join drinks
+        {
+            "$lookup": {
+                "from": "drinks",
+                "localField": "drink_id",
+                "foreignField": "id",
+                "as": "drink",
             }
-        )
+        },
+        {"$set": {"drink": {"$arrayElemAt": ["$drink", 0]}}},
 
-    return jsonify(out), 200
+        # join producers
+        {
+            "$lookup": {
+                "from": "producers",
+                "localField": "drink.producerId",
+                "foreignField": "id",
+                "as": "producer",
+            }
+        },
+        {"$set": {"producer": {"$arrayElemAt": ["$producer", 0]}}},
+        {"$project": {"drink._id": 0, "producer._id": 0}},
+
+        # project the same shape as a single review document
+        {
+            "$project": {
+                **review_listing_projection(username),
+                "drink": {"$ifNull": ["$drink", None]},
+                "producer": {"$ifNull": ["$producer", None]},
+            }
+        },
+    ]
+
+    return stream_list(reviews_collection.aggregate(pipeline, batchSize=BATCH)), 200
 
 
 @app.route("/reviews/<string:review_id>", methods=["DELETE"])
@@ -573,25 +988,123 @@ def delete_review(review_id):
     data = request.json or {}
     username = data.get("username")
 
-    user = users_collection.find_one({"username": username})
+    if not ObjectId.is_valid(review_id):
+        return jsonify({"message": "Review not found"}), 404
+    user = find_user(username)
     if not user:
         return jsonify({"message": "User not found"}), 404
 
-    review = reviews_collection.find_one({"_id": ObjectId(review_id)})
+    review = reviews_collection.find_one_and_delete({"_id": ObjectId(review_id), "user_id": user["_id"]})
     if not review:
-        return jsonify({"message": "Review not found"}), 404
-
-    if review["user_id"] != user["_id"]:
-        return jsonify({"message": "You are not authorized to delete this review"}), 403
+        return not_deleted(reviews_collection, review_id)
+    bump_counter(db, user["_id"], "review_count", sign=-1)
 
-    reviews_collection.delete_one({"_id": ObjectId(review_id)})
-    users_collection.update_one(
-        {"username": username}, {"$pull": {"reviews": ObjectId(review_id)}}
-    )
+    apply_rating(db, review.get("drink_id"), review.get("rating"), sign=-1)
+    ratings_updated.invalidate()
+    recommender.note_review(review.get("drink_id"), review.get("tastes"), sign=-1)
+    also_liked_model.note_review(review["user_id"], review.get("drink_id"), review.get("rating"), sign=-1)
 
     return jsonify({"message": "Review deleted successfully"}), 200
 
 
+# rows read and written per bulk write by /reviews/bulk
+INGEST_BATCH = 5000
+# per-row errors listed in the response; any beyond are only counted
+MAX_REPORTED_ERRORS = 1000
+
+
+def ingest_rows(stream):
+    """(line number, object) for every non-blank NDJSON line; None for
+    lines that are not valid JSON."""
+    for number, line in enumerate(stream, 1):
+        if line.strip():
+            try:
+                yield number, json.loads(line)
+            except ValueError:
+                yield number, None
+
+
+def ingest_batch(rows):
+    """Validate and insert one batch of (line, object) pairs.
+
+    Returns (inserted, [(line, message), ...]).
+    """
+    rows = [(line, row if isinstance(row, dict) else None) for line, row in rows]
+    usernames = {row.get("username") for _, row in rows if row and isinstance(row.get("username"), str)}
+    users = {u["username"]: u["_id"] for u in users_collection.find({"username": {"$in": list(usernames)}}, {"username": 1})}
+    drink_ids = {str(row.get("drink_id")) for _, row in rows if row}
+    known = {d["id"] for d in catalog_store().drinks_by_ids(list(drink_ids))}
+
+    errors, lines, docs = [], [], []
+    for line, row in rows:
+        if row is None:
+            errors.append((line, "Expected a JSON object"))
+            continue
+        username, rating = row.get("username"), row.get("rating")
+        user_id = users.get(username) if isinstance(username, str) else None
+        if user_id is None:
+            errors.append((line, "User not found"))
+        elif str(row.get("drink_id")) not in known:
+            errors.append((line, "Drink not found"))
+        elif isinstance(rating, bool) or not isinstance(rating, (int, float)):
+            errors.append((line, "rating must be a number"))
+        else:
+            lines.append(line)
+            docs.append(
+                review_schema(row["drink_id"], rating, row.get("review", ""), row.get("tastes"), user_id, username).to_json()
+            )
+
+    failed = set()
+    if docs:
+        try:
+            reviews_collection.bulk_write([InsertOne(doc) for doc in docs], ordered=False)
+        except BulkWriteError as e:
+            for error in e.details["writeErrors"]:
+                failed.add(error["index"])
+                # user_drink_unique: reviewed before, or twice in this body
+                message = "You have already reviewed this drink" if error["code"] == 11000 else error["errmsg"]
+                errors.append((lines[error["index"]], message))
+
+    written = [doc for i, doc in enumerate(docs) if i not in failed]
+    apply_ratings(db, ((doc["drink_id"], doc["rating"]) for doc in written))
+    ratings_updated.invalidate()
+    per_user = {}
+    for doc in written:
+        per_user[doc["user_id"]] = per_user.get(doc["user_id"], 0) + 1
+    bump_counters(db, "review_count", per_user)
+    return len(written), sorted(errors)
+
+
+@app.route("/reviews/bulk", methods=["POST"])
+def ingest_reviews():
+    """Insert reviews from an NDJSON body, one {"username", "drink_id",
+    "rating", "review", "tastes"} object per line.
+
+    The body is read INGEST_BATCH lines at a time. Each batch costs one user
+    lookup and one unordered bulk write, with drinks checked against the
+    catalog store; rating rollups and review counters move once per drink /
+    user. Rows that fail are reported by line number, the others are kept.
+    """
+    if not unique_guard.ready("reviews"):
+        return unguarded("reviews")
+
+    inserted, failed, errors = 0, 0, []
+    for rows in batches(ingest_rows(request.stream), INGEST_BATCH):
+        count, batch_errors = ingest_batch(rows)
+        inserted += count
+        failed += len(batch_errors)
+        errors += [{"line": line, "message": message} for line, message in batch_errors[: MAX_REPORTED_ERRORS - len(errors)]]
+
+    if not inserted and not failed:
+        return jsonify({"message": "No reviews in the request body"}), 400
+    if inserted:
+        # folding each review in would dominate a large import; rebuild on next use
+        # (the also-liked model catches up on its periodic refresh)
+        recommender.built_at = 0.0
+
+    return jsonify({"inserted": inserted, "failed": failed, "errors": errors}), 200
+
+
 # -----------------------------
 # PROFILE
 # -----------------------------
@@ -603,26 +1116,118 @@ def compute_rank(review_count: int) -> str:
     return "Expert"
 
 
+RECENT_REVIEWS = 10
+MAX_RECENT_REVIEWS = 50
+
+
+def user_summary(username, with_favorites=False):
+    """Profile fields and counters of a user, one indexed read whatever the
+    number of reviews. Users the migration has not reached yet have no
+    counters; theirs are counted from the collections."""
+    user = find_user(username, "bio", "preferred_style", "last_login", "fav_drinks", *USER_COUNTERS)
+    if not user:
+        return None
+
+    favorites = favorite_ids(user) if with_favorites or "favorite_count" not in user else None
+    for field, collection_name in USER_COUNTERS.items():
+        if field not in user:
+            user[field] = (
+                len(favorites) if field == "favorite_count" else db[collection_name].count_documents({"user_id": user["_id"]})
+            )
+    if with_favorites:
+        user["fav_drinks"] = favorites
+    return user
+
+
+def profile_payload(user):
+    return {
+        "username": user.get("username"),
+        "bio": user.get("bio", ""),
+        "preferred_style": user.get("preferred_style"),
+        "last_login": user.get("last_login"),
+        "review_count": user["review_count"],
+        "rank": compute_rank(user["review_count"]),
+    }
+
+
 @app.route("/profile", methods=["GET"])
 def get_profile():
     data = request.json or {}
     username = data.get("username")
 
-    user = users_collection.find_one({"username": username})
+    user = user_summary(username)
+    if not user:
+        return jsonify({"message": "User not found"}), 404
+
+    return jsonify(profile_payload(user)), 200
+
+
+def recent_reviews(collection, user, subject_field, limit):
+    """The user's newest reviews, in the per-user listing shape (the joined
+    documents are added by the caller)."""
+    cursor = collection.find({"user_id": user["_id"]}).sort("_id", DESCENDING).limit(limit)
+    return [
+        {
+            "_id": str(r["_id"]),
+            "user_id": str(r["user_id"]),
+            "user": user["username"],
+            "rating": r.get("rating"),
+            "review": r.get("review"),
+            "tastes": r.get("tastes", []),
+            subject_field: r.get(subject_field),
+        }
+        for r in cursor
+    ]
+
+
+@app.route("/dashboard", methods=["GET"])
+def get_dashboard():
+    """Everything the profile page shows in three indexed reads: the user
+    summary and the newest drink / producer reviews. Drinks and producers
+    come from the catalog store. ?recent= sets how many reviews of each
+    kind (default 10, at most 50)."""
+    data = request.json or {}
+    username = data.get("username")
+
+    try:
+        limit = max(1, min(int(request.args.get("recent", RECENT_REVIEWS)), MAX_RECENT_REVIEWS))
+    except ValueError:
+        return jsonify({"message": "recent must be a number"}), 400
+
+    user = user_summary(username, with_favorites=True)
     if not user:
         return jsonify({"message": "User not found"}), 404
 
-    review_count = len(user.get("reviews", []))
-    rank = compute_rank(review_count)
+    drink_reviews = recent_reviews(reviews_collection, user, "drink_id", limit)
+    producer_reviews = recent_reviews(producer_reviews_collection, user, "producer_id", limit)
+
+    # same shapes as GET /reviews and GET /producer-reviews
+    store = catalog_store()
+    drinks = {d["id"]: d for d in store.drinks_by_ids([r["drink_id"] for r in drink_reviews])}
+    producers = store.producers_by_ids(
+        [str(d["producerId"]) for d in drinks.values() if d.get("producerId") is not None]
+        + [r["producer_id"] for r in producer_reviews]
+    )
+    for r in drink_reviews:
+        drink = drinks.get(r.pop("drink_id"))
+        r["drink"] = drink
+        r["producer"] = producers.get(str(drink.get("producerId"))) if drink else None
+    for r in producer_reviews:
+        r["producer"] = producers.get(r["producer_id"])
+
+    favorites = attach_producers(store.drinks_by_ids(user["fav_drinks"]))
 
     return jsonify(
         {
-            "username": user.get("username"),
-            "bio": user.get("bio", ""),
-            "preferred_style": user.get("preferred_style"),
-            "last_login": user.get("last_login"),
-            "review_count": review_count,
-            "rank": rank,
+            "profile": profile_payload(user),
+            "counts": {
+                "reviews": user["review_count"],
+                "producer_reviews": user["producer_review_count"],
+                "favorites": user["favorite_count"],
+            },
+            "recent_reviews": drink_reviews,
+            "recent_producer_reviews": producer_reviews,
+            "favorites": favorites,
         }
     ), 200
 
@@ -634,7 +1239,7 @@ def update_profile():
     bio = data.get("bio")
     preferred_style = data.get("preferred_style")
 
-    user = users_collection.find_one({"username": username})
+    user = find_user(username)
     if not user:
         return jsonify({"message": "User not found"}), 404
 
@@ -656,7 +1261,7 @@ def set_last_login():
     data = request.json or {}
     username = data.get("username")
 
-    user = users_collection.find_one({"username": username})
+    user = find_user(username)
     if not user:
         return jsonify({"message": "User not found"}), 404
 
@@ -665,5 +1270,146 @@ def set_last_login():
     return jsonify({"message": "Last login updated", "last_login": now}), 200
 
 
+@app.route("/last_login/batch", methods=["POST"])
+def set_last_login_batch():
+    data = request.json or {}
+    updates = data.get("updates", []) if isinstance(data, dict) else None
+    if not isinstance(updates, list):
+        return jsonify({"message": "updates must be a list"}), 400
+
+    ops = [
+        # $max keeps the newest value when batches from several auth workers overlap
+        UpdateOne({"username": u["username"]}, {"$max": {"last_login": u["last_login"]}})
+        for u in updates
+        # entries that are not {"username": str, "last_login": ISO str} are skipped
+        if isinstance(u, dict) and isinstance(u.get("username"), str) and isinstance(u.get("last_login"), str)
+        and u["username"] and u["last_login"]
+    ]
+    if not ops:
+        return jsonify({"message": "Nothing to update", "matched": 0}), 200
+
+    result = users_collection.bulk_write(ops, ordered=False)
+    return jsonify({"message": "Last login updated", "matched": result.matched_count}), 200
+
+
+# -----------------------------
+# MAINTENANCE COMMANDS
+# -----------------------------
+@app.cli.command("backfill-review-usernames")
+@click.option("--batch-size", default=500, show_default=True)
+def backfill_review_usernames_command(batch_size):
+    """Store the author's username on existing reviews (safe to re-run)."""
+    total = backfill_review_usernames(db, batch_size=batch_size, log=click.echo)
+    click.echo(f"Done, {total} reviews updated")
+
+
+@app.cli.command("move-user-arrays")
+@click.option("--batch-size", default=500, show_default=True)
+def move_user_arrays_command(batch_size):
+    """Move favorites to their own collection and replace the users' review /
+    favorite id arrays with counters (online, safe to re-run)."""
+    total = move_user_arrays(db, batch_size=batch_size, log=click.echo)
+    click.echo(f"Done, {total} users rewritten")
+
+
+@app.cli.command("backfill-producer-locations")
+@click.option("--batch-size", default=500, show_default=True)
+def backfill_producer_locations_command(batch_size):
+    """Store a GeoJSON location on producers seeded before it existed (safe to re-run)."""
+    total = backfill_producer_locations(db, batch_size=batch_size, log=click.echo)
+    bump_catalog_version(db)
+    click.echo(f"Done, {total} producers updated")
+
+
+@app.cli.command("build-catalog-snapshot")
+def build_catalog_snapshot_command():
+    """Write the catalog snapshot workers map (run before starting them)."""
+    if not catalog_snapshot:
+        raise click.ClickException("CATALOG_SNAPSHOT is empty, snapshots are disabled")
+    version, generation = catalog_stamp(db)
+    write_snapshot(catalog_snapshot, version, {
+        "drinks": drinks_collection.find(),
+        "producers": producers_collection.find(),
+    }, generation)
+    click.echo(f"Wrote catalog version {version} to {catalog_snapshot}")
+
+
+@app.cli.command("rename-user")
+@click.argument("old_username")
+@click.argument("new_username")
+def rename_user_command(old_username, new_username):
+    """Rename a user and propagate the new name to their reviews."""
+    user = users_collection.find_one({"username": old_username}, {"_id": 1})
+    if not user:
+        raise click.ClickException("User not found")
+    if users_collection.find_one({"username": new_username}, {"_id": 1}):
+        raise click.ClickException("Username already exists")
+
+    users_collection.update_one({"_id": user["_id"]}, {"$set": {"username": new_username}})
+    modified = propagate_username(db, user["_id"], new_username)
+    click.echo(f"Renamed {old_username} -> {new_username}, {modified} reviews updated")
+
+
+@app.cli.command("dedupe-unique-keys")
+def dedupe_unique_keys_command():
+    """Delete repeated reviews / favorites (keeping the oldest) so their unique
+    indexes can be built, then rebuild the indexes, rollups and counters."""
+    for collection_name, index_name in WRITE_GUARDS.items():
+        dedupe_unique_keys(db, collection_name, index_fields(collection_name, index_name), log=click.echo)
+    failed = ensure_indexes(db, log=click.echo, force=True)
+    rebuild_ratings(db)
+    rebuild_user_counters(db, log=click.echo)
+    if failed:
+        raise click.ClickException(f"{len(failed)} indexes could not be created")
+    click.echo("Done, reviews and favorites accept writes again")
+
+
+@app.cli.command("ensure-indexes")
+def ensure_indexes_command():
+    """Create every manifest index, even if this manifest version was applied before."""
+    failed = ensure_indexes(db, log=click.echo, force=True)
+    if failed:
+        raise click.ClickException(f"{len(failed)} indexes could not be created")
+    click.echo(f"All indexes present, manifest version {INDEX_MANIFEST_VERSION}")
+
+
+@app.cli.command("check-indexes")
+@click.option("--explain", is_flag=True, help="Also explain every endpoint query.")
+def check_indexes_command(explain):
+    """Report missing, unmanaged and unused indexes."""
+    click.echo(f"manifest version {INDEX_MANIFEST_VERSION}, applied {applied_manifest_version(db)}")
+    for collection_name, result in report_indexes(db).items():
+        click.echo(
+            f"{collection_name}: missing={result['missing']} "
+            f"unmanaged={result['unmanaged']} unused={result['unused']}"
+        )
+
+    if explain:
+        for endpoint, collection_name, stages, uses_index in explain_queries(db):
+            status = "IXSCAN" if uses_index else "NO INDEX"
+            click.echo(f"[{status}] {endpoint} on {collection_name}: {' -> '.join(stages)}")
+
+
+@app.cli.command("rebuild-ratings")
+@click.option("--sync-drinks", is_flag=True, help="Also refresh avgRating/reviewCount on drinks.")
+def rebuild_ratings_command(sync_drinks):
+    """Recompute the drink_ratings rollup from reviews and report drift."""
+    drift = rebuild_ratings(db)
+    click.echo(f"Rebuilt rollups, {len(drift)} drifted: {drift}")
+
+    if sync_drinks:
+        modified = sync_drink_ratings(db)
+        bump_catalog_version(db)
+        click.echo(f"Updated ratings on {modified} drinks")
+
+
+@app.cli.command("rebuild-user-counters")
+@click.option("--batch-size", default=500, show_default=True)
+def rebuild_user_counters_command(batch_size):
+    """Recount review / favorite counters of migrated users and report drift."""
+    drift = rebuild_user_counters(db, batch_size=batch_size, log=click.echo)
+    click.echo(f"Rebuilt counters, {len(drift)} users drifted")
+
+
 if __name__ == "__main__":
     app.run(debug=True, port=5051)
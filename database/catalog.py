@@ -0,0 +1,652 @@
+import fcntl
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import uuid
+from array import array
+from bisect import bisect_right
+from contextlib import contextmanager
+from heapq import nsmallest
+
+import numpy as np
+from bson import ObjectId, json_util
+from pymongo import ReturnDocument
+
+from pagination import InvalidPage, split_page
+
+CATALOG_META_ID = "catalog"
+POLL_SECONDS = 1.0
+# indexed fields per collection
+INDEXED = {"drinks": ("id", "category", "producerId"), "producers": ("id",)}
+
+SNAPSHOT_MAGIC = b"CATSNAP2"
+# snapshot cell tags
+MISSING, NULL, STR, INT, FLOAT, TRUE, FALSE, JSON, EJSON = range(9)
+
+_MISSING = object()
+_SCALARS = (str, int, float, bool, type(None))
+
+
+def bump_catalog_version(db):
+    """Tell every data-layer process that drinks or producers changed."""
+    db["schema_meta"].update_one(
+        {"_id": CATALOG_META_ID},
+        {"$inc": {"version": 1}, "$setOnInsert": {"generation": uuid.uuid4().hex}},
+        upsert=True,
+    )
+
+
+def catalog_stamp(db):
+    """(version, generation) of the catalog.
+
+    The generation is a random id minted with the catalog_meta document, so
+    a snapshot written for another database, or for this one before it was
+    dropped and re-seeded, never matches even when the versions do.
+    """
+    meta = db["schema_meta"].find_one({"_id": CATALOG_META_ID}, {"version": 1, "generation": 1})
+    if meta is None or "generation" not in meta:
+        # catalogs stamped before generations existed get one; racing workers agree on the first
+        meta = db["schema_meta"].find_one_and_update(
+            {"_id": CATALOG_META_ID},
+            [{"$set": {"generation": {"$ifNull": ["$generation", uuid.uuid4().hex]}}}],
+            projection={"version": 1, "generation": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+    return meta.get("version", 0), meta["generation"]
+
+
+def _indexable(value):
+    # True == 1 in Python but not in Mongo, so booleans are never looked up
+    return isinstance(value, (str, int, float)) and not isinstance(value, bool)
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) and len(value) <= 64 else value
+
+
+def _matches(value, wanted):
+    """Mongo equality: arrays match any element, null matches missing."""
+    if value is _MISSING:
+        return wanted is None
+    if isinstance(value, list):
+        return any(_matches(v, wanted) for v in value)
+    if isinstance(value, bool) != isinstance(wanted, bool):
+        return False
+    return value == wanted
+
+
+def _key(value):
+    # ids are strings; anything else sorts after them, like a missing id
+    if isinstance(value, str):
+        return value
+    return "\uffff" if value is _MISSING or value is None else "\uffff" + str(value)
+
+
+def _tie(value):
+    """12 bytes ordering rows that share an id, like their ObjectId _ids
+    do (other _id types tie as zeros)."""
+    return value.binary if isinstance(value, ObjectId) else bytes(12)
+
+
+def _elements(value):
+    """Values a multikey index holds for one field value."""
+    if isinstance(value, list):
+        return list(dict.fromkeys(v for v in value if _indexable(v)))
+    return (value,)
+
+
+def _fields(docs):
+    fields = {}
+    for d in docs:
+        fields.update(dict.fromkeys(d))
+    fields.pop("_id", None)
+    return list(fields)
+
+
+class _SortKeys:
+    """A table's (id key, _id tie) sort keys in ``order``, built on access (for bisect)."""
+
+    def __init__(self, table):
+        self.table = table
+
+    def __len__(self):
+        return self.table.size
+
+    def __getitem__(self, position):
+        return self.table.sort_key(int(self.table.order[position]))
+
+
+class _TableReads:
+    """Paging shared by both table kinds; they provide ``order`` (rows by
+    (id, _id)), ``rank`` (row -> position in order), ``value(row, field)``
+    and ``ties`` (the rows' _id bytes, 12 per row)."""
+
+    def sort_key(self, i):
+        return _key(self.value(i, "id")), bytes(self.ties[12 * i:12 * i + 12])
+
+    def cursor(self, i):
+        """Cursor values for row ``i``, the same [id, _id] the Mongo path uses."""
+        value = self.value(i, "id")
+        return [None if value is _MISSING else value, ObjectId(bytes(self.ties[12 * i:12 * i + 12]))]
+
+    def id_page(self, rows, after, count):
+        """Up to ``count`` of ``rows`` (None: all rows) after sort key ``after``, in (id, _id) order."""
+        start = 0 if after is None else bisect_right(self.id_keys, after)
+        if rows is None:
+            return [int(i) for i in self.order[start:start + count]]
+        rank = self.rank
+        positions = nsmallest(count, (r for r in (int(rank[i]) for i in rows) if r >= start))
+        return [int(self.order[r]) for r in positions]
+
+
+class Table(_TableReads):
+    """Documents stored column by column, in this process's heap.
+
+    Each field is one list over all rows (``_MISSING`` where a document
+    lacks it), so a row costs a few list slots instead of a dict, and
+    repeated strings (categories, styles, producer ids...) are interned
+    once. Rows keep the collection's natural order. ``_id`` is not a
+    column; it is only kept, packed, to break ties between equal ids.
+    """
+
+    def __init__(self, docs, indexed=()):
+        docs = list(docs)
+        self.columns = {f: [_intern(d.get(f, _MISSING)) for d in docs] for f in _fields(docs)}
+        self.size = len(docs)
+        self.indexes = {f: self._index(f) for f in indexed}
+        self.ties = b"".join(_tie(d.get("_id")) for d in docs)
+
+        self.order = array("i", sorted(range(self.size), key=self.sort_key))
+        self.rank = array("i", bytes(4 * self.size))
+        for position, i in enumerate(self.order):
+            self.rank[i] = position
+        self.id_keys = _SortKeys(self)
+
+    def _index(self, field):
+        """field value -> row, or list of rows in natural order when several
+        share it. Array fields are indexed by element, like a multikey index."""
+        index = {}
+        for i, value in enumerate(self.columns.get(field, ())):
+            for v in _elements(value):
+                if not _indexable(v):
+                    continue
+                rows = index.get(v)
+                if rows is None:
+                    index[v] = i
+                elif isinstance(rows, int):
+                    index[v] = [rows, i]
+                else:
+                    rows.append(i)
+        return index
+
+    def value(self, i, field):
+        column = self.columns.get(field)
+        return _MISSING if column is None else column[i]
+
+    def row(self, i):
+        out = {}
+        for field, column in self.columns.items():
+            value = column[i]
+            if value is not _MISSING:
+                out[field] = value
+        return out
+
+    def lookup(self, field, value):
+        """Rows (natural order) where ``field`` equals ``value``; None if not indexed."""
+        if field not in self.indexes or not _indexable(value):
+            return None
+        rows = self.indexes[field].get(value)
+        return [] if rows is None else [rows] if isinstance(rows, int) else rows
+
+    def matching(self, field, wanted, rows=None):
+        """The ``rows`` (None: all rows) where ``field`` equals ``wanted``."""
+        column = self.columns.get(field)
+        rows = range(self.size) if rows is None else rows
+        if column is None:
+            return list(rows) if wanted is None else []
+        return [i for i in rows if _matches(column[i], wanted)]
+
+    def distinct(self, field):
+        return sorted(v for v in self.indexes[field] if isinstance(v, str))
+
+
+# -----------------------------
+# SNAPSHOT
+# -----------------------------
+def write_snapshot(path, version, collections, generation=None):
+    """Write collections (name -> docs) to a binary snapshot at ``path``.
+
+    The header records ``version`` and ``generation`` (see catalog_stamp())
+    so readers can tell which catalog the file holds.
+
+    Layout: magic, header length, JSON header, then 8-byte aligned arrays.
+    Every field is a uint8 tag column plus an int64 payload column (float64
+    bits for floats, string ids for strings). Strings are deduplicated into
+    one sorted table (offsets + UTF-8 blob), so string ids compare like the
+    strings; lists and dicts are stored as JSON strings, other BSON values
+    as extended JSON. Each indexed field gets (string id, row) pairs sorted by value,
+    and each collection its rows' _id bytes and its rows in (id, _id) order
+    with their ranks.
+
+    The file is written next to ``path`` and renamed over it, so readers
+    always map a complete snapshot.
+    """
+    encoded, strings = {}, set()
+    for name, docs in collections.items():
+        docs = list(docs)
+        cells = {f: [_encode_cell(d.get(f, _MISSING)) for d in docs] for f in _fields(docs)}
+        for column in cells.values():
+            strings.update(raw for tag, raw in column if tag in (STR, JSON, EJSON))
+        pairs = {}
+        for field in INDEXED.get(name, ()):
+            pairs[field] = [(v, i) for i, d in enumerate(docs) for v in _elements(d.get(field)) if isinstance(v, str)]
+            strings.update(v for v, _ in pairs[field])
+        ties = [_tie(d.get("_id")) for d in docs]
+        keys = [(_key(d.get("id", _MISSING)), tie) for d, tie in zip(docs, ties)]
+        encoded[name] = (len(docs), cells, pairs, keys, b"".join(ties))
+
+    strings = sorted(strings)
+    sids = {s: k for k, s in enumerate(strings)}
+    blobs = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(blobs) + 1, dtype=np.uint64)
+    np.cumsum([len(b) for b in blobs], out=offsets[1:])
+    sections = {"strings.offsets": offsets, "strings.blob": np.frombuffer(b"".join(blobs), dtype=np.uint8)}
+
+    header = {"version": version, "generation": generation, "tables": {}}
+    for name, (size, cells, pairs, keys, ties) in encoded.items():
+        header["tables"][name] = {"size": size, "fields": list(cells), "indexed": list(pairs)}
+        for field, column in cells.items():
+            tags = np.array([tag for tag, _ in column], dtype=np.uint8)
+            data = np.zeros(size, dtype=np.int64)
+            floats = data.view(np.float64)
+            for i, (tag, raw) in enumerate(column):
+                if tag in (STR, JSON, EJSON):
+                    data[i] = sids[raw]
+                elif tag == INT:
+                    data[i] = raw
+                elif tag == FLOAT:
+                    floats[i] = raw
+            sections[f"{name}.{field}.tags"] = tags
+            sections[f"{name}.{field}.data"] = data
+        for field, field_pairs in pairs.items():
+            field_pairs.sort(key=lambda p: (sids[p[0]], p[1]))
+            sections[f"{name}.index.{field}.sid"] = np.array([sids[v] for v, _ in field_pairs], dtype=np.int64)
+            sections[f"{name}.index.{field}.row"] = np.array([i for _, i in field_pairs], dtype=np.int32)
+        sections[f"{name}._id"] = np.frombuffer(ties, dtype=np.uint8)
+        order = np.array(sorted(range(size), key=keys.__getitem__), dtype=np.int32)
+        rank = np.empty(size, dtype=np.int32)
+        rank[order] = np.arange(size, dtype=np.int32)
+        sections[f"{name}.order"], sections[f"{name}.rank"] = order, rank
+
+    offset = 0
+    header["sections"] = {}
+    for key, values in sections.items():
+        header["sections"][key] = [offset, values.dtype.str, len(values)]
+        offset += -(-values.nbytes // 8) * 8
+    raw_header = json.dumps(header).encode("utf-8")
+    start = -(-(len(SNAPSHOT_MAGIC) + 8 + len(raw_header)) // 8) * 8
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(SNAPSHOT_MAGIC + struct.pack("<Q", len(raw_header)) + raw_header)
+        for key, values in sections.items():
+            f.seek(start + header["sections"][key][0])
+            f.write(values.tobytes())
+        f.truncate(start + offset)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _encode_cell(value):
+    if value is _MISSING:
+        return MISSING, None
+    if value is None:
+        return NULL, None
+    if isinstance(value, bool):
+        return (TRUE if value else FALSE), None
+    if isinstance(value, str):
+        return STR, value
+    if isinstance(value, int) and -2**63 <= value < 2**63:
+        return INT, value
+    if isinstance(value, float):
+        return FLOAT, value
+    try:
+        return JSON, json.dumps(value)
+    except TypeError:  # dates, ObjectIds...
+        return EJSON, json_util.dumps(value)
+
+
+class Snapshot:
+    """A catalog snapshot mapped read-only. Every array is a view of the
+    mapping, so processes mapping the same file share its pages. Sections
+    come both as numpy arrays (vector filters) and as typed memoryviews,
+    which index single cells several times faster."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a catalog snapshot")
+        (length,) = struct.unpack_from("<Q", self._map, len(SNAPSHOT_MAGIC))
+        header_end = len(SNAPSHOT_MAGIC) + 8 + length
+        header = json.loads(self._map[len(SNAPSHOT_MAGIC) + 8:header_end])
+        start = -(-header_end // 8) * 8
+
+        self.version = header["version"]
+        self.generation = header.get("generation")
+        self.arrays, self.views = {}, {}
+        for key, (offset, dtype, count) in header["sections"].items():
+            dtype = np.dtype(dtype)
+            self.arrays[key] = np.frombuffer(self._map, dtype=dtype, count=count, offset=start + offset)
+            raw = memoryview(self._map)[start + offset:start + offset + count * dtype.itemsize]
+            self.views[key] = raw.cast(dtype.char)
+        self._offsets = self.views["strings.offsets"]
+        self._blob_start = start + header["sections"]["strings.blob"][0]
+        self.strings = _Strings(self)
+        self.tables = {name: SnapshotTable(self, name, meta) for name, meta in header["tables"].items()}
+
+    def string(self, sid):
+        start, end = self._offsets[sid], self._offsets[sid + 1]
+        return self._map[self._blob_start + start:self._blob_start + end].decode("utf-8")
+
+    def string_id(self, value):
+        k = bisect_right(self.strings, value) - 1
+        return k if k >= 0 and self.strings[k] == value else None
+
+
+class _Strings:
+    """The sorted string table as a sequence, decoded on access (for bisect)."""
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    def __len__(self):
+        return len(self.snapshot._offsets) - 1
+
+    def __getitem__(self, sid):
+        return self.snapshot.string(sid)
+
+
+class SnapshotTable(_TableReads):
+    """One collection of a Snapshot, with the same reads as Table."""
+
+    def __init__(self, snapshot, name, meta):
+        self.snapshot = snapshot
+        self.size = meta["size"]
+        arrays, views = snapshot.arrays, snapshot.views
+        self.columns, self.cells = {}, {}
+        for f in meta["fields"]:
+            data = arrays[f"{name}.{f}.data"]
+            self.columns[f] = (arrays[f"{name}.{f}.tags"], data, data.view(np.float64))
+            self.cells[f] = (views[f"{name}.{f}.tags"], views[f"{name}.{f}.data"], views[f"{name}.{f}.data"].cast("B").cast("d"))
+        self.indexes = {f: (arrays[f"{name}.index.{f}.sid"], arrays[f"{name}.index.{f}.row"]) for f in meta["indexed"]}
+        self.order, self.rank = views[f"{name}.order"], views[f"{name}.rank"]
+        self.ties = views[f"{name}._id"]
+        self._ranks = arrays[f"{name}.rank"]
+        self.id_keys = _SortKeys(self)
+
+    def id_page(self, rows, after, count):
+        if rows is None:
+            return super().id_page(rows, after, count)
+        start = 0 if after is None else bisect_right(self.id_keys, after)
+        ranks = self._ranks[np.asarray(rows, dtype=np.int32)]
+        ranks = ranks[ranks >= start]
+        if len(ranks) > count:
+            ranks = np.partition(ranks, count - 1)[:count]
+        return [self.order[r] for r in np.sort(ranks).tolist()]
+
+    def value(self, i, field):
+        cells = self.cells.get(field)
+        if cells is None:
+            return _MISSING
+        tags, data, floats = cells
+        tag = tags[i]
+        if tag == STR:
+            return self.snapshot.string(data[i])
+        if tag == INT:
+            return data[i]
+        if tag == FLOAT:
+            return floats[i]
+        if tag == JSON:
+            return json.loads(self.snapshot.string(data[i]))
+        if tag == EJSON:
+            return json_util.loads(self.snapshot.string(data[i]))
+        return (_MISSING, None, None, None, None, True, False)[tag]
+
+    def row(self, i):
+        out = {}
+        for field in self.cells:
+            value = self.value(i, field)
+            if value is not _MISSING:
+                out[field] = value
+        return out
+
+    def lookup(self, field, value):
+        """Rows (natural order) where ``field`` equals ``value``; None if not indexed."""
+        if field not in self.indexes or not isinstance(value, str):
+            return None
+        sid = self.snapshot.string_id(value)
+        if sid is None:
+            return []
+        sids, rows = self.indexes[field]
+        return rows[np.searchsorted(sids, sid, "left"):np.searchsorted(sids, sid, "right")]
+
+    def matching(self, field, wanted, rows=None):
+        """The ``rows`` (None: all rows) where ``field`` equals ``wanted``."""
+        rows = np.arange(self.size, dtype=np.int32) if rows is None else np.asarray(rows, dtype=np.int32)
+        column = self.columns.get(field)
+        if column is None:
+            return rows if wanted is None else rows[:0]
+        tags, data, floats = column
+        tags = tags[rows]
+        if wanted is None:
+            mask = (tags == MISSING) | (tags == NULL)
+        elif isinstance(wanted, bool):
+            mask = tags == (TRUE if wanted else FALSE)
+        elif isinstance(wanted, str):
+            sid = self.snapshot.string_id(wanted)
+            mask = (tags == STR) & (data[rows] == (-1 if sid is None else sid))
+        else:
+            mask = ((tags == INT) & (data[rows] == wanted)) | ((tags == FLOAT) & (floats[rows] == wanted))
+        # arrays and documents: decode and compare like Mongo
+        for k in np.flatnonzero(tags >= JSON):
+            mask[k] = _matches(self.value(int(rows[k]), field), wanted)
+        return rows[mask]
+
+    def distinct(self, field):
+        sids, _ = self.indexes[field]
+        return [self.snapshot.string(int(sid)) for sid in np.unique(sids)]
+
+
+def open_snapshot(path):
+    """The snapshot at ``path``, or None if there is no readable one."""
+    try:
+        return Snapshot(path)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+@contextmanager
+def _file_lock(path):
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class CatalogStore:
+    """Read-through, in-process copy of the drinks and producers collections.
+
+    The catalog is only written by the seeding path and a few admin
+    commands, which all call bump_catalog_version(). Readers re-poll that
+    version (with its generation) at most every POLL_SECONDS and reload
+    both collections when it moved; until then every catalog read is served from memory. Queries
+    the store cannot answer (anything but top-level equality) return None
+    so the caller can fall back to Mongo.
+
+    With ``snapshot_path`` the collections are not loaded into every
+    process: the first one to see a new version writes a snapshot file
+    (under a file lock) and all of them map it, so prefork workers share
+    one copy of the pages.
+    """
+
+    def __init__(self, poll_seconds=POLL_SECONDS, snapshot_path=None):
+        self.poll_seconds = poll_seconds
+        self.snapshot_path = snapshot_path
+        self._lock = threading.Lock()
+        self.version = None
+        self.generation = None
+        self.polled_at = 0.0
+        self._state = None
+
+    @property
+    def stamp(self):
+        """(version, generation) of the tables being served; derived indexes
+        rebuild when it moves."""
+        return self.version, self.generation
+
+    # -----------------------------
+    # LOADING
+    # -----------------------------
+    def load(self, drink_docs, producer_docs, version, generation=None):
+        tables = {
+            "drinks": Table(drink_docs, INDEXED["drinks"]),
+            "producers": Table(producer_docs, INDEXED["producers"]),
+        }
+        self._use(tables, version, generation)
+
+    def load_snapshot(self, db, version, generation):
+        """Map the snapshot of exactly this catalog stamp, writing it first if
+        the file is missing or holds another one."""
+
+        def current(snapshot):
+            return snapshot is not None and (snapshot.version, snapshot.generation) == (version, generation)
+
+        snapshot = open_snapshot(self.snapshot_path)
+        if not current(snapshot):
+            with _file_lock(f"{self.snapshot_path}.lock"):
+                snapshot = open_snapshot(self.snapshot_path)
+                if not current(snapshot):
+                    # label the file with the stamp the reads below actually see
+                    version, generation = catalog_stamp(db)
+                    write_snapshot(self.snapshot_path, version, {
+                        "drinks": db["drinks"].find(),
+                        "producers": db["producers"].find(),
+                    }, generation)
+                    snapshot = Snapshot(self.snapshot_path)
+        self._use(snapshot.tables, snapshot.version, snapshot.generation)
+
+    def _use(self, tables, version, generation=None):
+        # one assignment, so readers see either the old tables or the new ones
+        self._state = {**tables, "categories": tables["drinks"].distinct("category")}
+        self.version, self.generation = version, generation
+
+    def ensure_fresh(self, db):
+        now = time.monotonic()
+        if self._state is not None and now - self.polled_at < self.poll_seconds:
+            return
+        with self._lock:
+            if self._state is not None and time.monotonic() - self.polled_at < self.poll_seconds:
+                return
+            version, generation = catalog_stamp(db)
+            if self._state is None or (version, generation) != (self.version, self.generation):
+                if self.snapshot_path:
+                    self.load_snapshot(db, version, generation)
+                else:
+                    self.load(db["drinks"].find(), db["producers"].find(), version, generation)
+            self.polled_at = time.monotonic()
+
+    # -----------------------------
+    # READS
+    # -----------------------------
+    @staticmethod
+    def _rows(table, query):
+        """Rows matching a top-level equality query (None: all rows); False if unsupported."""
+        if not isinstance(query, dict):
+            return False
+        for field, wanted in query.items():
+            if field.startswith("$") or not isinstance(wanted, _SCALARS):
+                return False
+
+        rows, checks = None, dict(query)
+        for field, wanted in query.items():
+            found = table.lookup(field, wanted)
+            if found is not None:
+                rows = found
+                del checks[field]
+                break
+        for field, wanted in checks.items():
+            rows = table.matching(field, wanted, rows)
+        return rows
+
+    def find(self, table_name, query, paging):
+        """Same contract as pagination.find_page() with an (id, _id) sort, or
+        None when the query needs Mongo."""
+        table = self._state[table_name]
+        rows = self._rows(table, query or {})
+        if rows is False:
+            return None
+        if paging is None:
+            return list(self._scan(table, rows)), None
+
+        limit, values = paging
+        after = None
+        if values is not None:
+            if len(values) != 2 or not isinstance(values[1], ObjectId):
+                raise InvalidPage("Invalid cursor")
+            after = (_key(values[0]), values[1].binary)
+        page, next_cursor = split_page(table.id_page(rows, after, limit + 1), limit, table.cursor)
+        return [table.row(int(i)) for i in page], next_cursor
+
+    def scan(self, table_name, query):
+        """Every matching document in natural order, decoded lazily (for
+        streamed listings), or None when the query needs Mongo. A reload
+        while the caller is still reading does not change what it yields."""
+        table = self._state[table_name]
+        rows = self._rows(table, query or {})
+        if rows is False:
+            return None
+        return self._scan(table, rows)
+
+    @staticmethod
+    def _scan(table, rows):
+        return (table.row(int(i)) for i in (range(table.size) if rows is None else rows))
+
+    def drinks_by_ids(self, ids):
+        """Drinks whose id is in ``ids``, natural order (like a $in find)."""
+        return self._by_field("drinks", "id", ids)
+
+    def drinks_by_producer(self, producer_ids):
+        return self._by_field("drinks", "producerId", producer_ids)
+
+    def producers_by_ids(self, ids):
+        """producer id -> document (the first one, like find_one)."""
+        table = self._state["producers"]
+        found = {}
+        for producer_id in set(ids):
+            rows = table.lookup("id", producer_id)
+            if rows is not None and len(rows):
+                found[producer_id] = table.row(int(rows[0]))
+        return found
+
+    def _by_field(self, table_name, field, values):
+        table = self._state[table_name]
+        rows = set()
+        for value in set(values):
+            found = table.lookup(field, value)
+            rows.update(int(i) for i in (() if found is None else found))
+        return [table.row(i) for i in sorted(rows)]
+
+    def producer(self, producer_id):
+        return self.producers_by_ids([producer_id]).get(producer_id)
+
+    def categories(self):
+        return list(self._state["categories"])
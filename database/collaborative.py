@@ -0,0 +1,182 @@
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+from scipy import sparse
+
+from recommender import LIKED_RATING, REFRESH_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# co-likers needed before a pair counts; one shared user is mostly noise
+MIN_SUPPORT = 2
+
+
+class AlsoLikedModel:
+    """Item-item "users who liked this also liked" model over the reviews.
+
+    A review rated LIKED_RATING or higher is a like. Likes are kept twice
+    as binary CSR matrices, users x drinks and drinks x users, so both "who
+    liked drink i" and "what else did they like" are row slices. The
+    similarity of i and j is the cosine of their liker sets,
+    co(i, j) / sqrt(likes(i) * likes(j)), counted per query with one
+    bincount over the likers' rows; the item-item matrix itself is never
+    stored.
+
+    Reviews added or deleted since the last build are kept as replacement
+    rows in ``user_patches`` / ``item_patches`` until a background thread
+    rebuilds the matrices every ``refresh_seconds``.
+    """
+
+    def __init__(self, refresh_seconds=REFRESH_SECONDS, min_support=MIN_SUPPORT):
+        self.refresh_seconds = refresh_seconds
+        self.min_support = min_support
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._pid = None
+        self.built_at = 0.0
+        self.user_index, self.drink_ids, self.drink_index = {}, [], {}
+        self.by_user = sparse.csr_matrix((0, 0), dtype=np.int8)
+        self.by_drink = sparse.csr_matrix((0, 0), dtype=np.int8)
+        self.likes = np.zeros(0, dtype=np.int64)
+        self.user_patches, self.item_patches = {}, {}
+
+    # -----------------------------
+    # BUILD
+    # -----------------------------
+    def build(self, likes):
+        """likes: iterable of (user_id, drink_id) pairs."""
+        user_index, drink_index = {}, {}
+        rows, cols = [], []
+        for user_id, drink_id in likes:
+            rows.append(user_index.setdefault(user_id, len(user_index)))
+            cols.append(drink_index.setdefault(drink_id, len(drink_index)))
+
+        by_user = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int8), (np.array(rows, dtype=np.int32), np.array(cols, dtype=np.int32))),
+            shape=(len(user_index), len(drink_index)),
+        )
+        by_user.sum_duplicates()
+        by_user.data[:] = 1
+        by_drink = by_user.T.tocsr()
+
+        with self._lock:
+            self.user_index, self.drink_index = user_index, drink_index
+            self.drink_ids = list(drink_index)
+            self.by_user, self.by_drink = by_user, by_drink
+            self.likes = np.diff(by_drink.indptr).astype(np.int64)
+            self.user_patches, self.item_patches = {}, {}
+            self.built_at = time.monotonic()
+
+    def build_from_db(self, db):
+        cursor = db["reviews"].find(
+            {"rating": {"$gte": LIKED_RATING}}, {"_id": 0, "user_id": 1, "drink_id": 1}
+        )
+        self.build((str(r["user_id"]), r["drink_id"]) for r in cursor)
+
+    def stale(self):
+        return not self.built_at or time.monotonic() - self.built_at > self.refresh_seconds
+
+    def ensure_fresh(self, db):
+        """Build on first use, then keep rebuilding from a background thread
+        (one per process) while requests are served from the previous build."""
+        if not self.built_at:
+            with self._build_lock:
+                if not self.built_at:
+                    self.build_from_db(db)
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._pid = os.getpid()
+                    threading.Thread(target=self._run, args=(db,), name="also-liked-refresh", daemon=True).start()
+
+    def _run(self, db):
+        while True:
+            time.sleep(self.refresh_seconds)
+            try:
+                with self._build_lock:
+                    self.build_from_db(db)
+            except Exception:
+                logger.exception("also-liked refresh failed")
+
+    # -----------------------------
+    # INCREMENTAL UPDATES
+    # -----------------------------
+    @staticmethod
+    def _slice(matrix, patches, row):
+        patch = patches.get(row)
+        if patch is not None:
+            return patch
+        if row >= matrix.shape[0]:
+            return np.zeros(0, dtype=np.int32)
+        return matrix.indices[matrix.indptr[row]:matrix.indptr[row + 1]]
+
+    def note_review(self, user_id, drink_id, rating, sign=1):
+        """Fold one added (sign=1) or deleted (sign=-1) review into the model."""
+        if not isinstance(rating, (int, float)) or rating < LIKED_RATING:
+            return
+        with self._lock:
+            u = self.user_index.setdefault(str(user_id), len(self.user_index))
+            i = self.drink_index.get(drink_id)
+            if i is None:
+                i = self.drink_index[drink_id] = len(self.drink_ids)
+                self.drink_ids.append(drink_id)
+                self.likes = np.append(self.likes, 0)
+
+            drinks = self._slice(self.by_user, self.user_patches, u)
+            users = self._slice(self.by_drink, self.item_patches, i)
+            if sign > 0 and i not in drinks:
+                self.user_patches[u] = np.union1d(drinks, [i]).astype(np.int32)
+                self.item_patches[i] = np.union1d(users, [u]).astype(np.int32)
+                self.likes[i] += 1
+            elif sign < 0 and i in drinks:
+                self.user_patches[u] = np.setdiff1d(drinks, [i]).astype(np.int32)
+                self.item_patches[i] = np.setdiff1d(users, [u]).astype(np.int32)
+                self.likes[i] -= 1
+
+    # -----------------------------
+    # SCORING
+    # -----------------------------
+    def _similarities(self, i):
+        """Cosine similarity of drink row i to every drink, 0 below min_support."""
+        likers = self._slice(self.by_drink, self.item_patches, i)
+        patched = [u for u in likers if u in self.user_patches]
+        plain = likers[~np.isin(likers, patched)] if patched else likers
+        plain = plain[plain < self.by_user.shape[0]]
+
+        co_liked = self.by_user[plain].indices
+        if patched:
+            co_liked = np.concatenate([co_liked] + [self.user_patches[u] for u in patched])
+        co = np.bincount(co_liked, minlength=len(self.drink_ids)).astype(np.float32)
+        co[i] = 0
+        co[co < self.min_support] = 0
+        return co / np.sqrt(np.maximum(self.likes[i] * self.likes, 1))
+
+    def also_liked(self, drink_id, offset=0, limit=10):
+        """Returns [(drink_id, similarity)] best first."""
+        with self._lock:
+            i = self.drink_index.get(drink_id)
+            if i is None:
+                return []
+            return self._top(self._similarities(i), offset, limit)
+
+    def scores(self, liked, limit=200):
+        """liked: {drink_id: weight}. Weighted sum of the liked drinks'
+        similarities, as {drink_id: score} for the best ``limit`` drinks."""
+        with self._lock:
+            total = np.zeros(len(self.drink_ids), dtype=np.float32)
+            for drink_id, weight in liked.items():
+                i = self.drink_index.get(drink_id)
+                if i is not None:
+                    total += weight * self._similarities(i)
+            return dict(self._top(total, 0, limit))
+
+    def _top(self, scores, offset, limit):
+        wanted = min(offset + limit, int(np.count_nonzero(scores > 0)))
+        if wanted <= offset:
+            return []
+        top = np.argpartition(-scores, wanted - 1)[:wanted]
+        top = top[np.argsort(-scores[top], kind="stable")][offset:]
+        return [(self.drink_ids[j], float(scores[j])) for j in top]
@@ -0,0 +1,67 @@
+import hashlib
+import json
+import threading
+import time
+from functools import wraps
+
+from flask import make_response, request
+
+
+class Polled:
+    """A value read through ``fetch`` at most every ``seconds`` (a version stamp)."""
+
+    def __init__(self, fetch, seconds=1.0):
+        self.fetch = fetch
+        self.seconds = seconds
+        self._lock = threading.Lock()
+        self._value = None
+        self._read_at = None
+
+    def get(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._read_at is None or now - self._read_at >= self.seconds:
+                self._value, self._read_at = self.fetch(), now
+            return self._value
+
+    def invalidate(self):
+        """Re-read on the next get(), e.g. right after this process wrote what
+        ``fetch`` reads; other processes still catch up within ``seconds``."""
+        with self._lock:
+            self._read_at = None
+
+
+def strong_etag(*parts):
+    raw = json.dumps(parts, default=str, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:24]
+
+
+def conditional(validator):
+    """Give successful GET responses a strong ETag and answer If-None-Match.
+
+    The tag hashes ``validator()`` (a cheap stamp that changes whenever the
+    data behind the view does, e.g. the catalog version) together with the
+    path, query string and request body, so a revalidation is answered
+    with 304 before the view runs, without touching Mongo.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = strong_etag(
+                validator(), request.path, sorted(request.args.items(multi=True)), request.get_data(as_text=True)
+            )
+            if request.if_none_match.contains(etag):
+                response = make_response("", 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            # caches may keep the body but must revalidate before reusing it
+            response.headers["Cache-Control"] = "no-cache"
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,97 @@
+from pymongo import UpdateOne
+
+FAVORITES_COLLECTION = "favorites"
+
+# counter field on the user document -> collection whose documents it counts (by user_id)
+USER_COUNTERS = {
+    "review_count": "reviews",
+    "producer_review_count": "producer_reviews",
+    "favorite_count": FAVORITES_COLLECTION,
+}
+
+# where move_user_arrays() parks a user's fav_drinks while copying them
+MOVING_FAVORITES = "fav_drinks_moving"
+
+# id arrays users embedded before reviews and favorites got their own collections
+LEGACY_USER_ARRAYS = ("reviews", "producer_reviews", "fav_drinks", MOVING_FAVORITES)
+
+
+def bump_counter(db, user_id, field, sign=1):
+    """Add (sign=1) or remove (sign=-1) one from a user's counter.
+
+    Users the migration has not reached yet have no counters; they are left
+    alone and get exact values when move_user_arrays() counts them.
+    """
+    db["users"].update_one({"_id": user_id, field: {"$exists": True}}, {"$inc": {field: sign}})
+
+
+def bump_counters(db, field, deltas):
+    """bump_counter() for many users at once; deltas is {user_id: amount}."""
+    ops = [
+        UpdateOne({"_id": user_id, field: {"$exists": True}}, {"$inc": {field: amount}})
+        for user_id, amount in deltas.items()
+        if amount
+    ]
+    if ops:
+        db["users"].bulk_write(ops, ordered=False)
+
+
+def counter_step(field, sign=1):
+    """Pipeline stage moving a counter by sign, for updates that match the
+    user by name. Users without the counter are left without it."""
+    value = "$" + field
+    return {
+        "$set": {
+            field: {"$cond": [{"$eq": [{"$ifNull": [value, None]}, None]}, "$$REMOVE", {"$add": [value, sign]}]}
+        }
+    }
+
+
+def count_by_user(db, user_ids):
+    """{user_id: {counter field: count}} for every counter, all users at once."""
+    counts = {user_id: dict.fromkeys(USER_COUNTERS, 0) for user_id in user_ids}
+    for field, collection_name in USER_COUNTERS.items():
+        pipeline = [
+            {"$match": {"user_id": {"$in": list(user_ids)}}},
+            {"$group": {"_id": "$user_id", "count": {"$sum": 1}}},
+        ]
+        for r in db[collection_name].aggregate(pipeline):
+            counts[r["_id"]][field] = r["count"]
+    return counts
+
+
+def rebuild_user_counters(db, batch_size=500, log=print):
+    """Recount every migrated user's counters from the collections.
+
+    Returns the ids of users whose stored counters had drifted.
+    """
+    drift = []
+    last_id = None
+
+    while True:
+        query = {"review_count": {"$exists": True}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+
+        batch = list(
+            db["users"].find(query, {"_id": 1, **dict.fromkeys(USER_COUNTERS, 1)})
+            .sort("_id", 1)
+            .limit(batch_size)
+        )
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+
+        counts = count_by_user(db, [u["_id"] for u in batch])
+        ops = []
+        for u in batch:
+            fresh = counts[u["_id"]]
+            if any(u.get(field) != value for field, value in fresh.items()):
+                drift.append(u["_id"])
+                ops.append(UpdateOne({"_id": u["_id"]}, {"$set": fresh}))
+        if ops:
+            db["users"].bulk_write(ops, ordered=False)
+
+        log(f"users: {len(drift)} counters drifted (last _id {last_id})")
+
+    return drift
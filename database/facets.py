@@ -0,0 +1,268 @@
+import threading
+import time
+
+import numpy as np
+
+FACET_FIELDS = ("category", "drinkType", "style", "country")
+# bucket edges for the numeric facets; the last bucket is open-ended
+RANGE_EDGES = {"abv": (0, 4, 5, 6, 7, 8, 10), "ibu": (0, 20, 40, 60, 80)}
+DRINK_FIELDS = {"_id": 0, "id": 1, "producerId": 1, **{f: 1 for f in FACET_FIELDS if f != "country"}, **{f: 1 for f in RANGE_EDGES}}
+
+MISSING = 0  # value codes start at 1
+
+
+def bucket_labels(edges):
+    labels = [f"{lo}-{hi}" for lo, hi in zip(edges, edges[1:])]
+    return labels + [f"{edges[-1]}+"]
+
+
+class FacetIndex:
+    """Faceted filtering and counting over the drink catalog, in memory.
+
+    Every facet field is a column of small integer value codes, one per
+    drink (MISSING when unset), plus a posting list (sorted drink slots)
+    per value; abv/ibu are bucketed the same way and keep their raw values
+    for exact range checks. A query starts from the smallest filter's
+    posting lists and checks the other filters against the candidates'
+    codes, then counts each field with one bincount over the matches, so
+    the work grows with the number of matches rather than the catalog.
+
+    Counts follow the usual multi-select convention: each field is counted
+    under every filter except its own, so the other values of a field stay
+    visible after one is picked. Unfiltered counts are cached and the
+    columns are rebuilt when the catalog stamp passed to ensure_fresh()
+    moves.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self.built_at = 0.0
+        self.catalog_stamp = None
+        self.ids, self.slots = [], {}
+        self.alive = np.zeros(0, dtype=bool)
+        self.dead = 0
+        self.values = {f: [] for f in FACET_FIELDS}
+        self.codes = {f: np.zeros(0, dtype=np.int16) for f in (*FACET_FIELDS, *RANGE_EDGES)}
+        self.numbers = {f: np.zeros(0, dtype=np.float32) for f in RANGE_EDGES}
+        self.postings = {f: [] for f in self.codes}
+        self.base_counts = {}
+
+    # -----------------------------
+    # BUILD
+    # -----------------------------
+    def build(self, drinks, producer_countries, catalog_stamp=None):
+        """drinks: iterable of drink docs; producer_countries: producer id -> country;
+        catalog_stamp: the catalog version they were read at."""
+        drinks = sorted({d["id"]: d for d in drinks}.values(), key=lambda d: d["id"])
+        values, codes = {}, {}
+        for field in FACET_FIELDS:
+            column = [self._value(d, field, producer_countries) for d in drinks]
+            values[field] = sorted({v for v in column if v is not None})
+            lookup = {v: code for code, v in enumerate(values[field], 1)}
+            codes[field] = np.array([lookup.get(v, MISSING) for v in column], dtype=np.int16)
+        numbers = {}
+        for field in RANGE_EDGES:
+            numbers[field] = np.array([self._number(d, field) for d in drinks], dtype=np.float32).reshape(len(drinks))
+            codes[field] = self._buckets(field, numbers[field])
+
+        with self._lock:
+            self.ids = [d["id"] for d in drinks]
+            self.slots = {drink_id: slot for slot, drink_id in enumerate(self.ids)}
+            self.alive = np.ones(len(drinks), dtype=bool)
+            self.dead = 0
+            self.values, self.codes, self.numbers = values, codes, numbers
+            self.postings = {field: self._posting_lists(column) for field, column in codes.items()}
+            self.base_counts = {field: self._bincount(field, codes[field]) for field in codes}
+            self.built_at = time.monotonic()
+            self.catalog_stamp = catalog_stamp
+
+    def build_from_db(self, db, catalog_stamp=None):
+        countries = {p["id"]: p.get("country") for p in db["producers"].find({}, {"_id": 0, "id": 1, "country": 1})}
+        self.build(db["drinks"].find({}, DRINK_FIELDS), countries, catalog_stamp)
+
+    def stale(self, catalog_stamp=None):
+        return not self.built_at or catalog_stamp != self.catalog_stamp
+
+    def ensure_fresh(self, db, catalog_stamp=None):
+        """Rebuild when the catalog moved past the indexed ``catalog_stamp`` (see
+        CatalogStore.stamp); other threads keep reading the old columns meanwhile."""
+        if not self.stale(catalog_stamp):
+            return
+        if self._build_lock.acquire(blocking=not self.built_at):
+            try:
+                if self.stale(catalog_stamp):
+                    self.build_from_db(db, catalog_stamp)
+            finally:
+                self._build_lock.release()
+
+    @staticmethod
+    def _value(drink, field, producer_countries):
+        value = producer_countries.get(drink.get("producerId")) if field == "country" else drink.get(field)
+        return value if isinstance(value, str) and value else None
+
+    @staticmethod
+    def _number(drink, field):
+        value = drink.get(field)
+        return value if isinstance(value, (int, float)) else np.nan
+
+    @staticmethod
+    def _buckets(field, numbers):
+        """Bucket codes: 1 for the first RANGE_EDGES bucket, MISSING for no value."""
+        codes = np.digitize(numbers, RANGE_EDGES[field][1:]) + 1
+        codes[np.isnan(numbers)] = MISSING
+        return codes.astype(np.int16)
+
+    @staticmethod
+    def _posting_lists(codes):
+        order = np.argsort(codes, kind="stable").astype(np.int32)
+        return np.split(order, np.cumsum(np.bincount(codes))[:-1])
+
+    # -----------------------------
+    # INCREMENTAL UPDATES
+    # -----------------------------
+    def upsert(self, drinks, producer_countries):
+        """Add or update drinks in place. New facet values get the next free
+        code (and sort into place on the next rebuild)."""
+        with self._lock:
+            for d in drinks:
+                slot = self.slots.get(d["id"])
+                if slot is None:
+                    slot = self.slots[d["id"]] = len(self.ids)
+                    self.ids.append(d["id"])
+                    self.alive = np.append(self.alive, True)
+                    for field in self.codes:
+                        self.codes[field] = np.append(self.codes[field], MISSING).astype(np.int16)
+                    for field in RANGE_EDGES:
+                        self.numbers[field] = np.append(self.numbers[field], np.nan).astype(np.float32)
+                    new = True
+                else:
+                    new = False
+                    self.dead -= int(not self.alive[slot])
+                self.alive[slot] = True
+
+                new_codes = {}
+                for field in FACET_FIELDS:
+                    value = self._value(d, field, producer_countries)
+                    if value is not None and value not in self.values[field]:
+                        self.values[field].append(value)
+                    new_codes[field] = MISSING if value is None else self.values[field].index(value) + 1
+                for field in RANGE_EDGES:
+                    self.numbers[field][slot] = self._number(d, field)
+                    new_codes[field] = self._buckets(field, self.numbers[field][slot:slot + 1])[0]
+                for field, code in new_codes.items():
+                    self._move(field, slot, code, new)
+            self.base_counts = {}
+
+    def _move(self, field, slot, code, new):
+        """Set one drink's code, keeping the posting lists sorted."""
+        postings = self.postings[field]
+        if not new:
+            old = self.codes[field][slot]
+            postings[old] = postings[old][postings[old] != slot]
+        while len(postings) <= code:
+            postings.append(np.zeros(0, dtype=np.int32))
+        postings[code] = np.insert(postings[code], np.searchsorted(postings[code], slot), slot)
+        self.codes[field][slot] = code
+
+    def remove(self, drink_ids):
+        with self._lock:
+            for drink_id in drink_ids:
+                slot = self.slots.get(drink_id)
+                if slot is not None:
+                    self.dead += int(self.alive[slot])
+                    self.alive[slot] = False
+            self.base_counts = {}
+
+    # -----------------------------
+    # QUERYING
+    # -----------------------------
+    def _filters(self, selected, ranges):
+        """field -> (candidate codes, check) where check(slots) is a mask of the
+        slots that pass. Values are OR-ed within a field."""
+        filters = {}
+        for field, wanted in selected.items():
+            lookup = {v: code for code, v in enumerate(self.values[field], 1)}
+            codes = [lookup[v] for v in wanted if v in lookup]
+            keep = np.zeros(len(self.values[field]) + 1, dtype=bool)
+            keep[codes] = True
+            filters[field] = (codes, lambda slots, field=field, keep=keep: keep[self.codes[field][slots]])
+        for field, (low, high) in ranges.items():
+            low = -np.inf if low is None else low
+            high = np.inf if high is None else high
+            edges = RANGE_EDGES[field] + (np.inf,)
+            # buckets overlapping [low, high); the first one also holds values below its edge
+            codes = [i + 1 for i in range(len(edges) - 1) if (i == 0 or edges[i] < high) and edges[i + 1] > low]
+
+            def check(slots, field=field, low=low, high=high):
+                column = self.numbers[field][slots]
+                return (column >= low) & (column < high)
+
+            filters[field] = (codes, check)
+        return filters
+
+    def _candidates(self, field, codes):
+        postings = self.postings[field]
+        parts = [postings[c] for c in codes if c < len(postings)]
+        if not parts:
+            return np.zeros(0, dtype=np.int32)
+        # timsort merges the already sorted runs in linear-ish time
+        return parts[0] if len(parts) == 1 else np.sort(np.concatenate(parts), kind="stable")
+
+    def _select(self, filters, skip=None):
+        """Sorted live slots passing every filter but ``skip``'s; None when unfiltered."""
+        active = {field: f for field, f in filters.items() if field != skip}
+        if not active:
+            return None
+        sizes = {field: sum(len(self.postings[field][c]) for c in codes if c < len(self.postings[field]))
+                 for field, (codes, _) in active.items()}
+        driver = min(sizes, key=sizes.get)
+        slots = self._candidates(driver, active[driver][0])
+        if self.dead:
+            slots = slots[self.alive[slots]]
+        for field, (_, check) in active.items():
+            if len(slots):
+                slots = slots[check(slots)]
+        return slots
+
+    def _bincount(self, field, codes):
+        size = len(self.values[field]) + 1 if field in FACET_FIELDS else len(RANGE_EDGES[field]) + 1
+        return np.bincount(codes, minlength=size)
+
+    def _counts(self, field, slots):
+        if slots is None:
+            if field not in self.base_counts:
+                self.base_counts[field] = self._bincount(field, self.codes[field][self.alive])
+            counts = self.base_counts[field]
+        else:
+            counts = self._bincount(field, self.codes[field][slots])
+
+        if field in RANGE_EDGES:
+            edges = RANGE_EDGES[field]
+            return [
+                {"value": label, "min": lo, "max": hi, "count": int(n)}
+                for label, lo, hi, n in zip(bucket_labels(edges), edges, edges[1:] + (None,), counts[1:])
+                if n
+            ]
+        order = np.argsort(-counts[1:], kind="stable")
+        return [{"value": self.values[field][i], "count": int(counts[i + 1])} for i in order if counts[i + 1]]
+
+    def query(self, selected=None, ranges=None, offset=0, limit=20):
+        """selected: field -> values to keep; ranges: "abv"/"ibu" -> (min, max), max exclusive.
+
+        Returns (drink ids in catalog order for the requested window,
+        total matches, facet counts).
+        """
+        with self._lock:
+            filters = self._filters(selected or {}, ranges or {})
+            matched = self._select(filters)
+            if matched is None and not self.dead:
+                total, page = len(self.ids), self.ids[offset:offset + limit]
+            else:
+                slots = np.flatnonzero(self.alive) if matched is None else matched
+                total, page = len(slots), [self.ids[slot] for slot in slots[offset:offset + limit]]
+
+            facets = {}
+            for field in self.codes:
+                facets[field] = self._counts(field, self._select(filters, skip=field) if field in filters else matched)
+            return page, total, facets
@@ -0,0 +1,118 @@
+MAX_RADIUS_KM = 20000
+LOCATION_FIELD = "location"
+
+
+class InvalidGeoQuery(ValueError):
+    """Bad coordinates or bounds in a geo request (400)."""
+
+
+def geo_point(lng, lat):
+    """GeoJSON point for valid coordinates, None otherwise."""
+    if isinstance(lng, bool) or isinstance(lat, bool):
+        return None
+    if not isinstance(lng, (int, float)) or not isinstance(lat, (int, float)):
+        return None
+    if not (-180 <= lng <= 180 and -90 <= lat <= 90):
+        return None
+    return {"type": "Point", "coordinates": [float(lng), float(lat)]}
+
+
+def with_location(producer):
+    """The producer with a GeoJSON ``location`` built from latitude/longitude.
+
+    Producers without usable coordinates get no field at all, so the
+    2dsphere index (sparse by default) simply leaves them out.
+    """
+    point = geo_point(producer.get("longitude"), producer.get("latitude"))
+    if point is None:
+        return producer
+    return {**producer, LOCATION_FIELD: point}
+
+
+def _number(args, name, low, high, default=None):
+    raw = args.get(name)
+    if raw is None:
+        if default is None:
+            raise InvalidGeoQuery(f"Missing {name}")
+        return default
+    try:
+        value = float(raw)
+    except ValueError as e:
+        raise InvalidGeoQuery(f"Invalid {name}") from e
+    if not low <= value <= high:
+        raise InvalidGeoQuery(f"{name} must be between {low} and {high}")
+    return value
+
+
+def point_from_args(args):
+    """(lng, lat) from ?lat=&lng=."""
+    return _number(args, "lng", -180, 180), _number(args, "lat", -90, 90)
+
+
+def radius_from_args(args):
+    return _number(args, "radius_km", 0, MAX_RADIUS_KM)
+
+
+def box_from_args(args):
+    """(min_lng, min_lat, max_lng, max_lat) from ?min_lng=&min_lat=&max_lng=&max_lat=.
+
+    min_lng > max_lng means the box crosses the antimeridian.
+    """
+    box = tuple(
+        _number(args, name, low, high)
+        for name, low, high in (
+            ("min_lng", -180, 180),
+            ("min_lat", -90, 90),
+            ("max_lng", -180, 180),
+            ("max_lat", -90, 90),
+        )
+    )
+    if box[1] > box[3]:
+        raise InvalidGeoQuery("min_lat must not be greater than max_lat")
+    if box[0] == box[2] or box[1] == box[3]:
+        raise InvalidGeoQuery("The box is empty")
+    return box
+
+
+def near_stage(lng, lat, max_km=None, query=None):
+    """$geoNear stage (must come first in the pipeline); adds distance_km."""
+    stage = {
+        "near": {"type": "Point", "coordinates": [lng, lat]},
+        "key": LOCATION_FIELD,
+        "spherical": True,
+        "distanceField": "distance_km",
+        "distanceMultiplier": 0.001,
+    }
+    if max_km is not None:
+        stage["maxDistance"] = max_km * 1000
+    if query:
+        stage["query"] = query
+    return {"$geoNear": stage}
+
+
+def _polygon(min_lng, min_lat, max_lng, max_lat):
+    ring = [[min_lng, min_lat], [max_lng, min_lat], [max_lng, max_lat], [min_lng, max_lat], [min_lng, min_lat]]
+    return {"$geoWithin": {"$geometry": {"type": "Polygon", "coordinates": [ring]}}}
+
+
+def within_box_query(min_lng, min_lat, max_lng, max_lat):
+    """Filter for producers inside a map viewport.
+
+    GeoJSON polygons may not span a hemisphere, so the box is cut into
+    pieces at most 90 degrees wide (which also keeps the geodesic top and
+    bottom edges close to the viewport's parallels), and a box crossing
+    the antimeridian is split there first.
+    """
+    spans = [(min_lng, max_lng)] if min_lng <= max_lng else [(min_lng, 180.0), (-180.0, max_lng)]
+    pieces = []
+    for start, end in spans:
+        while True:
+            stop = min(end, start + 90)
+            pieces.append(_polygon(start, min_lat, stop, max_lat))
+            if stop >= end:
+                break
+            start = stop
+
+    if len(pieces) == 1:
+        return {LOCATION_FIELD: pieces[0]}
+    return {"$or": [{LOCATION_FIELD: piece} for piece in pieces]}
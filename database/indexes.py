@@ -0,0 +1,198 @@
+from pymongo import ASCENDING, DESCENDING, GEOSPHERE, IndexModel
+from pymongo.errors import OperationFailure
+
+from geo import within_box_query
+
+# Bump the version whenever an index is added, removed or changed.
+INDEX_MANIFEST_VERSION = 8
+
+INDEX_MANIFEST = {
+    "users": [
+        {"keys": [("username", ASCENDING)], "name": "username_unique", "unique": True},
+    ],
+    "drinks": [
+        {"keys": [("id", ASCENDING)], "name": "id_unique", "unique": True},
+        # keyset paging sorts on (id, _id)
+        {"keys": [("id", ASCENDING), ("_id", ASCENDING)], "name": "id__id"},
+        {"keys": [("category", ASCENDING), ("id", ASCENDING), ("_id", ASCENDING)], "name": "category_id__id"},
+        {"keys": [("producerId", ASCENDING)], "name": "producerId"},
+    ],
+    "producers": [
+        {"keys": [("id", ASCENDING)], "name": "id_unique", "unique": True},
+        {"keys": [("id", ASCENDING), ("_id", ASCENDING)], "name": "id__id"},
+        {"keys": [("location", GEOSPHERE)], "name": "location_2dsphere"},
+    ],
+    "reviews": [
+        {"keys": [("drink_id", ASCENDING), ("_id", ASCENDING)], "name": "drink_id__id"},
+        {"keys": [("user_id", ASCENDING), ("drink_id", ASCENDING)], "name": "user_drink_unique", "unique": True},
+        {"keys": [("user_id", ASCENDING), ("_id", DESCENDING)], "name": "user_id__id"},
+    ],
+    "producer_reviews": [
+        {"keys": [("producer_id", ASCENDING), ("_id", ASCENDING)], "name": "producer_id__id"},
+        {"keys": [("user_id", ASCENDING), ("producer_id", ASCENDING)], "name": "user_producer_unique", "unique": True},
+        {"keys": [("user_id", ASCENDING), ("_id", DESCENDING)], "name": "user_id__id"},
+    ],
+    "favorites": [
+        {"keys": [("user_id", ASCENDING), ("drink_id", ASCENDING)], "name": "user_drink_unique", "unique": True},
+        {"keys": [("user_id", ASCENDING), ("_id", ASCENDING)], "name": "user_id__id"},
+    ],
+    "drink_ratings": [
+        {"keys": [("avg", DESCENDING), ("count", DESCENDING), ("_id", DESCENDING)], "name": "avg_count_id"},
+        {"keys": [("count", DESCENDING), ("avg", DESCENDING), ("_id", DESCENDING)], "name": "count_avg_id"},
+        {"keys": [("updated_at", DESCENDING)], "name": "updated_at"},
+    ],
+}
+
+# unique indexes that are the only duplicate check of some writes
+# (collection -> index name); see UniqueGuard
+WRITE_GUARDS = {
+    "reviews": "user_drink_unique",
+    "producer_reviews": "user_producer_unique",
+    "favorites": "user_drink_unique",
+}
+
+# Representative query shapes issued by the endpoints, used by explain_queries().
+EXPLAIN_QUERIES = [
+    ("POST /user_exists", "users", {"username": "admin"}),
+    ("GET /drinks?category=", "drinks", {"category": "British Ale"}),
+    ("GET /get_favorites", "drinks", {"id": {"$in": ["drink_1"]}}),
+    ("GET /producers/<id>", "producers", {"id": "producer_1"}),
+    ("GET /producers/within", "producers", within_box_query(-1, 51, 1, 52)),
+    ("GET /producers/near?with_drinks=1", "drinks", {"producerId": {"$in": ["producer_1"]}}),
+    ("GET /reviews/drink/<id>", "reviews", {"drink_id": "drink_1"}),
+    ("GET /reviews/producer/<id>", "producer_reviews", {"producer_id": "producer_1"}),
+    ("POST /reviews (duplicate check)", "reviews", {"user_id": None, "drink_id": "drink_1"}),
+    ("POST /producer-reviews (duplicate check)", "producer_reviews", {"user_id": None, "producer_id": "producer_1"}),
+    ("GET /dashboard (recent reviews)", "reviews", {"user_id": None}),
+    ("GET /dashboard (recent producer reviews)", "producer_reviews", {"user_id": None}),
+    ("GET /get_favorites (ids)", "favorites", {"user_id": None}),
+    ("POST /add_to_favorites (duplicate check)", "favorites", {"user_id": None, "drink_id": "drink_1"}),
+]
+
+
+def _index_model(spec):
+    options = {k: v for k, v in spec.items() if k != "keys"}
+    return IndexModel(spec["keys"], **options)
+
+
+def applied_manifest_version(db):
+    """The manifest version ensure_indexes() last applied completely, or None."""
+    meta = db["schema_meta"].find_one({"_id": "indexes"}, {"version": 1})
+    return (meta or {}).get("version")
+
+
+def ensure_indexes(db, log=print, force=False):
+    """Create every index in the manifest. Safe to call on every startup.
+
+    Skipped when this manifest version was already applied without
+    failures (force=True rebuilds anyway, e.g. after an index was dropped by
+    hand). The version is only recorded once every index exists, so failed
+    ones are retried on the next start. Returns the (collection, index
+    name) pairs that could not be created.
+    """
+    if not force and applied_manifest_version(db) == INDEX_MANIFEST_VERSION:
+        return []
+
+    failed = []
+    for collection_name, specs in INDEX_MANIFEST.items():
+        for spec in specs:
+            # one call per index so a single failure does not block the rest
+            try:
+                db[collection_name].create_indexes([_index_model(spec)])
+            except OperationFailure as e:
+                # e.g. existing duplicates block a unique index; keep serving and report it
+                log(f"Could not create index {spec['name']} on {collection_name}: {e}")
+                failed.append((collection_name, spec["name"]))
+
+    if not failed:
+        db["schema_meta"].update_one(
+            {"_id": "indexes"}, {"$set": {"version": INDEX_MANIFEST_VERSION}}, upsert=True
+        )
+    return failed
+
+
+def index_fields(collection_name, index_name):
+    """The key fields of a manifest index."""
+    spec = next(spec for spec in INDEX_MANIFEST[collection_name] if spec["name"] == index_name)
+    return [field for field, _ in spec["keys"]]
+
+
+class UniqueGuard:
+    """Tracks whether the WRITE_GUARDS indexes exist.
+
+    Writes that rely on one for duplicate detection are refused while it is
+    missing (e.g. existing duplicates blocked it, see dedupe_unique_keys()).
+    The indexes are listed once at startup (refresh()); a missing one is
+    looked up again on every check, so writes resume as soon as it is
+    built, without a restart.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.missing = None
+
+    def refresh(self):
+        self.missing = {
+            collection_name
+            for collection_name, index_name in WRITE_GUARDS.items()
+            if index_name not in self.db[collection_name].index_information()
+        }
+
+    def ready(self, collection_name):
+        if self.missing is None:
+            self.refresh()
+        if collection_name in self.missing:
+            if WRITE_GUARDS[collection_name] in self.db[collection_name].index_information():
+                self.missing.discard(collection_name)
+        return collection_name not in self.missing
+
+
+def report_indexes(db):
+    """Compare the live indexes with the manifest.
+
+    Returns a dict per collection with "missing" (in the manifest but not in
+    the database), "unmanaged" (in the database but not in the manifest) and
+    "unused" (never used since the server started, from $indexStats).
+    """
+    report = {}
+    for collection_name, specs in INDEX_MANIFEST.items():
+        collection = db[collection_name]
+        existing = collection.index_information()
+        wanted = {spec["name"] for spec in specs}
+
+        try:
+            stats = list(collection.aggregate([{"$indexStats": {}}]))
+        except OperationFailure:
+            stats = []
+
+        report[collection_name] = {
+            "missing": sorted(wanted - set(existing)),
+            "unmanaged": sorted(set(existing) - wanted - {"_id_"}),
+            "unused": sorted(
+                s["name"] for s in stats if s["name"] != "_id_" and s["accesses"]["ops"] == 0
+            ),
+        }
+    return report
+
+
+def _plan_stages(plan):
+    stages = [plan.get("stage")]
+    if "inputStage" in plan:
+        stages += _plan_stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        stages += _plan_stages(child)
+    return stages
+
+
+def explain_queries(db):
+    """Explain each endpoint query and return (endpoint, collection, stages, uses_index)."""
+    results = []
+    for endpoint, collection_name, query in EXPLAIN_QUERIES:
+        explained = db.command(
+            "explain", {"find": collection_name, "filter": query}, verbosity="queryPlanner"
+        )
+        winning = explained["queryPlanner"]["winningPlan"]
+        # newer servers wrap the classic plan tree in "queryPlan"
+        stages = _plan_stages(winning.get("queryPlan", winning))
+        results.append((endpoint, collection_name, stages, "IXSCAN" in stages and "COLLSCAN" not in stages))
+    return results
@@ -0,0 +1,211 @@
+from pymongo import ASCENDING, ReturnDocument, UpdateMany, UpdateOne
+
+from counters import FAVORITES_COLLECTION, LEGACY_USER_ARRAYS, MOVING_FAVORITES, count_by_user
+from geo import LOCATION_FIELD, geo_point
+
+REVIEW_COLLECTIONS = ("reviews", "producer_reviews")
+
+
+def backfill_review_usernames(db, batch_size=500, log=print):
+    """Copy the author's username onto every review that does not have one yet.
+
+    Works in _id order, one batch at a time. Only documents still missing the
+    field are selected, so the command can be stopped and re-run at any point
+    and it continues where it left off.
+    """
+    total = 0
+    for name in REVIEW_COLLECTIONS:
+        collection = db[name]
+        last_id = None
+        updated = 0
+
+        while True:
+            query = {"username": {"$exists": False}}
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+
+            batch = list(
+                collection.find(query, {"_id": 1, "user_id": 1})
+                .sort("_id", ASCENDING)
+                .limit(batch_size)
+            )
+            if not batch:
+                break
+            last_id = batch[-1]["_id"]
+
+            user_ids = list({r["user_id"] for r in batch if r.get("user_id") is not None})
+            users = {u["_id"]: u.get("username") for u in db["users"].find({"_id": {"$in": user_ids}}, {"username": 1})}
+            # authors that no longer exist get null, as the per-review lookup returned
+            users.update({user_id: None for user_id in user_ids if user_id not in users})
+
+            ops = [
+                UpdateMany(
+                    {"user_id": user_id, "username": {"$exists": False}, "_id": {"$lte": last_id}},
+                    {"$set": {"username": username}},
+                )
+                for user_id, username in users.items()
+            ]
+            if ops:
+                updated += collection.bulk_write(ops, ordered=False).modified_count
+
+            log(f"{name}: {updated} reviews updated (last _id {last_id})")
+
+        total += updated
+
+    return total
+
+
+def propagate_username(db, user_id, username):
+    """Rewrite the denormalized author name on all reviews written by user_id."""
+    modified = 0
+    for name in REVIEW_COLLECTIONS:
+        res = db[name].update_many({"user_id": user_id}, {"$set": {"username": username}})
+        modified += res.modified_count
+    return modified
+
+
+def backfill_producer_locations(db, batch_size=500, log=print):
+    """Store a GeoJSON point built from latitude/longitude on every producer
+    that has coordinates but no location yet.
+
+    Resumable like backfill_review_usernames; producers whose coordinates are
+    out of range are skipped and left without a location.
+    """
+    collection = db["producers"]
+    last_id = None
+    updated = 0
+
+    while True:
+        query = {
+            LOCATION_FIELD: {"$exists": False},
+            "latitude": {"$type": "number"},
+            "longitude": {"$type": "number"},
+        }
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+
+        batch = list(
+            collection.find(query, {"_id": 1, "latitude": 1, "longitude": 1})
+            .sort("_id", ASCENDING)
+            .limit(batch_size)
+        )
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+
+        ops = []
+        for p in batch:
+            point = geo_point(p["longitude"], p["latitude"])
+            if point is not None:
+                ops.append(UpdateOne({"_id": p["_id"]}, {"$set": {LOCATION_FIELD: point}}))
+        if ops:
+            updated += collection.bulk_write(ops, ordered=False).modified_count
+
+        log(f"producers: {updated} locations set (last _id {last_id})")
+
+    return updated
+
+
+def move_user_arrays(db, batch_size=500, log=print):
+    """Move favorites out of the user documents and replace the embedded
+    review / favorite id arrays with counters.
+
+    Online and resumable like backfill_review_usernames: only users without
+    counters are selected, so the command can be stopped and re-run at any
+    point. Reviews already live in their own collections; their id arrays
+    are just dropped.
+
+    fav_drinks is first parked in MOVING_FAVORITES, which
+    /remove_from_favorites also pulls from. Each user is then rewritten by a
+    single update that sets the counters and drops the arrays, returning what
+    was still parked, so a favorite removed while it was being copied is
+    deleted again instead of coming back.
+    """
+    users = db["users"]
+    favorites = db[FAVORITES_COLLECTION]
+    last_id = None
+    moved = 0
+
+    while True:
+        query = {"review_count": {"$exists": False}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+
+        ids = [u["_id"] for u in users.find(query, {"_id": 1}).sort("_id", ASCENDING).limit(batch_size)]
+        if not ids:
+            break
+        last_id = ids[-1]
+
+        # park the arrays, merged with whatever an interrupted run left parked
+        pending = {"_id": {"$in": ids}, "review_count": {"$exists": False}}
+        users.update_many(pending, [{"$set": {
+            MOVING_FAVORITES: {"$concatArrays": [
+                {"$ifNull": ["$" + MOVING_FAVORITES, []]}, {"$ifNull": ["$fav_drinks", []]},
+            ]},
+            "fav_drinks": "$$REMOVE",
+        }}])
+        parked = {
+            u["_id"]: list(dict.fromkeys(str(x) for x in u[MOVING_FAVORITES]))
+            for u in users.find(pending, {MOVING_FAVORITES: 1})
+        }
+
+        # upserts, so favorites copied by an interrupted run are not duplicated;
+        # ordered, so listing them by _id keeps the old array order
+        ops = [
+            UpdateOne(
+                {"user_id": user_id, "drink_id": drink_id},
+                {"$setOnInsert": {"user_id": user_id, "drink_id": drink_id}},
+                upsert=True,
+            )
+            for user_id, drink_ids in parked.items()
+            for drink_id in drink_ids
+        ]
+        if ops:
+            favorites.bulk_write(ops, ordered=True)
+
+        counts = count_by_user(db, list(parked))
+        raced = []
+        for user_id, drink_ids in parked.items():
+            before = users.find_one_and_update(
+                {"_id": user_id, "review_count": {"$exists": False}},
+                {"$set": counts[user_id], "$unset": dict.fromkeys(LEGACY_USER_ARRAYS, "")},
+                projection={MOVING_FAVORITES: 1},
+                return_document=ReturnDocument.BEFORE,
+            )
+            if before is None:
+                continue
+            moved += 1
+            still_parked = {str(x) for x in before.get(MOVING_FAVORITES) or []}
+            removed = [drink_id for drink_id in drink_ids if drink_id not in still_parked]
+            if removed:
+                favorites.delete_many({"user_id": user_id, "drink_id": {"$in": removed}})
+                raced.append(user_id)
+
+        # users who removed favorites mid-copy: their counts were taken too early
+        if raced:
+            recount = count_by_user(db, raced)
+            users.bulk_write([UpdateOne({"_id": user_id}, {"$set": recount[user_id]}) for user_id in raced])
+
+        log(f"users: {moved} rewritten (last _id {last_id})")
+
+    return moved
+
+
+def dedupe_unique_keys(db, collection_name, fields, log=print):
+    """Delete documents repeating another one's ``fields``, keeping the oldest
+    (lowest _id), so a unique index on those fields can be built.
+
+    Returns the number of documents deleted. Rollups and counters derived
+    from the collection have to be rebuilt afterwards.
+    """
+    pipeline = [
+        {"$group": {"_id": {f: "$" + f for f in fields}, "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ]
+    deleted = keys = 0
+    for group in db[collection_name].aggregate(pipeline, allowDiskUse=True):
+        extra = sorted(group["ids"])[1:]
+        deleted += db[collection_name].delete_many({"_id": {"$in": extra}}).deleted_count
+        keys += 1
+    log(f"{collection_name}: deleted {deleted} duplicates of {keys} {'/'.join(fields)} keys")
+    return deleted
@@ -0,0 +1,109 @@
+import base64
+
+from bson import json_util
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 200
+
+
+class InvalidPage(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    """Turn the sort key values of the last returned row into an opaque token."""
+    raw = json_util.dumps(values).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """Inverse of encode_cursor(). Raises InvalidPage for tampered tokens."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json_util.loads(raw.decode("utf-8"))
+    except Exception as e:
+        raise InvalidPage("Invalid cursor") from e
+    if not isinstance(values, list):
+        raise InvalidPage("Invalid cursor")
+    return values
+
+
+def page_request(args, default_limit=DEFAULT_LIMIT):
+    """Read ?limit=&cursor= from the query string.
+
+    Returns None when the caller asked for neither (legacy, unpaged response),
+    otherwise (limit, cursor_values) where cursor_values is None on the
+    first page.
+    """
+    if "limit" not in args and "cursor" not in args:
+        return None
+
+    try:
+        limit = int(args.get("limit", default_limit))
+    except ValueError as e:
+        raise InvalidPage("Invalid limit") from e
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    cursor = args.get("cursor")
+    return limit, decode_cursor(cursor) if cursor else None
+
+
+def keyset_filter(sort, values):
+    """Filter selecting the rows strictly after `values` in `sort` order.
+
+    `sort` is a list of (field, direction) pairs ending with a unique
+    tie-breaker (normally _id).
+    """
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {f: v for (f, _), v in zip(sort[:i], values[:i])}
+        clause[field] = {"$gt" if direction > 0 else "$lt": values[i]}
+        clauses.append(clause)
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+def with_cursor(query, sort, values):
+    if values is None:
+        return query
+    if len(values) != len(sort):
+        raise InvalidPage("Invalid cursor")
+    after = keyset_filter(sort, values)
+    return {"$and": [query, after]} if query else after
+
+
+def split_page(rows, limit, key):
+    """Trim a limit+1 fetch to `limit` rows and build the next cursor.
+
+    `key` maps a row to its sort key values.
+    """
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(key(rows[-1]))
+
+
+def find_page(collection, query, sort, paging, projection=None):
+    """Keyset-paged find. Returns (docs, next_cursor).
+
+    With paging=None the whole result is returned in natural order, as the
+    unpaged endpoints always did.
+    """
+    if paging is None:
+        return list(collection.find(query, projection)), None
+
+    limit, values = paging
+
+    # sort fields the projection excludes (usually _id) are still needed
+    # for the cursor; fetch them and drop them from the returned rows
+    hidden = [field for field, _ in sort if projection and projection.get(field) == 0]
+    if hidden:
+        projection = {f: v for f, v in projection.items() if f not in hidden} or None
+
+    docs = list(
+        collection.find(with_cursor(query, sort, values), projection).sort(sort).limit(limit + 1)
+    )
+    docs, next_cursor = split_page(docs, limit, lambda d: [d.get(field) for field, _ in sort])
+    for d in docs:
+        for field in hidden:
+            d.pop(field, None)
+    return docs, next_cursor
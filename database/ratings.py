@@ -0,0 +1,129 @@
+from datetime import datetime, timezone
+
+from pymongo import ReplaceOne, UpdateOne
+
+ROLLUP_COLLECTION = "drink_ratings"
+
+
+def _rating_value(rating):
+    if isinstance(rating, bool) or not isinstance(rating, (int, float)):
+        return None
+    return float(rating)
+
+
+def _rollup_update(total, count):
+    """Pipeline adding total / count to a rollup, so sum, count and avg
+    always move together."""
+    return [
+        {
+            "$set": {
+                "sum": {"$add": [{"$ifNull": ["$sum", 0]}, total]},
+                "count": {"$add": [{"$ifNull": ["$count", 0]}, count]},
+                "updated_at": datetime.now(timezone.utc),
+            }
+        },
+        {
+            "$set": {
+                "avg": {
+                    "$cond": [{"$gt": ["$count", 0]}, {"$divide": ["$sum", "$count"]}, None]
+                }
+            }
+        },
+    ]
+
+
+def apply_rating(db, drink_id, rating, sign=1):
+    """Add (sign=1) or remove (sign=-1) one rating from the drink's rollup.
+
+    A single pipeline update, so sum, count and avg always move together.
+    """
+    value = _rating_value(rating)
+    if value is None:
+        return
+
+    db[ROLLUP_COLLECTION].update_one({"_id": str(drink_id)}, _rollup_update(sign * value, sign), upsert=True)
+
+
+def apply_ratings(db, ratings):
+    """Add many (drink_id, rating) pairs at once: one update per drink, all
+    in a single unordered bulk write."""
+    totals = {}
+    for drink_id, rating in ratings:
+        value = _rating_value(rating)
+        if value is not None:
+            total = totals.setdefault(str(drink_id), [0.0, 0])
+            total[0] += value
+            total[1] += 1
+    ops = [
+        UpdateOne({"_id": drink_id}, _rollup_update(total, count), upsert=True)
+        for drink_id, (total, count) in totals.items()
+    ]
+    if ops:
+        db[ROLLUP_COLLECTION].bulk_write(ops, ordered=False)
+
+
+def latest_rating_update(db):
+    """When any rollup last changed (newest updated_at), None if there are none."""
+    newest = db[ROLLUP_COLLECTION].find_one({}, {"_id": 0, "updated_at": 1}, sort=[("updated_at", -1)])
+    return (newest or {}).get("updated_at")
+
+
+def rebuild_ratings(db, tolerance=1e-6):
+    """Recompute every rollup from the reviews collection.
+
+    Returns the list of drink ids whose stored rollup had drifted (or was
+    missing / orphaned) before the rebuild.
+    """
+    pipeline = [
+        {"$match": {"rating": {"$type": "number"}}},
+        {"$group": {"_id": "$drink_id", "sum": {"$sum": "$rating"}, "count": {"$sum": 1}}},
+    ]
+    fresh = {r["_id"]: r for r in db["reviews"].aggregate(pipeline)}
+    stored = {r["_id"]: r for r in db[ROLLUP_COLLECTION].find()}
+
+    drift = []
+    for drink_id, r in fresh.items():
+        old = stored.get(drink_id)
+        if (
+            old is None
+            or old.get("count") != r["count"]
+            or abs((old.get("sum") or 0) - r["sum"]) > tolerance
+        ):
+            drift.append(drink_id)
+    orphans = [drink_id for drink_id in stored if drink_id not in fresh]
+    drift += [drink_id for drink_id in orphans if stored[drink_id].get("count")]
+
+    now = datetime.now(timezone.utc)
+    ops = [
+        ReplaceOne(
+            {"_id": drink_id},
+            {
+                "sum": float(r["sum"]),
+                "count": r["count"],
+                "avg": r["sum"] / r["count"],
+                "updated_at": now,
+            },
+            upsert=True,
+        )
+        for drink_id, r in fresh.items()
+    ]
+    if ops:
+        db[ROLLUP_COLLECTION].bulk_write(ops, ordered=False)
+    if orphans:
+        db[ROLLUP_COLLECTION].delete_many({"_id": {"$in": orphans}})
+
+    return drift
+
+
+def sync_drink_ratings(db):
+    """Copy the rollups onto the avgRating/reviewCount fields of the drinks."""
+    ops = [
+        UpdateOne(
+            {"id": r["_id"]},
+            {"$set": {"avgRating": round(r["avg"], 1) if r.get("avg") is not None else None, "reviewCount": r["count"]}},
+        )
+        for r in db[ROLLUP_COLLECTION].find()
+    ]
+    if not ops:
+        return 0
+    return db["drinks"].bulk_write(ops, ordered=False).modified_count
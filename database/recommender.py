@@ -0,0 +1,263 @@
+import threading
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+from scipy import sparse
+
+NUMERIC_FIELDS = ("abv", "ibu", "srm")
+DRINK_FIELDS = {"_id": 0, "id": 1, "category": 1, "style": 1, "drinkType": 1, "tags": 1, **{f: 1 for f in NUMERIC_FIELDS}}
+
+# relative weight of each feature group before rows are L2-normalized
+WEIGHTS = {"category": 1.0, "style": 1.0, "drinkType": 0.5, "tags": 0.8, "numeric": 0.6, "tastes": 0.8}
+
+REFRESH_SECONDS = 300
+LIKED_RATING = 4
+
+
+class ContentRecommender:
+    """Content-based drink recommendations from an in-memory feature matrix.
+
+    Every drink is a row of one-hot category/style/drinkType, multi-hot
+    tags, standardized abv/ibu/srm and the share of its reviews that
+    mention each taste. Rows are L2-normalized, so X @ X.T is the cosine
+    similarity matrix. That matrix is never materialized (it is n^2): the
+    scores for a user are the summed similarity rows of the drinks they
+    like, which is the single product X @ X[liked].sum(0).
+
+    X is a CSR matrix: a drink only has a dozen or so non-zero features.
+    Rows changed after a build (new review tastes, edited drinks) are kept
+    in ``patches`` rather than rewritten in place, since changing a CSR row's
+    sparsity pattern copies the whole matrix; the next refresh folds them in.
+    """
+
+    def __init__(self, refresh_seconds=REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self.built_at = 0.0
+        self.ids = []
+        self.index = {}
+        self.matrix = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self.patches = {}
+
+    # -----------------------------
+    # BUILD
+    # -----------------------------
+    @staticmethod
+    def load_taste_counts(reviews_collection):
+        pipeline = [
+            {"$project": {"drink_id": 1, "tastes": {"$ifNull": ["$tastes", []]}}},
+            {"$unwind": {"path": "$tastes", "preserveNullAndEmptyArrays": True}},
+            {"$group": {"_id": {"drink_id": "$drink_id", "taste": "$tastes"}, "n": {"$sum": 1}}},
+        ]
+        counts = defaultdict(Counter)
+        for row in reviews_collection.aggregate(pipeline):
+            counts[row["_id"]["drink_id"]][row["_id"].get("taste")] += row["n"]
+        return counts
+
+    def build(self, drinks, taste_counts):
+        """drinks: iterable of drink docs; taste_counts: drink_id -> Counter(taste -> reviews),
+        where the None key counts reviews without tastes."""
+        # duplicate ids in the catalog: the last document wins
+        drinks = list({d["id"]: d for d in drinks}.values())
+        vocab = {group: {} for group in ("category", "style", "drinkType", "tags", "tastes")}
+        for d in drinks:
+            for group in ("category", "style", "drinkType"):
+                if d.get(group):
+                    vocab[group].setdefault(d[group], len(vocab[group]))
+            for tag in d.get("tags") or []:
+                vocab["tags"].setdefault(tag, len(vocab["tags"]))
+        for counts in taste_counts.values():
+            for taste in counts:
+                if taste is not None:
+                    vocab["tastes"].setdefault(taste, len(vocab["tastes"]))
+
+        numeric = np.array(
+            [[d.get(f) if isinstance(d.get(f), (int, float)) else np.nan for f in NUMERIC_FIELDS] for d in drinks],
+            dtype=np.float64,
+        ).reshape(len(drinks), len(NUMERIC_FIELDS))
+        # per-column mean/std over the drinks that have a value (ibu/srm are often null)
+        present = ~np.isnan(numeric)
+        count = np.maximum(present.sum(axis=0), 1)
+        filled = np.where(present, numeric, 0.0)
+        mean = filled.sum(axis=0) / count
+        std = np.sqrt((np.where(present, numeric - mean, 0.0) ** 2).sum(axis=0) / count)
+        std[std == 0] = 1.0
+
+        offsets, width = {}, 0
+        for group in ("category", "style", "drinkType", "tags", "tastes"):
+            offsets[group] = width
+            width += len(vocab[group])
+        offsets["numeric"] = width
+        width += len(NUMERIC_FIELDS)
+
+        self._vocab, self._offsets, self._mean, self._std = vocab, offsets, mean, std
+        ids, indptr, indices, data = [], [0], [], []
+        for d in drinks:
+            ids.append(d["id"])
+            cols, values = self._vector(d, taste_counts.get(d["id"]))
+            indices.extend(cols)
+            data.extend(values)
+            indptr.append(len(indices))
+        matrix = sparse.csr_matrix(
+            (np.array(data, dtype=np.float32), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int64)),
+            shape=(len(drinks), width),
+        )
+
+        with self._lock:
+            self.ids = ids
+            self.index = {drink_id: row for row, drink_id in enumerate(ids)}
+            self.docs = {d["id"]: d for d in drinks}
+            self.matrix = matrix
+            self.patches = {}
+            self.tastes = {drink_id: Counter(taste_counts.get(drink_id, {})) for drink_id in ids}
+            self.built_at = time.monotonic()
+
+    def build_from_db(self, db):
+        drinks = db["drinks"].find({}, DRINK_FIELDS)
+        self.build(drinks, self.load_taste_counts(db["reviews"]))
+
+    def ensure_fresh(self, db):
+        """Rebuild when stale. Other threads keep serving the previous matrix
+        while one of them rebuilds; only the very first build blocks."""
+        if not self.stale():
+            return
+        if self._build_lock.acquire(blocking=not self.ids):
+            try:
+                if self.stale():
+                    self.build_from_db(db)
+            finally:
+                self._build_lock.release()
+
+    def _vector(self, drink, tastes):
+        """Return the drink's normalized row as parallel (columns, values) arrays."""
+        v = {}
+        for group in ("category", "style", "drinkType"):
+            col = self._vocab[group].get(drink.get(group))
+            if col is not None:
+                v[self._offsets[group] + col] = WEIGHTS[group]
+
+        tags = {self._vocab["tags"][t] for t in drink.get("tags") or [] if t in self._vocab["tags"]}
+        for col in tags:
+            v[self._offsets["tags"] + col] = WEIGHTS["tags"] / np.sqrt(len(tags))
+
+        for i, field in enumerate(NUMERIC_FIELDS):
+            value = drink.get(field)
+            if isinstance(value, (int, float)):
+                v[self._offsets["numeric"] + i] = WEIGHTS["numeric"] * (value - self._mean[i]) / self._std[i]
+
+        if tastes:
+            total = sum(tastes.values())
+            for taste, n in tastes.items():
+                col = self._vocab["tastes"].get(taste)
+                if col is not None and total:
+                    v[self._offsets["tastes"] + col] = WEIGHTS["tastes"] * n / total
+
+        cols = np.fromiter(sorted(v), dtype=np.int32, count=len(v))
+        values = np.array([v[c] for c in cols], dtype=np.float32)
+        norm = np.linalg.norm(values)
+        return cols, (values / norm if norm else values)
+
+    # -----------------------------
+    # INCREMENTAL UPDATES
+    # -----------------------------
+    def stale(self):
+        return not self.ids or time.monotonic() - self.built_at > self.refresh_seconds
+
+    def note_review(self, drink_id, tastes, sign=1):
+        """Fold one added (sign=1) or removed (sign=-1) review into its drink's row.
+
+        Tastes never seen at build time are picked up by the next full refresh.
+        """
+        with self._lock:
+            row = self.index.get(drink_id)
+            if row is None:
+                return
+            counts = self.tastes.setdefault(drink_id, Counter())
+            for taste in tastes or [None]:
+                counts[taste] += sign
+                if counts[taste] <= 0:
+                    del counts[taste]
+            self.patches[row] = self._vector(self.docs[drink_id], counts)
+
+    def upsert_drinks(self, drinks):
+        """Add or update catalog rows in place.
+
+        Returns False, without changing anything, when a new category, style,
+        type or tag would need a new column; the caller should rebuild then.
+        """
+        drinks = list(drinks)
+        for d in drinks:
+            for group in ("category", "style", "drinkType"):
+                if d.get(group) and d[group] not in self._vocab[group]:
+                    return False
+            if any(t not in self._vocab["tags"] for t in d.get("tags") or []):
+                return False
+
+        with self._lock:
+            new_ids, new_rows = [], []
+            for d in drinks:
+                vector = self._vector(d, self.tastes.get(d["id"]))
+                self.docs[d["id"]] = d
+                row = self.index.get(d["id"])
+                if row is not None:
+                    self.patches[row] = vector
+                elif d["id"] not in new_ids:
+                    new_ids.append(d["id"])
+                    new_rows.append(vector)
+                else:
+                    new_rows[new_ids.index(d["id"])] = vector
+            if new_rows:
+                for drink_id in new_ids:
+                    self.index[drink_id] = len(self.ids)
+                    self.ids.append(drink_id)
+                width = self.matrix.shape[1]
+                self.matrix = sparse.vstack(
+                    [self.matrix] + [self._csr_row(cols, values, width) for cols, values in new_rows], format="csr"
+                )
+        return True
+
+    @staticmethod
+    def _csr_row(cols, values, width):
+        return sparse.csr_matrix((values, cols, [0, len(cols)]), shape=(1, width))
+
+    def _row(self, row):
+        patch = self.patches.get(row)
+        if patch is not None:
+            return patch
+        start, end = self.matrix.indptr[row], self.matrix.indptr[row + 1]
+        return self.matrix.indices[start:end], self.matrix.data[start:end]
+
+    # -----------------------------
+    # SCORING
+    # -----------------------------
+    def recommend(self, liked, exclude=(), offset=0, limit=10, boost=None):
+        """liked: {drink_id: weight}; boost: {drink_id: score} added on top of
+        the content score (e.g. collaborative signal). Returns [(drink_id, score)]
+        best first."""
+        with self._lock:
+            rows = [(self.index[d], w) for d, w in liked.items() if d in self.index]
+            if not rows:
+                return []
+            profile = np.zeros(self.matrix.shape[1], dtype=np.float32)
+            for row, weight in rows:
+                cols, values = self._row(row)
+                profile[cols] += weight * values
+            scores = self.matrix @ profile
+            for row, (cols, values) in self.patches.items():
+                scores[row] = values @ profile[cols]
+            for drink_id, score in (boost or {}).items():
+                row = self.index.get(drink_id)
+                if row is not None:
+                    scores[row] += score
+
+            skip = list({self.index[d] for d in set(exclude) | set(liked) if d in self.index})
+            scores[skip] = -np.inf
+
+            wanted = min(offset + limit, len(scores) - len(skip))
+            if wanted <= 0:
+                return []
+            top = np.argpartition(-scores, wanted - 1)[:wanted]
+            top = top[np.argsort(-scores[top], kind="stable")][offset:]
+            return [(self.ids[i], float(scores[i])) for i in top]
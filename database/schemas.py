@@ -3,29 +3,33 @@ class user_schema:
         self,
         username,
         password,
-        fav_drinks=None,
-        reviews=None,
         preferred_style=None,
         bio="",
         last_login=None,
+        review_count=0,
+        producer_review_count=0,
+        favorite_count=0,
     ):
         self.username = username
         self.password = password
-        self.fav_drinks = fav_drinks or []
-        self.reviews = reviews or []
         self.preferred_style = preferred_style
         self.bio = bio
         self.last_login = last_login
+        # favorites and reviews live in their own collections, keyed by user_id
+        self.review_count = review_count
+        self.producer_review_count = producer_review_count
+        self.favorite_count = favorite_count
 
     def to_json(self):
         return {
             "username": self.username,
             "password": self.password,
-            "fav_drinks": self.fav_drinks,
-            "reviews": self.reviews,
             "preferred_style": self.preferred_style,
             "bio": self.bio,
             "last_login": self.last_login,
+            "review_count": self.review_count,
+            "producer_review_count": self.producer_review_count,
+            "favorite_count": self.favorite_count,
         }
 
     @staticmethod
@@ -33,21 +37,23 @@ class user_schema:
         return user_schema(
             json.get("username"),
             json.get("password"),
-            json.get("fav_drinks", []),
-            json.get("reviews", []),
             json.get("preferred_style"),
             json.get("bio", ""),
             json.get("last_login"),
+            json.get("review_count", 0),
+            json.get("producer_review_count", 0),
+            json.get("favorite_count", 0),
         )
 
 
 class review_schema:
-    def __init__(self, drink_id, rating, review, tastes, user_id):
+    def __init__(self, drink_id, rating, review, tastes, user_id, username=None):
         self.drink_id = str(drink_id)
         self.rating = rating
         self.review = review
         self.tastes = tastes or []
         self.user_id = user_id
+        self.username = username
 
     def to_json(self):
         return {
@@ -56,6 +62,7 @@ class review_schema:
             "review": self.review,
             "tastes": self.tastes,
             "user_id": self.user_id,
+            "username": self.username,
         }
 
     @staticmethod
@@ -66,4 +73,5 @@ class review_schema:
             json.get("review"),
             json.get("tastes", []),
             json.get("user_id"),
+            json.get("username"),
         )
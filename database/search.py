@@ -0,0 +1,308 @@
+import math
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from collections import Counter, OrderedDict, defaultdict
+
+import numpy as np
+from scipy import sparse
+
+# weight of one token occurrence in each field; a drink's weighted token
+# counts are its BM25 term frequencies and their sum its length
+FIELD_WEIGHTS = {"name": 3.0, "producer": 2.0, "style": 1.5, "tags": 1.5, "category": 1.0, "description": 1.0}
+SEARCH_FIELDS = {"_id": 0, "id": 1, "name": 1, "style": 1, "category": 1, "tags": 1, "description": 1, "producerId": 1}
+
+K1 = 1.2
+B = 0.75
+MAX_EXPANSIONS = 16  # completions of the last query token that are searched
+COMPACT_AT = 10000  # changed drinks kept outside the matrix before a rebuild is due
+QUERY_CACHE_SIZE = 1024
+# terms in more drinks than this keep their best TOP_K postings pre-sorted,
+# so single-clause queries never scan them in full
+HEAVY_DF = 256
+TOP_K = 200
+
+TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """Lowercase, accent-folded alphanumeric tokens ("Bière" -> "biere")."""
+    if not text:
+        return []
+    text = unicodedata.normalize("NFKD", str(text).lower())
+    return TOKEN.findall(text.encode("ascii", "ignore").decode())
+
+
+def drink_terms(drink, producer_name=None):
+    """Weighted term frequencies of one drink."""
+    tf = Counter()
+    fields = dict(drink, producer=producer_name, tags=" ".join(drink.get("tags") or []))
+    for field, weight in FIELD_WEIGHTS.items():
+        for token in tokenize(fields.get(field)):
+            tf[token] += weight
+    return tf
+
+
+class SearchIndex:
+    """BM25 full-text index over the drink catalog.
+
+    Postings live in one CSR matrix, terms x drinks, whose values are the
+    BM25 term-frequency factor, so a query only multiplies by idf and sums.
+    All query tokens must match; the last one also matches as a prefix
+    (autocomplete) against the sorted vocabulary, scoring its best
+    completion.
+
+    Multi-token queries walk the rarest clause and probe the others with
+    binary searches. A single-clause query (one word, or one prefix) only
+    needs each term's best postings, which common terms keep pre-sorted in
+    ``top``.
+
+    Drinks added or changed after a build get a new slot: the old one is
+    marked dead and the new postings go to a small per-term ``delta`` until
+    the next rebuild, which happens when the catalog stamp passed to
+    ensure_fresh() moves or once COMPACT_AT drinks have changed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self.built_at = 0.0
+        self.catalog_stamp = None
+        self.version = 0
+        self.ids, self.slots = [], {}
+        self.alive = np.zeros(0, dtype=bool)
+        self.terms, self.vocab, self.new_terms = {}, [], []
+        self.vocab_df = np.zeros(0, dtype=np.int64)
+        self.postings = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self.top = {}
+        self.delta = defaultdict(list)
+        self.avgdl = 1.0
+        self._cache = OrderedDict()
+
+    # -----------------------------
+    # BUILD
+    # -----------------------------
+    def build(self, drinks, producer_names, catalog_stamp=None):
+        """drinks: iterable of drink docs; producer_names: producer id -> name;
+        catalog_stamp: the catalog version they were read at."""
+        drinks = {d["id"]: d for d in drinks}  # duplicate ids: the last document wins
+        terms, rows, cols, data, lengths = {}, [], [], [], []
+        for slot, d in enumerate(drinks.values()):
+            tf = drink_terms(d, producer_names.get(d.get("producerId")))
+            lengths.append(sum(tf.values()))
+            for term, n in tf.items():
+                rows.append(terms.setdefault(term, len(terms)))
+                cols.append(slot)
+                data.append(n)
+
+        lengths = np.array(lengths, dtype=np.float32)
+        avgdl = float(lengths.mean()) if len(lengths) else 1.0
+        tf = np.array(data, dtype=np.float32)
+        cols = np.array(cols, dtype=np.int32)
+        data = tf * (K1 + 1) / (tf + K1 * (1 - B + B * lengths[cols] / avgdl))
+        postings = sparse.csr_matrix((data, (np.array(rows, dtype=np.int32), cols)), shape=(len(terms), len(drinks)))
+
+        top = {}
+        for row in np.flatnonzero(np.diff(postings.indptr) > HEAVY_DF):
+            start, end = postings.indptr[row], postings.indptr[row + 1]
+            weights = postings.data[start:end]
+            best = np.argpartition(-weights, TOP_K - 1)[:TOP_K]
+            best = best[np.argsort(-weights[best], kind="stable")]
+            top[row] = (postings.indices[start:end][best], weights[best])
+
+        with self._lock:
+            self.ids = list(drinks)
+            self.slots = {drink_id: slot for slot, drink_id in enumerate(self.ids)}
+            self.alive = np.ones(len(self.ids), dtype=bool)
+            self.terms, self.vocab, self.new_terms = terms, sorted(terms), []
+            self.vocab_df = np.diff(postings.indptr)[[terms[t] for t in self.vocab]]
+            self.postings, self.top = postings, top
+            self.delta = defaultdict(list)
+            self.avgdl = avgdl
+            self.built_at = time.monotonic()
+            self.catalog_stamp = catalog_stamp
+            self._changed()
+
+    def build_from_db(self, db, catalog_stamp=None):
+        producer_names = {p["id"]: p.get("name") for p in db["producers"].find({}, {"_id": 0, "id": 1, "name": 1})}
+        self.build(db["drinks"].find({}, SEARCH_FIELDS), producer_names, catalog_stamp)
+
+    def stale(self, catalog_stamp=None):
+        if not self.built_at:
+            return True
+        return catalog_stamp != self.catalog_stamp or len(self.ids) - self.postings.shape[1] > COMPACT_AT
+
+    def ensure_fresh(self, db, catalog_stamp=None):
+        """Rebuild when the catalog moved past the indexed ``catalog_stamp`` (see
+        CatalogStore.stamp); other threads keep querying the old index meanwhile."""
+        if not self.stale(catalog_stamp):
+            return
+        if self._build_lock.acquire(blocking=not self.built_at):
+            try:
+                if self.stale(catalog_stamp):
+                    self.build_from_db(db, catalog_stamp)
+            finally:
+                self._build_lock.release()
+
+    # -----------------------------
+    # INCREMENTAL UPDATES
+    # -----------------------------
+    def _changed(self):
+        self.version += 1
+        self._cache.clear()
+
+    def upsert(self, drinks, producer_names):
+        with self._lock:
+            for d in drinks:
+                old = self.slots.get(d["id"])
+                if old is not None:
+                    self.alive[old] = False
+                slot = self.slots[d["id"]] = len(self.ids)
+                self.ids.append(d["id"])
+                self.alive = np.append(self.alive, True)
+
+                tf = drink_terms(d, producer_names.get(d.get("producerId")))
+                norm = K1 * (1 - B + B * sum(tf.values()) / self.avgdl)
+                for term, n in tf.items():
+                    if term not in self.terms and term not in self.delta:
+                        insort(self.new_terms, term)
+                    self.delta[term].append((slot, n * (K1 + 1) / (n + norm)))
+            self._changed()
+
+    def remove(self, drink_ids):
+        with self._lock:
+            for drink_id in drink_ids:
+                slot = self.slots.pop(drink_id, None)
+                if slot is not None:
+                    self.alive[slot] = False
+            self._changed()
+
+    # -----------------------------
+    # QUERYING
+    # -----------------------------
+    def _df(self, term):
+        row = self.terms.get(term)
+        base = 0 if row is None else self.postings.indptr[row + 1] - self.postings.indptr[row]
+        return base + len(self.delta.get(term, ()))
+
+    def _idf(self, df):
+        n = len(self.ids)
+        return np.float32(math.log(1 + (n - df + 0.5) / (df + 0.5)))
+
+    def _term_postings(self, term, need=None):
+        """(slots, idf-weighted scores) for one term, sorted by slot.
+
+        With ``need``, a common term may return just its ``need`` best live
+        postings instead, sorted by score.
+        """
+        idf = self._idf(self._df(term))
+        row = self.terms.get(term)
+        if row is None:
+            slots, weights = np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        elif need is not None and need <= TOP_K and row in self.top:
+            slots, weights = self.top[row]
+            live = self.alive[slots]
+            if live.sum() >= need:
+                slots, weights = slots[live][:need], weights[live][:need]
+            else:
+                slots, weights = self._row(row)
+        else:
+            slots, weights = self._row(row)
+        extra = self.delta.get(term)
+        if extra:
+            slots = np.concatenate([slots, np.array([s for s, _ in extra], dtype=np.int32)])
+            weights = np.concatenate([weights, np.array([w for _, w in extra], dtype=np.float32)])
+        return slots, weights * idf
+
+    def _row(self, row):
+        start, end = self.postings.indptr[row], self.postings.indptr[row + 1]
+        return self.postings.indices[start:end], self.postings.data[start:end]
+
+    def _completions(self, prefix):
+        """Vocabulary terms starting with ``prefix``: the prefix itself when it is a
+        term, plus the most common MAX_EXPANSIONS of the others."""
+        # tokens are [a-z0-9], so every completion sorts before prefix + "~"
+        start, end = bisect_left(self.vocab, prefix), bisect_left(self.vocab, prefix + "~")
+        if end - start > MAX_EXPANSIONS:
+            # the exact term sorts first; keep it however rare it is
+            exact = self.vocab[start] == prefix
+            start += exact
+            best = np.argpartition(-self.vocab_df[start:end], MAX_EXPANSIONS - 1)[:MAX_EXPANSIONS]
+            found = [prefix] * exact + [self.vocab[start + i] for i in best]
+        else:
+            found = self.vocab[start:end]
+        new = self.new_terms[bisect_left(self.new_terms, prefix):bisect_left(self.new_terms, prefix + "~")]
+        return found + new
+
+    @staticmethod
+    def _best_per_slot(parts):
+        """Merge (slots, scores) parts into slot-sorted arrays, keeping each slot's best score."""
+        if len(parts) == 1:
+            return parts[0]  # delta slots come after the matrix's, so still sorted
+        slots = np.concatenate([p[0] for p in parts])
+        scores = np.concatenate([p[1] for p in parts])
+        order = np.argsort(slots, kind="stable")
+        slots, scores = slots[order], scores[order]
+        starts = np.flatnonzero(np.r_[True, slots[1:] != slots[:-1]])
+        return slots[starts], np.maximum.reduceat(scores, starts)
+
+    def _probe(self, slots, terms):
+        """Best score of each candidate slot among ``terms``' postings, 0 if none match."""
+        best = np.zeros(len(slots), dtype=np.float32)
+        for term in terms:
+            term_slots, term_scores = self._term_postings(term)
+            if not len(term_slots):
+                continue
+            pos = np.minimum(np.searchsorted(term_slots, slots), len(term_slots) - 1)
+            found = term_slots[pos] == slots
+            best[found] = np.maximum(best[found], term_scores[pos[found]])
+        return best
+
+    def search(self, query, offset=0, limit=10, prefix=True):
+        """Returns [(drink_id, score)] best first."""
+        key = (query, offset, limit, prefix)
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit is not None:
+                self._cache.move_to_end(key)
+                return hit
+
+            result = self._search(query, offset, limit, prefix)
+            self._cache[key] = result
+            if len(self._cache) > QUERY_CACHE_SIZE:
+                self._cache.popitem(last=False)
+            return result
+
+    def _search(self, query, offset, limit, prefix):
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+
+        clauses = [[t] for t in tokens]
+        if prefix and not query[-1:].isspace():
+            clauses[-1] = self._completions(tokens[-1])
+        clauses.sort(key=lambda terms: sum(self._df(t) for t in terms))
+
+        # the rarest clause gives the candidates, the others filter and add to them
+        need = offset + limit if len(clauses) == 1 else None
+        parts = [p for p in (self._term_postings(t, need) for t in clauses[0]) if len(p[0])]
+        if not parts:
+            return []
+        slots, scores = self._best_per_slot(parts)
+        live = self.alive[slots]
+        slots, scores = slots[live], scores[live]
+        for terms in clauses[1:]:
+            if not len(slots):
+                break
+            best = self._probe(slots, terms)
+            found = best > 0
+            slots, scores = slots[found], scores[found] + best[found]
+
+        wanted = min(offset + limit, len(slots))
+        if wanted <= offset:
+            return []
+        top = np.argpartition(-scores, wanted - 1)[:wanted]
+        top = top[np.lexsort((slots[top], -scores[top]))][offset:]
+        return [(self.ids[slots[i]], float(scores[i])) for i in top]
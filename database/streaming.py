@@ -0,0 +1,60 @@
+from itertools import islice
+
+from flask import Response, current_app, request
+
+NDJSON = "application/x-ndjson"
+BATCH = 500
+
+
+def wants_ndjson():
+    """?format=ndjson: one document per line instead of a JSON array."""
+    return request.args.get("format") == "ndjson"
+
+
+def batches(items, size=BATCH):
+    items = iter(items)
+    while batch := list(islice(items, size)):
+        yield batch
+
+
+def stream_list(items, transform=None):
+    """Response encoding ``items`` (a cursor, a generator, ...) as it is sent.
+
+    Documents are pulled and encoded BATCH at a time, so memory stays at one
+    batch however long the listing is. ``transform`` maps each batch (a
+    list) before encoding, e.g. attach_producers. The first batch is read
+    here, so a failing query still becomes an ordinary error response
+    instead of a truncated body.
+    """
+    dumps = current_app.json.dumps
+    ndjson = wants_ndjson()
+
+    def encode(batch):
+        docs = transform(batch) if transform else batch
+        if ndjson:
+            return "".join(dumps(doc, separators=(",", ":")) + "\n" for doc in docs)
+        # one dumps() per batch is much cheaper than one per document
+        return dumps(docs, separators=(",", ":"))[1:-1]
+
+    chunks = batches(items)
+    first = next(chunks, None)
+    first = None if first is None else encode(first)
+
+    def encoded():
+        if first is not None:
+            yield first
+        for batch in chunks:
+            yield encode(batch)
+
+    def generate():
+        if ndjson:
+            yield from encoded()
+            return
+        yield "["
+        sep = ""
+        for body in encoded():
+            yield sep + body
+            sep = ","
+        yield "]"
+
+    return Response(generate(), mimetype=NDJSON if ndjson else "application/json")
@@ -0,0 +1,111 @@
+import os
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+
+import mongomock
+import pymongo
+import pytest
+
+# the data layer connects and seeds at import: point it at an in-memory server first
+os.environ["MONGODB_HOST"] = "mongodb://localhost/command_counts"
+os.environ["CATALOG_SNAPSHOT"] = ""
+pymongo.MongoClient = mongomock.MongoClient
+
+
+def _without_sort(method):
+    # pymongo >= 4.11 hands UpdateOne/ReplaceOne's sort= to the bulk builder;
+    # mongomock's builder predates it (and only a None sort reaches it here)
+    @wraps(method)
+    def add(*args, sort=None, **kwargs):
+        assert sort is None
+        return method(*args, **kwargs)
+
+    return add
+
+
+for _name in ("add_update", "add_replace"):
+    setattr(mongomock.collection.BulkOperationBuilder, _name, _without_sort(getattr(mongomock.collection.BulkOperationBuilder, _name)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# collection methods that each cost one round trip (one command) on a real server
+COMMANDS = (
+    "find", "find_one", "aggregate", "count_documents", "distinct",
+    "insert_one", "insert_many", "update_one", "update_many", "replace_one",
+    "delete_one", "delete_many", "find_one_and_update", "find_one_and_delete",
+    "find_one_and_replace", "bulk_write", "index_information", "create_indexes",
+)
+
+
+class CommandCounter:
+    """Counts Mongo commands issued by the current thread inside counting().
+
+    mongomock implements some methods on top of others (find_one calls
+    find), so only the outermost call is counted. Background threads (model
+    refreshes) are ignored.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        for name in COMMANDS:
+            setattr(mongomock.collection.Collection, name, self._wrap(name, getattr(mongomock.collection.Collection, name)))
+
+    def _wrap(self, name, method):
+        local = self._local
+
+        @wraps(method)
+        def counted(*args, **kwargs):
+            commands = getattr(local, "commands", None)
+            if commands is None or getattr(local, "depth", 0):
+                return method(*args, **kwargs)
+            commands[name] += 1
+            local.depth = 1
+            try:
+                return method(*args, **kwargs)
+            finally:
+                local.depth = 0
+
+        return counted
+
+    @contextmanager
+    def counting(self):
+        self._local.commands = commands = Counter()
+        try:
+            yield commands
+        finally:
+            self._local.commands = None
+
+
+command_counter = CommandCounter()
+
+
+@pytest.fixture(scope="session")
+def dbapp():
+    import app
+
+    # keep the catalog store and rating stamp from re-polling between measured requests
+    app.catalog.poll_seconds = float("inf")
+    app.ratings_updated.seconds = float("inf")
+    return app
+
+
+@pytest.fixture(scope="session")
+def client(dbapp):
+    return dbapp.app.test_client()
+
+
+@pytest.fixture
+def count_commands():
+    return command_counter.counting
+
+
+@pytest.fixture(scope="session")
+def drink_ids(dbapp):
+    return sorted({d["id"] for d in dbapp.drinks_collection.find({}, {"id": 1})})
+
+
+@pytest.fixture(scope="session")
+def producer_ids(dbapp):
+    return sorted({p["id"] for p in dbapp.producers_collection.find({}, {"id": 1})})
@@ -0,0 +1,18 @@
+import pytest
+
+
+@pytest.mark.parametrize("path", ["/drinks", "/producers"])
+@pytest.mark.parametrize("cursor", ["WzFd", "not-base64!", "WyJ4Il0"])
+def test_tampered_catalog_cursor_is_a_bad_request(client, path, cursor):
+    res = client.get(f"{path}?limit=2&cursor={cursor}", json={})
+    assert res.status_code == 400
+    assert "message" in res.get_json()
+
+
+def test_unknown_drink_is_not_found_without_mongo(client, count_commands, drink_ids):
+    client.get(f"/reviews/drink/{drink_ids[0]}")  # loads the catalog store
+
+    with count_commands() as commands:
+        assert client.get("/reviews/drink/no-such-drink").status_code == 404
+        assert client.get("/drinks/no-such-drink/also-liked").status_code == 404
+    assert not commands
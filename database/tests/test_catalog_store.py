@@ -0,0 +1,106 @@
+import mongomock
+import pytest
+from bson import ObjectId
+
+from catalog import CatalogStore, Snapshot, bump_catalog_version, catalog_stamp
+from pagination import InvalidPage, decode_cursor, encode_cursor
+
+DRINKS = [
+    {"_id": ObjectId(), "id": "b", "name": "Bière", "category": "Ale", "producerId": "p1", "abv": 5.5, "tags": ["x", "y"]},
+    # a repeated id: (id, _id) order breaks the tie
+    {"_id": ObjectId(), "id": "a", "name": "Second a", "category": "Lager", "producerId": "p2", "abv": 4},
+    {"_id": ObjectId(), "id": "a", "name": "First a", "category": "Ale", "producerId": "p1", "ibu": None},
+    {"_id": ObjectId(), "id": "c", "name": "Nested", "category": "Stout", "producerId": "p2", "meta": {"k": [1, 2]}},
+    {"_id": ObjectId(), "id": "d", "name": "Flag", "producerId": "p3", "organic": True, "added": ObjectId()},
+]
+PRODUCERS = [{"_id": ObjectId(), "id": f"p{n}", "name": f"Producer {n}"} for n in (1, 2, 3)]
+
+
+def public(docs):
+    """Documents as the store returns them: without _id."""
+    return [{k: v for k, v in d.items() if k != "_id"} for d in docs]
+
+
+@pytest.fixture(params=["table", "snapshot"])
+def store(request, tmp_path):
+    db = mongomock.MongoClient()[f"catalog_{request.node.name}"]
+    db.drinks.insert_many([dict(d) for d in DRINKS])
+    db.producers.insert_many([dict(p) for p in PRODUCERS])
+    bump_catalog_version(db)
+    store = CatalogStore(snapshot_path=str(tmp_path / "catalog.snap") if request.param == "snapshot" else None)
+    store.ensure_fresh(db)
+    return store
+
+
+def walk(store, name, query, limit):
+    rows, cursor = [], None
+    while True:
+        page, next_cursor = store.find(name, query, (limit, cursor))
+        rows += page
+        if next_cursor is None:
+            return rows
+        cursor = decode_cursor(next_cursor)
+
+
+def test_reads_match_the_documents(store):
+    assert list(store.scan("drinks", {})) == public(DRINKS)
+    assert store.drinks_by_ids(["a", "zzz"]) == public(DRINKS[1:3])
+    assert store.drinks_by_producer(["p2"]) == public([DRINKS[1], DRINKS[3]])
+    assert store.producer("p2") == public(PRODUCERS)[1]
+    assert store.producers_by_ids(["p1", "nope"]) == {"p1": public(PRODUCERS)[0]}
+    assert sorted(store.categories()) == ["Ale", "Lager", "Stout"]
+    assert list(store.scan("drinks", {"category": "Ale", "producerId": "p1"})) == public([DRINKS[0], DRINKS[2]])
+    assert store.scan("drinks", {"abv": {"$gt": 4}}) is None  # operators go to Mongo
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 10])
+def test_paged_walk_is_id_then_object_id_order(store, limit):
+    expected = public(sorted(DRINKS, key=lambda d: (d["id"], d["_id"])))
+    assert walk(store, "drinks", {}, limit) == expected
+    assert walk(store, "drinks", {"producerId": "p1"}, limit) == [d for d in expected if d["producerId"] == "p1"]
+
+
+@pytest.mark.parametrize("values", [["a"], ["a", "not an ObjectId"], ["a", ObjectId(), "extra"]])
+def test_cursor_of_the_wrong_shape_is_refused(store, values):
+    with pytest.raises(InvalidPage):
+        store.find("drinks", {}, (2, values))
+
+
+def test_snapshot_is_labelled_with_the_catalog_stamp(tmp_path):
+    db = mongomock.MongoClient()["catalog_stamp"]
+    db.drinks.insert_many([dict(d) for d in DRINKS])
+    db.producers.insert_many([dict(p) for p in PRODUCERS])
+    bump_catalog_version(db)
+    path = str(tmp_path / "catalog.snap")
+    store = CatalogStore(snapshot_path=path)
+    store.ensure_fresh(db)
+
+    snapshot = Snapshot(path)
+    assert (snapshot.version, snapshot.generation) == catalog_stamp(db) == store.stamp
+
+    # a new catalog version is picked up on the next poll
+    db.drinks.insert_one({"id": "e", "name": "New"})
+    bump_catalog_version(db)
+    store.polled_at = 0.0
+    store.ensure_fresh(db)
+    assert store.stamp == catalog_stamp(db)
+    assert [d["id"] for d in store.drinks_by_ids(["e"])] == ["e"]
+
+
+def test_route_cursor_round_trip_covers_the_catalog(dbapp, client):
+    expected = sorted(dbapp.drinks_collection.find(), key=lambda d: (d["id"], d["_id"]))
+    seen, cursor = [], None
+    while True:
+        res = client.get("/drinks?limit=37" + (f"&cursor={cursor}" if cursor else ""), json={})
+        assert res.status_code == 200
+        body = res.get_json()
+        seen += [d["id"] for d in body["items"]]
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+    assert seen == [d["id"] for d in expected]
+
+
+def test_cursor_from_another_sort_is_refused(client):
+    assert client.get(f"/drinks?limit=2&cursor={encode_cursor([1, 2, 3])}", json={}).status_code == 400
+    assert client.get("/drinks?limit=abc", json={}).status_code == 400
@@ -0,0 +1,89 @@
+"""Every rewritten read costs the same Mongo commands for 1 row as for N rows."""
+import pytest
+
+ROWS = 25
+
+
+@pytest.fixture(scope="module")
+def seeded(dbapp, client):
+    drink_ids = sorted({d["id"] for d in dbapp.drinks_collection.find({}, {"id": 1})})
+    producer_ids = sorted({p["id"] for p in dbapp.producers_collection.find({}, {"id": 1})})
+    one_drink, many_drink = drink_ids[-1], drink_ids[-2]
+    one_producer, many_producer = producer_ids[-1], producer_ids[-2]
+
+    def user(name):
+        assert client.post("/register_user", json={"username": name, "password": "x"}).status_code == 201
+
+    def review(name, drink_id):
+        res = client.post("/reviews", json={"username": name, "drink_id": drink_id, "rating": 5, "tastes": ["malty"]})
+        assert res.status_code == 201
+
+    def producer_review(name, producer_id):
+        res = client.post("/producer-reviews", json={"username": name, "producer_id": producer_id, "rating": 4})
+        assert res.status_code == 201
+
+    # "one" has one favorite and one review, "many" has ROWS of each
+    for name, count in (("one", 1), ("many", ROWS)):
+        user(name)
+        for drink_id in drink_ids[:count]:
+            assert client.post("/add_to_favorites", json={"username": name, "drink_id": drink_id}).status_code == 200
+            review(name, drink_id)
+        for producer_id in producer_ids[:count]:
+            producer_review(name, producer_id)
+
+    # one_drink / one_producer get one review, many_drink / many_producer ROWS
+    for n in range(ROWS):
+        user(f"fan{n}")
+        review(f"fan{n}", many_drink)
+        producer_review(f"fan{n}", many_producer)
+    review("fan0", one_drink)
+    producer_review("fan0", one_producer)
+
+    return {"one_drink": one_drink, "many_drink": many_drink, "one_producer": one_producer, "many_producer": many_producer}
+
+
+# name, request for 1 row, request for ROWS rows, key of the rows (or their count) in the JSON body
+# ({one_drink} etc. are filled in from the seeded fixture)
+MONGO_QUERY = {"query": {"abv": {"$gte": 0}}}
+REQUESTS = [
+    ("drinks", ("/drinks?limit=1", {}), (f"/drinks?limit={ROWS}", {}), "items"),
+    ("drinks (Mongo query)", ("/drinks?limit=1", MONGO_QUERY), (f"/drinks?limit={ROWS}", MONGO_QUERY), "items"),
+    ("favorites", ("/get_favorites", {"username": "one"}), ("/get_favorites", {"username": "many"}), None),
+    ("recommendations", ("/recommendations?limit=1", {"username": "one"}),
+     (f"/recommendations?limit={ROWS}", {"username": "one"}), "items"),
+    ("top rated", ("/top-rated?limit=1", {}), (f"/top-rated?limit={ROWS}", {}), "items"),
+    ("my reviews", ("/reviews", {"username": "one"}), ("/reviews", {"username": "many"}), None),
+    ("my producer reviews", ("/producer-reviews", {"username": "one"}), ("/producer-reviews", {"username": "many"}), None),
+    ("drink reviews", ("/reviews/drink/{one_drink}", {}), ("/reviews/drink/{many_drink}", {}), None),
+    ("producer reviews", ("/reviews/producer/{one_producer}", {}), ("/reviews/producer/{many_producer}", {}), None),
+    ("profile", ("/profile", {"username": "one"}), ("/profile", {"username": "many"}), "review_count"),
+    ("dashboard", ("/dashboard", {"username": "one"}), ("/dashboard", {"username": "many"}), "favorites"),
+]
+
+
+def rows(body, key):
+    """How many rows the response holds (or counts, for profile summaries)."""
+    value = body if key is None else body[key]
+    return value if isinstance(value, int) else len(value)
+
+
+@pytest.mark.parametrize("one_request, many_request, key", [r[1:] for r in REQUESTS], ids=[r[0] for r in REQUESTS])
+def test_commands_do_not_grow_with_rows(client, count_commands, seeded, one_request, many_request, key):
+    one_path, one_body = one_request[0].format(**seeded), one_request[1]
+    many_path, many_body = many_request[0].format(**seeded), many_request[1]
+
+    # first calls load the catalog store and the models
+    client.get(one_path, json=one_body)
+    client.get(many_path, json=many_body)
+
+    with count_commands() as one:
+        res = client.get(one_path, json=one_body)
+    assert res.status_code == 200
+    assert rows(res.get_json(), key) == 1
+
+    with count_commands() as many:
+        res = client.get(many_path, json=many_body)
+    assert res.status_code == 200
+    assert rows(res.get_json(), key) == ROWS
+
+    assert many == one
@@ -0,0 +1,33 @@
+import pytest
+
+from conditional import Polled
+
+
+def test_polled_reads_once_per_period_until_invalidated():
+    reads = []
+    polled = Polled(lambda: reads.append(1) or len(reads), seconds=float("inf"))
+    assert polled.get() == polled.get() == 1
+    polled.invalidate()
+    assert polled.get() == 2
+
+
+@pytest.mark.parametrize("path", ["/drinks?limit=5", "/producers?limit=5", "/drinks/categories", "/top-rated?limit=5"])
+def test_revalidation_is_answered_with_304(client, path):
+    res = client.get(path, json={})
+    etag = res.headers["ETag"]
+    assert res.status_code == 200 and res.headers["Cache-Control"] == "no-cache"
+
+    again = client.get(path, json={}, headers={"If-None-Match": etag})
+    assert again.status_code == 304 and not again.data
+    assert client.get(path, json={}, headers={"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_top_rated_tag_moves_with_the_review_that_changed_it(client, drink_ids):
+    etag = client.get("/top-rated?limit=5", json={}).headers["ETag"]
+
+    assert client.post("/register_user", json={"username": "tag_mover", "password": "x"}).status_code == 201
+    assert client.post("/reviews", json={"username": "tag_mover", "drink_id": drink_ids[3], "rating": 5}).status_code == 201
+
+    res = client.get("/top-rated?limit=5", json={}, headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.headers["ETag"] != etag
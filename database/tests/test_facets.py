@@ -0,0 +1,51 @@
+from facets import FacetIndex
+
+DRINKS = [
+    {"id": "a", "producerId": "p1", "category": "Ale", "style": "IPA", "abv": 6.5},
+    {"id": "b", "producerId": "p1", "category": "Ale", "style": "Pale", "abv": 4.5},
+    {"id": "c", "producerId": "p2", "category": "Lager", "style": "Pils", "abv": 5.0},
+    {"id": "d", "producerId": "p2", "category": "Stout", "abv": 8.2},
+]
+COUNTRIES = {"p1": "Ireland", "p2": "Germany"}
+
+
+def counts(facets, field):
+    return {f["value"]: f["count"] for f in facets[field]}
+
+
+def test_counts_skip_their_own_filter():
+    index = FacetIndex()
+    index.build(DRINKS, COUNTRIES)
+
+    ids, total, facets = index.query({"category": ["Ale"]})
+    assert (ids, total) == (["a", "b"], 2)
+    # other categories stay countable after one is picked
+    assert counts(facets, "category") == {"Ale": 2, "Lager": 1, "Stout": 1}
+    assert counts(facets, "country") == {"Ireland": 2}
+    assert counts(facets, "abv") == {"4-5": 1, "6-7": 1}
+
+    ids, total, facets = index.query({"country": ["Germany"]}, {"abv": (5, None)}, offset=1, limit=1)
+    assert (ids, total) == (["d"], 2)
+    assert counts(facets, "abv") == {"5-6": 1, "8-10": 1}
+
+
+def test_ensure_fresh_rebuilds_when_the_catalog_stamp_moves(dbapp):
+    index = FacetIndex()
+    builds = []
+    index.build_from_db = lambda db, stamp=None: (builds.append(stamp), FacetIndex.build_from_db(index, db, stamp))
+
+    index.ensure_fresh(dbapp.db, (1, "g"))
+    index.ensure_fresh(dbapp.db, (1, "g"))
+    index.ensure_fresh(dbapp.db, (2, "g"))
+    assert builds == [(1, "g"), (2, "g")]
+
+
+def test_faceted_route_defaults_to_twenty_drinks(client):
+    body = client.get("/drinks/faceted").get_json()
+    assert body["total"] > 20
+    assert len(body["items"]) == 20
+    assert body["next_cursor"]
+
+    second = client.get(f"/drinks/faceted?cursor={body['next_cursor']}").get_json()
+    assert len(second["items"]) == 20
+    assert not {d["id"] for d in body["items"]} & {d["id"] for d in second["items"]}
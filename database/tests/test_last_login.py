@@ -0,0 +1,45 @@
+import pytest
+
+
+@pytest.fixture
+def users(dbapp, client, request):
+    names = [f"login_{request.node.name}_{n}" for n in range(2)]
+    for name in names:
+        assert client.post("/register_user", json={"username": name, "password": "x"}).status_code == 201
+        # mongomock's $max cannot compare with a missing field (a server just sets it)
+        assert client.post("/last_login", json={"username": name}).status_code == 200
+    return names
+
+
+def last_login(dbapp, name):
+    return dbapp.users_collection.find_one({"username": name}).get("last_login")
+
+
+def test_batch_keeps_the_newest_login(dbapp, client, users):
+    first, second = users
+    body = {"updates": [
+        {"username": first, "last_login": "2099-01-02T00:00:00+00:00"},
+        {"username": second, "last_login": "2099-01-01T00:00:00+00:00"},
+        {"username": "nobody", "last_login": "2099-01-01T00:00:00+00:00"},
+    ]}
+    res = client.post("/last_login/batch", json=body)
+    assert res.status_code == 200 and res.get_json()["matched"] == 2
+
+    # an older batch from another auth worker does not move it back
+    old = {"updates": [{"username": first, "last_login": "2099-01-01T00:00:00+00:00"}]}
+    assert client.post("/last_login/batch", json=old).status_code == 200
+    assert last_login(dbapp, first) == "2099-01-02T00:00:00+00:00"
+    assert last_login(dbapp, second) == "2099-01-01T00:00:00+00:00"
+
+
+@pytest.mark.parametrize("updates", [["bob"], [None, 3], [{"username": ["x"], "last_login": "t"}], [{"username": "x"}]])
+def test_batch_skips_malformed_entries(dbapp, client, users, updates):
+    body = {"updates": updates + [{"username": users[0], "last_login": "2099-03-01T00:00:00+00:00"}]}
+    res = client.post("/last_login/batch", json=body)
+    assert res.status_code == 200 and res.get_json()["matched"] == 1
+    assert last_login(dbapp, users[0]) == "2099-03-01T00:00:00+00:00"
+
+
+@pytest.mark.parametrize("body", [{"updates": "bob"}, {"updates": {"username": "bob"}}, ["bob"]])
+def test_batch_rejects_updates_that_are_not_a_list(client, body):
+    assert client.post("/last_login/batch", json=body).status_code == 400
@@ -0,0 +1,73 @@
+import mongomock
+import pytest
+from bson import ObjectId
+
+from counters import LEGACY_USER_ARRAYS, MOVING_FAVORITES
+from migrations import backfill_producer_locations, backfill_review_usernames, dedupe_unique_keys, move_user_arrays
+
+
+@pytest.fixture
+def db(request):
+    return mongomock.MongoClient()[f"migrations_{request.node.name}"]
+
+
+def quiet(*_):
+    pass
+
+
+def test_backfill_review_usernames_is_resumable(db):
+    alice, bob, gone = ObjectId(), ObjectId(), ObjectId()
+    db.users.insert_many([{"_id": alice, "username": "alice"}, {"_id": bob, "username": "bob"}])
+    db.reviews.insert_many([{"user_id": alice, "drink_id": str(n)} for n in range(5)] + [{"user_id": gone, "drink_id": "x"}])
+    db.reviews.insert_one({"user_id": bob, "drink_id": "y", "username": "kept"})
+    db.producer_reviews.insert_many([{"user_id": bob, "producer_id": "p"}])
+
+    assert backfill_review_usernames(db, batch_size=2, log=quiet) == 7
+    assert sorted(r["username"] or "" for r in db.reviews.find()) == ["", "alice", "alice", "alice", "alice", "alice", "kept"]
+    assert db.producer_reviews.find_one()["username"] == "bob"
+    assert backfill_review_usernames(db, batch_size=2, log=quiet) == 0
+
+
+def test_backfill_producer_locations_skips_bad_coordinates(db):
+    db.producers.insert_many([
+        {"id": "a", "latitude": 53.3, "longitude": -6.2},
+        {"id": "b", "latitude": 123.0, "longitude": 0.0},
+        {"id": "c"},
+    ])
+    assert backfill_producer_locations(db, batch_size=1, log=quiet) == 1
+    located = {p["id"]: p.get("location") for p in db.producers.find()}
+    assert located["a"] == {"type": "Point", "coordinates": [-6.2, 53.3]}
+    assert located["b"] is None and located["c"] is None
+
+
+def test_move_user_arrays_keeps_order_and_finishes_an_interrupted_run(db):
+    users = [{"_id": ObjectId(), "username": f"u{n}", "fav_drinks": ["d3", "d1", "d2"], "reviews": []} for n in range(3)]
+    # an earlier run parked u2's first favorite and was stopped
+    users[2]["fav_drinks"], users[2][MOVING_FAVORITES] = ["d2"], ["d3"]
+    db.users.insert_many(users)
+    db.favorites.insert_one({"user_id": users[2]["_id"], "drink_id": "d3"})
+    db.reviews.insert_one({"user_id": users[0]["_id"], "drink_id": "d1"})
+
+    assert move_user_arrays(db, batch_size=2, log=quiet) == 3
+    for user in users:
+        doc = db.users.find_one({"_id": user["_id"]})
+        assert not set(LEGACY_USER_ARRAYS) & set(doc)
+        favorites = [f["drink_id"] for f in db.favorites.find({"user_id": user["_id"]}).sort("_id", 1)]
+        assert doc["favorite_count"] == len(favorites)
+    assert [f["drink_id"] for f in db.favorites.find({"user_id": users[0]["_id"]}).sort("_id", 1)] == ["d3", "d1", "d2"]
+    assert [f["drink_id"] for f in db.favorites.find({"user_id": users[2]["_id"]}).sort("_id", 1)] == ["d3", "d2"]
+    assert db.users.find_one({"_id": users[0]["_id"]})["review_count"] == 1
+    assert move_user_arrays(db, log=quiet) == 0
+
+
+def test_dedupe_unique_keys_keeps_the_oldest(db):
+    first, second, third, other = (ObjectId() for _ in range(4))
+    db.reviews.insert_many([
+        {"_id": second, "user_id": "u", "drink_id": "d"},
+        {"_id": first, "user_id": "u", "drink_id": "d"},
+        {"_id": third, "user_id": "u", "drink_id": "d"},
+        {"_id": other, "user_id": "u", "drink_id": "e"},
+    ])
+    assert dedupe_unique_keys(db, "reviews", ("user_id", "drink_id"), log=quiet) == 2
+    assert sorted(r["_id"] for r in db.reviews.find()) == sorted([first, other])
+    assert dedupe_unique_keys(db, "reviews", ("user_id", "drink_id"), log=quiet) == 0
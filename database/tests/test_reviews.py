@@ -0,0 +1,45 @@
+import pytest
+
+
+@pytest.fixture
+def reviewer(dbapp, client, request):
+    name = f"reviewer_{request.node.name}"
+    assert client.post("/register_user", json={"username": name, "password": "x"}).status_code == 201
+    return name
+
+
+def counters(dbapp, name):
+    user = dbapp.users_collection.find_one({"username": name})
+    return user["review_count"], user["producer_review_count"]
+
+
+@pytest.mark.parametrize("review_id", ["not-an-id", "WzFd", "0" * 23])
+def test_delete_with_malformed_id_leaves_counters_alone(dbapp, client, reviewer, drink_ids, producer_ids, review_id):
+    assert client.post("/reviews", json={"username": reviewer, "drink_id": drink_ids[0], "rating": 4}).status_code == 201
+    body = {"username": reviewer, "producer_id": producer_ids[0], "rating": 4}
+    assert client.post("/producer-reviews", json=body).status_code == 201
+
+    assert client.delete(f"/reviews/{review_id}", json={"username": reviewer}).status_code == 404
+    assert client.delete(f"/producer-reviews/{review_id}", json={"username": reviewer}).status_code == 404
+    assert counters(dbapp, reviewer) == (1, 1)
+
+
+def test_delete_moves_counter_only_when_a_review_is_deleted(dbapp, client, reviewer, drink_ids):
+    assert client.post("/reviews", json={"username": reviewer, "drink_id": drink_ids[0], "rating": 4}).status_code == 201
+    review_id = str(dbapp.reviews_collection.find_one({"username": reviewer})["_id"])
+
+    assert client.delete(f"/reviews/{review_id}", json={"username": "someone_else"}).status_code == 404
+    assert client.delete("/reviews/" + "0" * 24, json={"username": reviewer}).status_code == 404
+    assert counters(dbapp, reviewer) == (1, 0)
+
+    assert client.delete(f"/reviews/{review_id}", json={"username": reviewer}).status_code == 200
+    assert counters(dbapp, reviewer) == (0, 0)
+    assert client.delete(f"/reviews/{review_id}", json={"username": reviewer}).status_code == 404
+    assert counters(dbapp, reviewer) == (0, 0)
+
+
+def test_duplicate_review_is_rejected_without_counting(dbapp, client, reviewer, drink_ids):
+    body = {"username": reviewer, "drink_id": drink_ids[0], "rating": 3}
+    assert client.post("/reviews", json=body).status_code == 201
+    assert client.post("/reviews", json=body).status_code == 400
+    assert counters(dbapp, reviewer) == (1, 0)
@@ -0,0 +1,52 @@
+from search import MAX_EXPANSIONS, SearchIndex
+
+
+def drink(drink_id, name, **fields):
+    return {"id": drink_id, "name": name, **fields}
+
+
+def test_bm25_ranks_name_matches_and_rarer_terms_first():
+    index = SearchIndex()
+    index.build([
+        drink("a", "Stout", description="dark roasted stout"),
+        drink("b", "Porter", description="a stout-like porter"),
+        drink("c", "Pale Ale", description="hoppy"),
+        drink("d", "Oat Stout", description="smooth"),
+    ], {})
+
+    ranked = [drink_id for drink_id, _ in index.search("stout", prefix=False)]
+    assert ranked[-1] == "b"  # description only; a and d match in the name
+    assert set(ranked) == {"a", "b", "d"}
+    assert [d for d, _ in index.search("oat stout", prefix=False)] == ["d"]
+    assert index.search("lager", prefix=False) == []
+
+
+def test_prefix_query_keeps_the_exact_term_among_many_completions():
+    # the exact term is the rarest of its completions
+    drinks = [drink("exact", "ale")]
+    drinks += [drink(f"c{n}-{k}", f"ale{n:02d}") for n in range(MAX_EXPANSIONS + 4) for k in range(3)]
+    index = SearchIndex()
+    index.build(drinks, {})
+
+    assert "exact" in [drink_id for drink_id, _ in index.search("ale", limit=100)]
+
+
+def test_ensure_fresh_rebuilds_when_the_catalog_stamp_moves(dbapp, drink_ids):
+    index = SearchIndex()
+    builds = []
+    index.build_from_db = lambda db, stamp=None: (builds.append(stamp), SearchIndex.build_from_db(index, db, stamp))
+
+    index.ensure_fresh(dbapp.db, (1, "g"))
+    index.ensure_fresh(dbapp.db, (1, "g"))
+    assert builds == [(1, "g")]
+
+    index.ensure_fresh(dbapp.db, (2, "g"))
+    index.ensure_fresh(dbapp.db, (2, "other"))
+    assert builds == [(1, "g"), (2, "g"), (2, "other")]
+
+
+def test_search_route_pages_with_cursors(client):
+    first = client.get("/drinks/search?q=a&limit=2").get_json()
+    assert len(first["items"]) == 2 and first["next_cursor"]
+    second = client.get(f"/drinks/search?q=a&limit=2&cursor={first['next_cursor']}").get_json()
+    assert not {d["id"] for d in first["items"]} & {d["id"] for d in second["items"]}
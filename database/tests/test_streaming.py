@@ -0,0 +1,52 @@
+import json
+
+import pytest
+from flask import Flask
+
+from streaming import BATCH, NDJSON, batches, stream_list
+
+
+@pytest.mark.parametrize("count", [0, 1, BATCH, BATCH + 1, 2 * BATCH + 3])
+def test_stream_list_encodes_every_batch(count):
+    app = Flask(__name__)
+    docs = ({"n": n} for n in range(count))
+    with app.test_request_context("/"):
+        response = stream_list(docs, lambda batch: [dict(d, twice=d["n"] * 2) for d in batch])
+        body = "".join(response.response)
+    assert response.is_streamed and response.mimetype == "application/json"
+    assert json.loads(body) == [{"n": n, "twice": n * 2} for n in range(count)]
+
+
+def test_stream_list_as_ndjson():
+    app = Flask(__name__)
+    with app.test_request_context("/?format=ndjson"):
+        response = stream_list(iter([{"a": 1}, {"a": 2}]))
+        body = "".join(response.response)
+    assert response.mimetype == NDJSON
+    assert body == '{"a":1}\n{"a":2}\n'
+
+
+def test_stream_list_reads_the_first_batch_up_front():
+    def failing():
+        raise RuntimeError("query failed")
+        yield
+
+    with Flask(__name__).test_request_context("/"), pytest.raises(RuntimeError):
+        stream_list(failing())
+
+
+def test_batches():
+    assert [len(b) for b in batches(range(7), 3)] == [3, 3, 1]
+    assert list(batches([], 3)) == []
+
+
+@pytest.mark.parametrize("path, collection", [("/drinks", "drinks_collection"), ("/producers", "producers_collection")])
+def test_unpaged_listing_streams_the_whole_catalog(dbapp, client, path, collection):
+    res = client.get(path, json={})
+    assert res.status_code == 200 and res.is_streamed
+    items = res.get_json()
+    assert len(items) == getattr(dbapp, collection).count_documents({})
+    assert "_id" not in items[0]
+
+    lines = client.get(f"{path}?format=ndjson", json={}).get_data(as_text=True).splitlines()
+    assert [json.loads(line) for line in lines] == items
@@ -32,29 +32,30 @@ export default function Profile() {
   };
 
   const loadAll = async () => {
-    const [pRes, drRes, prRes] = await Promise.all([
-      fetch(`${apiUrl}/profile`, {
-        headers: { Authorization: `Bearer ${token}` },
-      }),
-      fetch(`${apiUrl}/reviews`, {
-        headers: { Authorization: `Bearer ${token}` },
-      }),
-      fetch(`${apiUrl}/producer-reviews`, {
-        headers: { Authorization: `Bearer ${token}` },
+    // un singur drum prin gateway pentru toate trei (/batch le rulează în paralel)
+    const res = await fetch(`${apiUrl}/batch`, {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+        Authorization: `Bearer ${token}`,
+      },
+      body: JSON.stringify({
+        requests: [{ path: "/profile" }, { path: "/reviews" }, { path: "/producer-reviews" }],
       }),
-    ]);
+    });
+    if (!res.ok) throw new Error(`Batch failed: ${res.status}`);
 
-    if (!pRes.ok) throw new Error(`Profile failed: ${pRes.status}`);
-    if (!drRes.ok) throw new Error(`Drink reviews failed: ${drRes.status}`);
+    const { responses } = await safeJson(res);
+    const [pRes, drRes, prRes] = responses;
+
+    if (pRes.status !== 200) throw new Error(`Profile failed: ${pRes.status}`);
+    if (drRes.status !== 200) throw new Error(`Drink reviews failed: ${drRes.status}`);
 
     // dacă nu ai implementat încă producer-reviews, îl lăsăm gol fără să stricăm pagina
-    let prData = [];
-    if (prRes.ok) {
-      prData = await safeJson(prRes);
-    }
+    const prData = prRes.status === 200 ? prRes.body : [];
 
-    const pData = await safeJson(pRes);
-    const drData = await safeJson(drRes);
+    const pData = pRes.body;
+    const drData = drRes.body;
 
     setProfile(pData);
     setBio(pData?.bio || "");
@@ -1,4 +1,4 @@
-import React, { useEffect, useMemo, useState } from "react";
+import React, { useEffect, useState } from "react";
 import CustomNavbar from "./Navbar";
 import { Button, Card, Container, Form } from "react-bootstrap";
 import Spinner from "react-bootstrap/Spinner";
@@ -7,18 +7,19 @@ import "../styles/Search.css";
 
 const Search = () => {
   const [search, setSearch] = useState("");
-  const [results, setResults] = useState([]);
-  const [loading, setLoading] = useState(false);
+  const [results, setResults] = useState([]); // the current page, fetched from the server
+  const [loading, setLoading] = useState(true);
 
   const [categories, setCategories] = useState([]);
   const [category, setCategory] = useState("");
 
-  const [allDrinks, setAllDrinks] = useState([]);
-
   const [show, setShow] = useState(false);
   const [selectedItem, setSelectedItem] = useState(null);
 
   const [currentPage, setCurrentPage] = useState(1);
+  // cursors[i] fetches page i + 1; one past the last visited page while there is more
+  const [cursors, setCursors] = useState([null]);
+  const [total, setTotal] = useState(null); // matching drinks, when the endpoint counts them (categories)
   const itemsPerPage = 10;
   const pageButtonLimit = 5;
 
@@ -71,18 +72,20 @@ const Search = () => {
     }
   };
 
-  const fetchAllDrinks = async () => {
-    try {
-      return await fetchJson(`${apiUrl}/drinks`, {
-        method: "GET",
-        headers: { "Content-Type": "application/json" },
-      });
-    } catch {
-      return await fetchJson(`${apiUrl}/beers`, {
-        method: "GET",
-        headers: { "Content-Type": "application/json" },
-      });
+  // one page of the current listing: search results, a category, or the whole catalog
+  const pageUrl = (cursor) => {
+    const params = new URLSearchParams({ limit: String(itemsPerPage) });
+    if (cursor) params.set("cursor", cursor);
+
+    if (search.trim()) {
+      params.set("q", search);
+      return `${apiUrl}/drinks/search?${params}`;
     }
+    if (category) {
+      params.set("category", category);
+      return `${apiUrl}/drinks/faceted?${params}`;
+    }
+    return `${apiUrl}/drinks?${params}`;
   };
 
   const fetchAllFavorites = async () => {
@@ -99,34 +102,23 @@ const Search = () => {
 
   useEffect(() => {
     let mounted = true;
-    setLoading(true);
 
-    Promise.all([fetchAllDrinks(), fetchCategories(), fetchAllFavorites()])
-      .then(([d, cats, fav]) => {
+    Promise.all([fetchCategories(), fetchAllFavorites()])
+      .then(([cats, fav]) => {
         if (!mounted) return;
 
-        const drinksArr = Array.isArray(d) ? d : [];
-        const catsArr = Array.isArray(cats) ? cats : [];
-
-        setAllDrinks(drinksArr);
-        setCategories(catsArr);
+        setCategories(Array.isArray(cats) ? cats : []);
 
         const favIds = fav
           .map((x) => String(x?.id ?? x?.drink_id ?? x?._id ?? ""))
           .filter(Boolean);
         setFavorites(favIds);
-
-        setResults(drinksArr);
-        setLoading(false);
       })
       .catch((e) => {
         console.error(e);
         if (!mounted) return;
-        setAllDrinks([]);
         setCategories([]);
         setFavorites([]);
-        setResults([]);
-        setLoading(false);
       });
 
     return () => {
@@ -135,53 +127,61 @@ const Search = () => {
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [apiUrl]);
 
-  // Search filtering (client-side)
+  // Current page (server-side paging; search is debounced and its last word
+  // also matches as a prefix)
   useEffect(() => {
-    setCurrentPage(1);
-
-    if (!search) {
-      setResults(allDrinks);
-      return;
-    }
+    let cancelled = false;
+    const page = currentPage;
+    const timer = setTimeout(() => {
+      fetchJson(pageUrl(cursors[page - 1]), {
+        method: "GET",
+        headers: { "Content-Type": "application/json" },
+      })
+        .then((found) => {
+          if (cancelled) return;
+          setResults(Array.isArray(found?.items) ? found.items : []);
+          setTotal(typeof found?.total === "number" ? found.total : null);
+          // keep the cursors up to this page, plus the next one if there is more
+          const next = found?.next_cursor;
+          setCursors((prev) => [...prev.slice(0, page), ...(next ? [next] : [])]);
+          setLoading(false);
+        })
+        .catch((e) => {
+          console.error(e);
+          if (cancelled) return;
+          setResults([]);
+          setTotal(null);
+          setLoading(false);
+        });
+    }, search.trim() ? 200 : 0);
 
-    const q = search.toLowerCase().trim();
-    const filtered = allDrinks.filter((d) => (d?.name || "").toLowerCase().includes(q));
-    setResults(filtered);
-  }, [search, allDrinks]);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [search, category, currentPage, apiUrl]);
 
-  // Category filtering (client-side)
-  useEffect(() => {
+  // a new query starts over at its first page
+  const resetPaging = () => {
     setCurrentPage(1);
-
-    if (!category) return;
-
-    const filtered = allDrinks.filter((d) => {
-      const c = d?.category ?? d?.cat_name ?? "";
-      return String(c).toLowerCase() === String(category).toLowerCase();
-    });
-
-    setResults(filtered);
-  }, [category, allDrinks]);
+    setCursors([null]);
+  };
 
   const handleInputChange = (event) => {
     setSearch(event.target.value);
     setCategory("");
+    resetPaging();
   };
 
   const handleCategoryChange = (event) => {
     setCategory(event.target.value);
     setSearch("");
+    resetPaging();
   };
 
-  const totalPages = useMemo(
-    () => Math.max(1, Math.ceil(results.length / itemsPerPage)),
-    [results.length]
-  );
-
-  const displayedResults = useMemo(() => {
-    const start = (currentPage - 1) * itemsPerPage;
-    return results.slice(start, start + itemsPerPage);
-  }, [results, currentPage]);
+  // pages are reached through cursors, so only visited pages and the next one are known
+  const totalPages = cursors.length;
 
   const renderPaginationButtons = () => {
     const startPage = Math.max(1, currentPage - Math.floor(pageButtonLimit / 2));
@@ -219,7 +219,7 @@ const Search = () => {
           variant="dark"
           size="sm"
           onClick={() => setCurrentPage((p) => Math.min(totalPages, p + 1))}
-          disabled={currentPage === totalPages}
+          disabled={currentPage >= totalPages}
         >
           Next
         </Button>
@@ -272,7 +272,17 @@ const Search = () => {
             <div>
               <h1 className="search-title">Search</h1>
               <p className="search-subtitle">
-                Page <strong>{currentPage} of {totalPages}</strong>
+                {total != null ? (
+                  <>
+                    Page <strong>{currentPage} of {Math.max(1, Math.ceil(total / itemsPerPage))}</strong>
+                    {" · "}
+                    {total} drinks
+                  </>
+                ) : (
+                  <>
+                    Page <strong>{currentPage}</strong>
+                  </>
+                )}
               </p>
             </div>
           </div>
@@ -314,7 +324,7 @@ const Search = () => {
           ) : (
             <>
               <div className="search-results">
-                {displayedResults.map((drink, index) => {
+                {results.map((drink, index) => {
                   const id = String(drink?.id ?? "");
                   const categoryText = drink?.category ?? drink?.cat_name ?? "—";
                   const styleText = drink?.style_name ?? "—";
@@ -323,7 +333,7 @@ const Search = () => {
                     <Card key={`${id}-${index}`} className="search-result-card">
                       <Card.Body className="search-result-body">
                         <Card.Title className="search-result-title">
-                          {index + 1}. {drink?.name || "Unnamed"}
+                          {(currentPage - 1) * itemsPerPage + index + 1}. {drink?.name || "Unnamed"}
                         </Card.Title>
 
                         <Card.Text className="search-result-meta">{categoryText}</Card.Text>